@@ -0,0 +1,83 @@
+"""Acumulados diarios: daily_status/truck/driver_rollups y su backfill
+
+Una base anterior a los acumulados no tiene estas tablas (solo las crea
+create_all al arrancar la app). Se crean aquí, antes de que 0001 les agregue
+índices, y se llenan desde route_manifests con rebuild_rollups. Si ya
+existen (base creada por la app) no se tocan.
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+revision = "0000"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+AUDIT_STATUS = sa.Enum(
+    "CREATED", "IN_PROGRESS", "DEBT", "PENDING_RECONCILIATION", "LOCKED_DEBT", "CLOSED", name="auditstatus"
+)
+
+TOTALS = [
+    ("route_count", sa.Integer()),
+    ("problematic_routes", sa.Integer()),
+    ("debt_amount", sa.Float()),
+    ("full_bottles", sa.Integer()),
+]
+
+
+def _totals(columns):
+    return [sa.Column(name, type_, nullable=False, server_default="0") for name, type_ in columns]
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    created = False
+
+    if "daily_status_rollups" not in tables:
+        op.create_table(
+            "daily_status_rollups",
+            sa.Column("date", sa.Date(), primary_key=True),
+            sa.Column("audit_status", AUDIT_STATUS, primary_key=True),
+            *_totals([
+                ("route_count", sa.Integer()),
+                ("full_bottles", sa.Integer()),
+                ("total_bottles", sa.Integer()),
+                ("debt_amount", sa.Float()),
+                ("positive_debt_amount", sa.Float()),
+            ]),
+        )
+        created = True
+    if "daily_truck_rollups" not in tables:
+        op.create_table(
+            "daily_truck_rollups",
+            sa.Column("date", sa.Date(), primary_key=True),
+            sa.Column("truck_id", sa.Integer(), sa.ForeignKey("trucks.id"), primary_key=True),
+            *_totals(TOTALS),
+        )
+        created = True
+    if "daily_driver_rollups" not in tables:
+        op.create_table(
+            "daily_driver_rollups",
+            sa.Column("date", sa.Date(), primary_key=True),
+            sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            *_totals(TOTALS),
+        )
+        created = True
+
+    if created:
+        from app.services import data_version
+        from app.services.rollup_service import rebuild_rollups
+
+        # table_versions aún no existe en este punto de la cadena (0005)
+        rebuild_rollups(Session(bind=op.get_bind(), info={data_version.UNVERSIONED_KEY: True}))
+
+
+def downgrade():
+    op.drop_table("daily_driver_rollups")
+    op.drop_table("daily_truck_rollups")
+    op.drop_table("daily_status_rollups")
@@ -0,0 +1,46 @@
+"""Índices compuestos para reportes, listados y check-in
+
+Las tablas originales se crearon con Base.metadata.create_all y las de
+acumulados con 0000, así que esta migración solo agrega índices (con IF NOT
+EXISTS: una base nueva ya los trae desde los modelos).
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = "0000"
+branch_labels = None
+depends_on = None
+
+IN_PROGRESS = sa.text("audit_status = 'IN_PROGRESS'")
+
+# (nombre, tabla, columnas, kwargs)
+INDEXES = [
+    ("ix_route_manifests_date_status", "route_manifests", ["date", "audit_status"], {}),
+    ("ix_route_manifests_truck_date", "route_manifests", ["truck_id", "date"], {}),
+    ("ix_route_manifests_driver_date", "route_manifests", ["driver_id", "date"], {}),
+    ("ix_route_manifests_in_progress", "route_manifests", ["truck_id", "driver_id"],
+     {"sqlite_where": IN_PROGRESS, "postgresql_where": IN_PROGRESS}),
+    ("ix_sales_details_route_client", "sales_details", ["route_id", "client_id"], {}),
+    ("ix_audit_logs_entity", "audit_logs", ["entity_type", "entity_id"], {}),
+    ("ix_daily_status_rollups_status_date", "daily_status_rollups", ["audit_status", "date"], {}),
+    ("ix_daily_truck_rollups_truck_date", "daily_truck_rollups", ["truck_id", "date"], {}),
+    ("ix_daily_driver_rollups_driver_date", "daily_driver_rollups", ["driver_id", "date"], {}),
+]
+
+
+def upgrade():
+    for name, table, columns, kwargs in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+    # Redundante: ix_route_manifests_date_status empieza por date
+    op.drop_index("ix_route_manifests_date", table_name="route_manifests", if_exists=True)
+
+
+def downgrade():
+    op.create_index("ix_route_manifests_date", "route_manifests", ["date"], if_not_exists=True)
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,82 @@
+"""Libro de deudas: chofer en debt_records, saldos y antigüedad por chofer
+
+Agrega debt_records.driver_id (copiado de la ruta), crea driver_debt_balances
+y driver_debt_aging, y los llena con las deudas abiertas que ya existan.
+Una base creada con create_all ya trae columna y tablas: solo se llenan.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+OPEN = "('PENDING', 'DISPUTED')"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "driver_id" not in {c["name"] for c in inspector.get_columns("debt_records")}:
+        with op.batch_alter_table("debt_records") as batch:
+            batch.add_column(sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id", name="fk_debt_records_driver_id"), nullable=True))
+    op.create_index("ix_debt_records_driver_status", "debt_records", ["driver_id", "status"], if_not_exists=True)
+    op.create_index("ix_debt_records_route", "debt_records", ["route_manifest_id"], if_not_exists=True)
+
+    if "driver_debt_balances" not in tables:
+        op.create_table(
+            "driver_debt_balances",
+            sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("pending_amount", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("disputed_amount", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("open_records", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+    if "driver_debt_aging" not in tables:
+        op.create_table(
+            "driver_debt_aging",
+            sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("debt_date", sa.Date(), primary_key=True),
+            sa.Column("open_amount", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("open_records", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    # Backfill
+    op.execute("""
+        UPDATE debt_records SET driver_id = (
+            SELECT driver_id FROM route_manifests WHERE route_manifests.id = debt_records.route_manifest_id
+        ) WHERE driver_id IS NULL
+    """)
+    op.execute(f"""
+        INSERT INTO driver_debt_balances (driver_id, pending_amount, disputed_amount, open_records, updated_at)
+        SELECT driver_id,
+               SUM(CASE WHEN status = 'PENDING' THEN amount ELSE 0 END),
+               SUM(CASE WHEN status = 'DISPUTED' THEN amount ELSE 0 END),
+               COUNT(*),
+               CURRENT_TIMESTAMP
+        FROM debt_records
+        WHERE driver_id IS NOT NULL AND status IN {OPEN}
+        GROUP BY driver_id
+    """)
+    op.execute(f"""
+        INSERT INTO driver_debt_aging (driver_id, debt_date, open_amount, open_records)
+        SELECT d.driver_id, r.date, SUM(d.amount), COUNT(*)
+        FROM debt_records d JOIN route_manifests r ON r.id = d.route_manifest_id
+        WHERE d.driver_id IS NOT NULL AND d.status IN {OPEN}
+        GROUP BY d.driver_id, r.date
+    """)
+
+
+def downgrade():
+    op.drop_table("driver_debt_aging")
+    op.drop_table("driver_debt_balances")
+    op.drop_index("ix_debt_records_route", table_name="debt_records", if_exists=True)
+    op.drop_index("ix_debt_records_driver_status", table_name="debt_records", if_exists=True)
+    with op.batch_alter_table("debt_records") as batch:
+        batch.drop_column("driver_id")
@@ -0,0 +1,50 @@
+"""Corridas de nómina: payroll_runs y la corrida que dedujo cada deuda
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "payroll_runs" not in inspector.get_table_names():
+        op.create_table(
+            "payroll_runs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("period_start", sa.Date(), nullable=False),
+            sa.Column("period_end", sa.Date(), nullable=False),
+            sa.Column("status", sa.Enum("RUNNING", "COMPLETED", name="payrollrunstatus"), nullable=False),
+            sa.Column("last_debt_id", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("deducted_records", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("deducted_amount", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("statement_path", sa.String(500), nullable=True),
+            sa.Column("created_by_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint("period_start", "period_end", name="uq_payroll_runs_period"),
+        )
+        op.create_index("ix_payroll_runs_id", "payroll_runs", ["id"])
+
+    if "payroll_run_id" not in {c["name"] for c in inspector.get_columns("debt_records")}:
+        with op.batch_alter_table("debt_records") as batch:
+            batch.add_column(sa.Column(
+                "payroll_run_id", sa.Integer(),
+                sa.ForeignKey("payroll_runs.id", name="fk_debt_records_payroll_run_id"), nullable=True
+            ))
+    op.create_index("ix_debt_records_payroll_run", "debt_records", ["payroll_run_id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_debt_records_payroll_run", table_name="debt_records", if_exists=True)
+    with op.batch_alter_table("debt_records") as batch:
+        batch.drop_column("payroll_run_id")
+    op.drop_table("payroll_runs")
@@ -0,0 +1,40 @@
+"""Bitácora por meses: registro de segmentos sellados (audit_archives)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "audit_archives" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "audit_archives",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("month", sa.String(7), nullable=False),
+        sa.Column("path", sa.String(500), nullable=False, unique=True),
+        sa.Column("first_id", sa.Integer(), nullable=False),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("min_timestamp", sa.DateTime(), nullable=False),
+        sa.Column("max_timestamp", sa.DateTime(), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("compressed_bytes", sa.Integer(), nullable=False),
+        sa.Column("raw_bytes", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_audit_archives_id", "audit_archives", ["id"])
+    op.create_index("ix_audit_archives_month", "audit_archives", ["month"])
+    op.create_index("ix_audit_archives_range", "audit_archives", ["min_timestamp", "max_timestamp"])
+
+
+def downgrade():
+    op.drop_table("audit_archives")
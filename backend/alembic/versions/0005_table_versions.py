@@ -0,0 +1,27 @@
+"""Versiones de datos compartidas entre procesos (table_versions)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "table_versions" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "table_versions",
+        sa.Column("table_name", sa.String(100), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("table_versions")
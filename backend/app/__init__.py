@@ -1,14 +1,18 @@
 """
 Script para inicializar la base de datos con datos de prueba
 Ejecutar: docker-compose exec backend python init_db.py
+
+Los imports van dentro de init_database: este archivo se ejecuta con
+cualquier import de app.*, incluidos los procesos del pool de contraseñas
+(app.utils.password_worker), que no deben cargar engines ni modelos.
 """
 
-from app.database import SessionLocal, engine, Base
-from app.models import User, UserRole, Truck
-from app.utils.security import get_password_hash
 
 def init_database():
     """Crear tablas y datos iniciales"""
+    from app.database import SessionLocal, engine, Base
+    from app.models import User, UserRole, Truck
+    from app.utils.security import get_password_hash
     
     print("🔧 Creando tablas de base de datos...")
     Base.metadata.create_all(bind=engine)
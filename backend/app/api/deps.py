@@ -0,0 +1,69 @@
+from fastapi import Depends, Request, Response
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Iterable
+
+from app.database import get_db, get_read_db
+from app.services import data_version
+
+
+class NotModified(Exception):
+    """El cliente ya tiene la versión vigente: se responde 304 sin cuerpo"""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in {tag.strip() for tag in if_none_match.split(",")}
+
+
+def conditional_get(tables: Iterable[str], snapshot: bool = False):
+    """
+    Dependency de GET condicional (ETag / If-None-Match).
+
+    El ETag sale de la versión de las tablas que alimentan el endpoint, la
+    ruta, los parámetros y la fecha de hoy; no se calcula sobre el cuerpo.
+    Si coincide con If-None-Match se responde 304 antes de ejecutar el
+    endpoint. Declararla DESPUÉS de get_current_active_user para que la
+    autenticación se valide primero.
+
+    Con `snapshot` (endpoints que leen de get_read_db) el ETag usa las
+    versiones fijadas en esa instantánea, las mismas que el cuerpo y su
+    llave de cache: un commit entre ambos pasos no puede etiquetar datos
+    viejos con la versión nueva. Sin instantánea el ETag se calcula antes de
+    leer, así que a lo más queda viejo respecto al cuerpo (solo causa una
+    descarga de más). En ambos casos las versiones incluyen lo que
+    confirmaron otros procesos (data_version.sync).
+    """
+    tables = tuple(tables)
+
+    def _check(request: Request, response: Response, versions):
+        etag = '"%s"' % data_version.fingerprint(
+            tables,
+            request.url.path,
+            sorted(request.query_params.multi_items()),
+            date.today(),
+            versions=versions,
+        )
+        if _matches(request.headers.get("if-none-match"), etag):
+            raise NotModified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+
+    if snapshot:
+        def snapshot_dependency(request: Request, response: Response, db: Session = Depends(get_read_db)):
+            # Misma sesión que el endpoint (FastAPI cachea la dependency por petición)
+            _check(request, response, db.info.get("data_versions"))
+
+        return snapshot_dependency
+
+    def dependency(request: Request, response: Response, db: Session = Depends(get_db)):
+        data_version.sync(db)
+        _check(request, response, None)
+
+    return dependency
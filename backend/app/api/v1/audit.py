@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, datetime, timedelta
+
+from app.database import get_read_db
+from app.models.user import User, UserRole
+from app.api.v1.auth import get_current_active_user
+from app.services import audit_archive
+
+router = APIRouter()
+
+
+AUDIT_READER_ROLES = (UserRole.ADMIN, UserRole.SUPERVISOR, UserRole.AUDITOR)
+
+
+def _require_auditor(current_user: User):
+    if current_user.role not in AUDIT_READER_ROLES:
+        raise HTTPException(status_code=403, detail="No tiene permiso para ver la bitácora")
+
+
+# --- ENDPOINTS ---
+
+@router.get("/")
+def list_audit_logs(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    action: Optional[str] = None,
+    user_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Bitácora (más reciente primero), incluidos los meses ya sellados en archivo.
+    Filtrar por fechas evita abrir los segmentos fuera del rango.
+    """
+    _require_auditor(current_user)
+    start = datetime.combine(start_date, datetime.min.time()) if start_date else None
+    end = datetime.combine(end_date + timedelta(days=1), datetime.min.time()) if end_date else None
+    try:
+        logs = audit_archive.query_logs(
+            db, start=start, end=end, entity_type=entity_type, entity_id=entity_id,
+            action=action, user_id=user_id, limit=limit
+        )
+    except audit_archive.AuditArchiveError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    return {"logs": logs, "count": len(logs)}
+
+
+@router.get("/archives")
+def list_archives(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Partición caliente y segmentos mensuales sellados"""
+    _require_auditor(current_user)
+    return audit_archive.archives_summary(db)
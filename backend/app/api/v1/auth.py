@@ -3,10 +3,12 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.config import settings
 from app.models.user import User
 from app.utils.security import verify_password, create_access_token, decode_access_token
+from app.services.auth_cache import principal_cache
+from app.services.password_pool import PasswordPoolBusy
 
 router = APIRouter()
 
@@ -14,19 +16,27 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/lo
 
 
 # Dependency para obtener el usuario actual (PRIMERO LA DEFINICIÓN)
-async def get_current_active_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+def get_current_active_user(
+    token: str = Depends(oauth2_scheme)
 ) -> User:
     """
-    Dependency que verifica el token JWT y retorna el usuario actual
+    Dependency que verifica el token JWT y retorna el usuario actual.
+    Camino rápido: token ya verificado en principal_cache (sin JWT ni SELECT).
+    El usuario devuelto está separado de la sesión: solo lectura.
     """
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # Antes de leer: si el usuario cambia mientras tanto, no se cachea lo leído
+    generation = principal_cache.generation()
+
     # Decodificar token
     payload = decode_access_token(token)
     if payload is None:
@@ -37,9 +47,14 @@ async def get_current_active_user(
         raise credentials_exception
     
     # Buscar usuario
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise credentials_exception
+        db.expunge(user)
+    finally:
+        db.close()
     
     if not user.is_active:
         raise HTTPException(
@@ -47,11 +62,12 @@ async def get_current_active_user(
             detail="Usuario inactivo"
         )
     
+    principal_cache.put(token, user, payload.get("exp"), generation)
     return user
 
 
 @router.post("/login")
-async def login(
+def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -68,8 +84,16 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verificar contraseña
-    if not verify_password(form_data.password, user.hashed_password):
+    # Verificar contraseña (pool de procesos; si está lleno, que el cliente reintente)
+    try:
+        password_ok = verify_password(form_data.password, user.hashed_password)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiados inicios de sesión simultáneos, reintentar",
+            headers={"Retry-After": "1"},
+        )
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario o contraseña incorrectos",
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -7,6 +7,9 @@ from app.database import get_db
 from app.models.client import Client
 from app.models.user import User
 from app.api.v1.auth import get_current_active_user
+from app.api.deps import conditional_get
+from app.services.audit_service import log_activity
+from app.services.unit_of_work import UnitOfWork, get_uow
 
 router = APIRouter()
 
@@ -26,20 +29,26 @@ class ClientResponse(BaseModel):
     class Config:
         from_attributes = True
 
+def _price_snapshot(client: Client) -> dict:
+    """Datos del cliente que se guardan en la bitácora (el precio afecta la deuda)"""
+    return {"name": client.name, "address": client.address, "special_price": client.special_price}
+
 # --- ENDPOINTS ---
 
 @router.get("/", response_model=List[ClientResponse])
-async def list_clients(
+def list_clients(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = Depends(conditional_get(["clients"]))
 ):
     """Listar todos los clientes activos para el menú"""
     return db.query(Client).filter(Client.is_active == True).all()
 
 @router.post("/", response_model=ClientResponse)
-async def create_client(
+def create_client(
+    request: Request,
     client: ClientCreate,
-    db: Session = Depends(get_db),
+    uow: UnitOfWork = Depends(get_uow),
     current_user: User = Depends(get_current_active_user)
 ):
     """Registrar un nuevo cliente o punto de entrega"""
@@ -52,28 +61,36 @@ async def create_client(
         address=client.address,
         special_price=client.special_price
     )
-    db.add(new_client)
-    db.commit()
-    db.refresh(new_client)
+    uow.add(new_client)
+    uow.flush()  # ID para la bitácora
+    log_activity(uow.db, current_user.id, "CLIENT_CREATED", "Client", new_client.id,
+                 new_value=_price_snapshot(new_client), request=request)
+    uow.commit()
+    uow.db.refresh(new_client)
     return new_client
 
 @router.put("/{client_id}", response_model=ClientResponse)
-async def update_client(
+def update_client(
+    request: Request,
     client_id: int,
     client_update: ClientCreate,
-    db: Session = Depends(get_db),
+    uow: UnitOfWork = Depends(get_uow),
     current_user: User = Depends(get_current_active_user)
 ):
     """Actualizar precio o datos de un cliente"""
+    db = uow.db
     client = db.query(Client).filter(Client.id == client_id).first()
     
     if not client:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     
+    old_value = _price_snapshot(client)
     client.name = client_update.name
     client.address = client_update.address
     client.special_price = client_update.special_price
-    
-    db.commit()
+
+    log_activity(db, current_user.id, "CLIENT_UPDATED", "Client", client.id,
+                 old_value=old_value, new_value=_price_snapshot(client), request=request)
+    uow.commit()
     db.refresh(client)
     return client
\ No newline at end of file
@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+from app.database import get_db
+from app.models.user import User, UserRole
+from app.models.debt_record import DebtRecord, DebtStatus
+from app.api.v1.auth import get_current_active_user
+from app.api.deps import conditional_get
+from app.services import debt_service
+from app.services.audit_service import log_activity
+from app.services.unit_of_work import UnitOfWork, get_uow
+
+router = APIRouter()
+
+DEBT_TABLES = ["debt_records", "driver_debt_balances", "driver_debt_aging", "users"]
+
+# Quién puede resolver deudas
+RESOLVER_ROLES = (UserRole.ADMIN, UserRole.SUPERVISOR)
+
+
+# --- SCHEMAS ---
+class DebtResponse(BaseModel):
+    id: int
+    route_manifest_id: int
+    driver_id: Optional[int] = None
+    amount: float
+    status: DebtStatus
+    created_at: Optional[datetime] = None
+    resolved_at: Optional[datetime] = None
+    resolved_by_user_id: Optional[int] = None
+    notes: Optional[str] = None
+    resolution_notes: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class DebtStatusChange(BaseModel):
+    status: DebtStatus
+    notes: Optional[str] = None
+
+
+# --- ENDPOINTS ---
+
+@router.get("/", response_model=List[DebtResponse])
+def list_debts(
+    driver_id: Optional[int] = None,
+    status: Optional[DebtStatus] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = db.query(DebtRecord)
+    if driver_id is not None:
+        query = query.filter(DebtRecord.driver_id == driver_id)
+    if status is not None:
+        query = query.filter(DebtRecord.status == status)
+    return query.order_by(DebtRecord.id.desc()).limit(limit).all()
+
+
+@router.get("/balances")
+def get_balances(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = Depends(conditional_get(DEBT_TABLES))
+):
+    """Saldo abierto de cada chofer (una fila por chofer)"""
+    return {"balances": debt_service.driver_balances(db)}
+
+
+@router.get("/balances/{driver_id}")
+def get_driver_balance(
+    driver_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    balances = debt_service.driver_balances(db, driver_id)
+    if balances:
+        return balances[0]
+    if db.get(User, driver_id) is None:
+        raise HTTPException(status_code=404, detail="Chofer no encontrado")
+    return {"driver_id": driver_id, "balance": 0.0, "pending_amount": 0.0, "disputed_amount": 0.0, "open_records": 0}
+
+
+@router.get("/aging")
+def get_aging(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = Depends(conditional_get(DEBT_TABLES))
+):
+    """Deuda abierta por chofer en rangos de antigüedad (0-30, 31-60, 61-90, 90+ días)"""
+    return {"aging": debt_service.driver_aging(db)}
+
+
+@router.post("/{debt_id}/status", response_model=DebtResponse)
+def change_debt_status(
+    request: Request,
+    debt_id: int,
+    change: DebtStatusChange,
+    uow: UnitOfWork = Depends(get_uow),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Pagar, perdonar, deducir o disputar una deuda (queda en la bitácora)"""
+    if current_user.role not in RESOLVER_ROLES:
+        raise HTTPException(status_code=403, detail="Solo administradores o supervisores pueden resolver deudas")
+
+    db = uow.db
+    record = db.get(DebtRecord, debt_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Deuda no encontrada")
+
+    try:
+        before = debt_service.change_status(db, record, change.status, current_user.id, change.notes)
+    except debt_service.InvalidDebtTransition as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+    log_activity(
+        db, current_user.id, f"DEBT_{change.status.value}", "DebtRecord", record.id,
+        change.notes, old_value=before, new_value={"status": record.status.value, "amount": record.amount},
+        request=request
+    )
+    uow.commit()
+    db.refresh(record)
+    return record
@@ -0,0 +1,182 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from typing import Optional
+from datetime import date, datetime, timedelta
+from enum import Enum
+import csv
+import io
+import json
+
+from app.database import ReadSessionLocal, begin_read_snapshot
+from app.config import settings
+from app.models.user import User
+from app.models.truck import Truck
+from app.models.client import Client
+from app.models.route_manifest import RouteManifest
+from app.models.sales_detail import SalesDetail
+from app.api.v1.auth import get_current_active_user
+
+router = APIRouter()
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv; charset=utf-8",
+    ExportFormat.ndjson: "application/x-ndjson",
+}
+
+Driver = aliased(User, name="driver")
+
+
+def _routes_statement(start_date: date, end_date: date):
+    return select(
+        RouteManifest.id.label("route_id"),
+        RouteManifest.date,
+        RouteManifest.driver_id,
+        Driver.full_name.label("driver_name"),
+        RouteManifest.truck_id,
+        Truck.nickname.label("truck_nickname"),
+        Truck.plate.label("truck_plate"),
+        RouteManifest.initial_full_bottles,
+        RouteManifest.initial_empty_bottles,
+        RouteManifest.returned_full_bottles,
+        RouteManifest.returned_empty_bottles,
+        RouteManifest.reported_damaged,
+        RouteManifest.audit_status,
+        RouteManifest.debt_amount,
+        RouteManifest.checkout_timestamp,
+        RouteManifest.checkin_timestamp,
+        RouteManifest.notes,
+    ).join(
+        Driver, Driver.id == RouteManifest.driver_id
+    ).join(
+        Truck, Truck.id == RouteManifest.truck_id
+    ).where(
+        RouteManifest.date >= start_date,
+        RouteManifest.date <= end_date
+    ).order_by(
+        RouteManifest.date, RouteManifest.id
+    )
+
+
+def _sales_statement(start_date: date, end_date: date):
+    return select(
+        SalesDetail.id.label("sale_id"),
+        SalesDetail.route_id,
+        RouteManifest.date,
+        RouteManifest.driver_id,
+        Driver.full_name.label("driver_name"),
+        RouteManifest.truck_id,
+        Truck.nickname.label("truck_nickname"),
+        SalesDetail.client_id,
+        Client.name.label("client_name"),
+        SalesDetail.quantity,
+        SalesDetail.unit_price,
+        SalesDetail.subtotal,
+    ).join(
+        RouteManifest, RouteManifest.id == SalesDetail.route_id
+    ).join(
+        Driver, Driver.id == RouteManifest.driver_id
+    ).join(
+        Truck, Truck.id == RouteManifest.truck_id
+    ).join(
+        Client, Client.id == SalesDetail.client_id
+    ).where(
+        RouteManifest.date >= start_date,
+        RouteManifest.date <= end_date
+    ).order_by(
+        RouteManifest.date, SalesDetail.route_id, SalesDetail.id
+    )
+
+
+def _plain(value):
+    """Convertir valores de la BD a tipos serializables"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _stream_rows(statement, fmt: ExportFormat):
+    """
+    Generador de chunks: un chunk por lote de `EXPORT_BATCH_SIZE` filas.
+    Abre su propia sesión porque la de get_db se cierra antes de que termine el stream;
+    es del engine de solo lectura (pool propio): una exportación larga no ocupa
+    conexiones del pool de escritura, y lee una sola instantánea.
+    """
+    db = ReadSessionLocal()
+    try:
+        begin_read_snapshot(db)
+        result = db.execute(statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+
+        if fmt == ExportFormat.csv:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        for batch in result.partitions():
+            if fmt == ExportFormat.csv:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([[_plain(value) for value in row] for row in batch])
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps({c: _plain(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n"
+                    for row in batch
+                )
+    finally:
+        db.close()
+
+
+def _export_response(statement, fmt: ExportFormat, name: str, start_date: date, end_date: date):
+    filename = f"{name}_{start_date.isoformat()}_{end_date.isoformat()}.{fmt.value}"
+    return StreamingResponse(
+        _stream_rows(statement, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def _default_range(start_date: Optional[date], end_date: Optional[date]):
+    """Fechas por defecto: últimos 30 días"""
+    if not end_date:
+        end_date = date.today()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+    return start_date, end_date
+
+
+# --- ENDPOINTS ---
+
+@router.get("/routes")
+async def export_routes(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: ExportFormat = Query(ExportFormat.csv),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Exportar manifiestos de ruta (con chofer y camioneta) en CSV o NDJSON"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return _export_response(_routes_statement(start_date, end_date), format, "rutas", start_date, end_date)
+
+
+@router.get("/sales")
+async def export_sales(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: ExportFormat = Query(ExportFormat.csv),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Exportar detalle de ventas (con ruta, chofer, camioneta y cliente) en CSV o NDJSON"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return _export_response(_sales_statement(start_date, end_date), format, "ventas", start_date, end_date)
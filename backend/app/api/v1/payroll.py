@@ -0,0 +1,104 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from fastapi.responses import FileResponse
+from loguru import logger
+from sqlalchemy.orm import Session
+from datetime import date
+from pydantic import BaseModel
+import os
+
+from app.database import get_db
+from app.models.user import User, UserRole
+from app.models.payroll_run import PayrollRun, PayrollRunStatus
+from app.api.v1.auth import get_current_active_user
+from app.services import payroll_service
+
+router = APIRouter()
+
+
+# --- SCHEMAS ---
+class PayrollRunRequest(BaseModel):
+    period_start: date
+    period_end: date
+
+
+def _require_admin(current_user: User):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Solo administradores pueden correr la nómina")
+
+
+# --- ENDPOINTS ---
+
+def _execute_in_background(run_id: int):
+    try:
+        payroll_service.execute_run(run_id)
+    except payroll_service.PayrollRunInProgress:
+        pass  # Otra petición ya la está ejecutando
+    except Exception:
+        # Lo confirmado queda hecho; volver a lanzar el periodo reanuda desde el cursor
+        logger.exception(f"Nómina: la corrida {run_id} se interrumpió")
+
+
+@router.post("/runs")
+def run_payroll(
+    data: PayrollRunRequest,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Lanzar (o reanudar) la corrida del periodo en segundo plano: responde
+    202 con la corrida y su avance se consulta en GET /runs/{id}. Si ya
+    terminó y no hay deudas nuevas del periodo, responde 200 con su
+    resultado sin deducir de nuevo; si las hay, la corrida se reabre.
+    """
+    _require_admin(current_user)
+    if data.period_start > data.period_end:
+        raise HTTPException(status_code=400, detail="El periodo termina antes de empezar")
+    run = payroll_service.start_run(db, data.period_start, data.period_end, current_user.id)
+    if run.status != PayrollRunStatus.COMPLETED:
+        # Sin get_uow: cada bloque toma y suelta su propio turno de escritura
+        background_tasks.add_task(_execute_in_background, run.id)
+        response.status_code = 202
+    return payroll_service.summary(run)
+
+
+@router.get("/runs")
+def list_runs(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    runs = db.query(PayrollRun).order_by(PayrollRun.id.desc()).limit(100).all()
+    return {"runs": [payroll_service.summary(run) for run in runs]}
+
+
+@router.get("/runs/{run_id}")
+def get_run(
+    run_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    run = db.get(PayrollRun, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Corrida no encontrada")
+    return payroll_service.summary(run)
+
+
+@router.get("/runs/{run_id}/statement")
+def download_statement(
+    run_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Estado de cuenta por chofer (CSV) de una corrida terminada"""
+    _require_admin(current_user)
+    run = db.get(PayrollRun, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Corrida no encontrada")
+    if run.status != PayrollRunStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail="La corrida no ha terminado")
+
+    path = run.statement_path
+    if not path or not os.path.exists(path):
+        path = payroll_service.write_statement(db, run)  # Se borró el archivo: se regenera
+    return FileResponse(path, media_type="text/csv; charset=utf-8", filename=os.path.basename(path))
@@ -1,82 +1,68 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, extract, Integer  # <--- 1. Agregamos Integer
+from sqlalchemy import func, desc, case
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_read_db
+from app.models.user import User, UserRole
 from app.models.route_manifest import RouteManifest, AuditStatus
-from app.models.debt_record import DebtRecord
 from app.models.truck import Truck
+from app.models.daily_rollup import DailyStatusRollup, DailyTruckRollup, DailyDriverRollup
 from app.api.v1.auth import get_current_active_user
+from app.api.deps import conditional_get
+from app.services.kpi_service import compute_kpis, status_distribution, success_rate as _success_rate
+from app.services.report_cache import report_cache, REPORT_TABLES
+from app.services.columnar_store import columnar_store
+from app.services import federation
+from app.services.route_service import list_routes_page
+from app.schemas.route import RouteListPage
 
 router = APIRouter()
 
+# GET condicional: 304 mientras no cambien las tablas de los reportes
+report_etag = Depends(conditional_get(REPORT_TABLES, snapshot=True))
 
-@router.get("/kpis")
-async def get_kpis(
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """KPIs principales del sistema"""
-    # Fechas por defecto: últimos 30 días
+
+def _default_range(start_date: Optional[date], end_date: Optional[date]):
+    """Fechas por defecto: últimos 30 días"""
     if not end_date:
         end_date = date.today()
     if not start_date:
         start_date = end_date - timedelta(days=30)
-    
-    # Total de rutas
-    total_routes = db.query(RouteManifest).filter(
-        RouteManifest.date >= start_date,
-        RouteManifest.date <= end_date
-    ).count()
-    
-    # Rutas con problemas (DEBT)
-    problematic_routes = db.query(RouteManifest).filter(
-        RouteManifest.date >= start_date,
-        RouteManifest.date <= end_date,
-        RouteManifest.audit_status == AuditStatus.DEBT
-    ).count()
-    
-    # Total de garrafones procesados
-    total_bottles = db.query(
-        func.sum(RouteManifest.initial_full_bottles + RouteManifest.initial_empty_bottles)
-    ).filter(
-        RouteManifest.date >= start_date,
-        RouteManifest.date <= end_date
-    ).scalar() or 0
-    
-    # Total de deuda acumulada
-    total_debt = db.query(func.sum(RouteManifest.debt_amount)).filter(
-        RouteManifest.date >= start_date,
-        RouteManifest.date <= end_date,
-        RouteManifest.debt_amount > 0
-    ).scalar() or 0
-    
-    # Tasa de éxito (rutas sin problemas)
-    success_rate = ((total_routes - problematic_routes) / total_routes * 100) if total_routes > 0 else 100
-    
-    # Rutas de hoy
-    today_routes = db.query(RouteManifest).filter(
-        RouteManifest.date == date.today()
-    ).count()
-    
-    # Rutas activas (en progreso)
-    active_routes = db.query(RouteManifest).filter(
-        RouteManifest.audit_status == AuditStatus.IN_PROGRESS
-    ).count()
-    
+    return start_date, end_date
+
+
+def _cached(db: Session, name: str, params: tuple, compute):
+    """
+    Sirve el reporte desde el cache si los datos no cambiaron.
+    La fecha de hoy va en la llave porque los rangos por defecto dependen de ella;
+    las versiones son las de la instantánea de la petición (get_read_db).
+    """
+    return report_cache.get_or_compute(
+        (name, params, date.today()), REPORT_TABLES, compute, versions=db.info.get("data_versions")
+    )
+
+
+# --- CONSULTAS (se ejecutan solo cuando el cache no tiene el resultado) ---
+
+def _kpi_engine(db: Session, start_date: date, end_date: date):
+    """Una sola pasada compartida por kpis y status/distribution (y cacheada para ambos)"""
+    return _cached(db, "kpi_engine", (start_date, end_date), lambda: compute_kpis(db, start_date, end_date))
+
+
+def _kpis_report(db: Session, start_date: date, end_date: date):
+    # Todas las cifras salen de una sola pasada de agregación condicional
+    kpis = _kpi_engine(db, start_date, end_date)
+
     return {
-        "total_routes": total_routes,
-        "problematic_routes": problematic_routes,
-        "total_bottles": int(total_bottles),
-        "total_debt": float(total_debt),
-        "success_rate": round(success_rate, 2),
-        "today_routes": today_routes,
-        "active_routes": active_routes,
+        "total_routes": kpis["total_routes"],
+        "problematic_routes": kpis["problematic_routes"],
+        "total_bottles": kpis["total_bottles"],
+        "total_debt": kpis["total_debt"],
+        "success_rate": kpis["success_rate"],
+        "today_routes": kpis["today_routes"],
+        "active_routes": kpis["active_routes"],
         "period": {
             "start": start_date.isoformat(),
             "end": end_date.isoformat()
@@ -84,30 +70,26 @@ async def get_kpis(
     }
 
 
-@router.get("/trends/daily")
-async def get_daily_trends(
-    days: int = Query(30, le=365, ge=7),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Tendencias diarias de rutas y problemas"""
-    start_date = date.today() - timedelta(days=days)
-    
-    # Rutas por día
+def _daily_trends_report(db: Session, start_date: date):
+    # Rutas por día (desde los acumulados diarios, no desde los manifiestos)
     routes_by_day = db.query(
-        RouteManifest.date,
-        func.count(RouteManifest.id).label('total'),
-        # 2. CORRECCIÓN CRÍTICA: Usamos Integer explícitamente
-        func.sum(func.cast(RouteManifest.audit_status == AuditStatus.DEBT, Integer)).label('with_debt'),
-        func.sum(RouteManifest.debt_amount).label('debt_amount')
+        DailyStatusRollup.date,
+        func.sum(DailyStatusRollup.route_count).label('total'),
+        func.sum(case(
+            (DailyStatusRollup.audit_status == AuditStatus.DEBT, DailyStatusRollup.route_count),
+            else_=0
+        )).label('with_debt'),
+        func.sum(DailyStatusRollup.debt_amount).label('debt_amount')
     ).filter(
-        RouteManifest.date >= start_date
+        DailyStatusRollup.date >= start_date
     ).group_by(
-        RouteManifest.date
+        DailyStatusRollup.date
+    ).having(
+        func.sum(DailyStatusRollup.route_count) > 0
     ).order_by(
-        RouteManifest.date
+        DailyStatusRollup.date
     ).all()
-    
+
     return {
         "trends": [
             {
@@ -121,37 +103,50 @@ async def get_daily_trends(
     }
 
 
-@router.get("/trucks/performance")
-async def get_truck_performance(
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Rendimiento por camioneta"""
-    if not end_date:
-        end_date = date.today()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
-    
+def _truck_performance_report(db: Session, start_date: date, end_date: date):
+    snapshot = columnar_store.snapshot(db)
+    if snapshot is not None:
+        totals = snapshot.truck_totals(start_date, end_date)
+        trucks = {
+            truck.id: truck
+            for truck in db.query(Truck).filter(Truck.id.in_([t["id"] for t in totals])).all()
+        }
+        return {
+            "trucks": [
+                {
+                    "truck_id": t["id"],
+                    "nickname": trucks[t["id"]].nickname,
+                    "plate": trucks[t["id"]].plate,
+                    "total_routes": t["total_routes"],
+                    "problematic_routes": t["problematic_routes"],
+                    "total_debt": t["total_debt"],
+                    "total_bottles_delivered": t["total_bottles_delivered"],
+                    "success_rate": _success_rate(t["total_routes"], t["problematic_routes"])
+                }
+                for t in totals
+                if t["id"] in trucks
+            ]
+        }
+
     truck_stats = db.query(
         Truck.id,
         Truck.nickname,
         Truck.plate,
-        func.count(RouteManifest.id).label('total_routes'),
-        # 3. CORRECCIÓN TAMBIÉN AQUÍ
-        func.sum(func.cast(RouteManifest.audit_status == AuditStatus.DEBT, Integer)).label('problematic_routes'),
-        func.sum(RouteManifest.debt_amount).label('total_debt'),
-        func.sum(RouteManifest.initial_full_bottles).label('total_bottles_delivered')
+        func.sum(DailyTruckRollup.route_count).label('total_routes'),
+        func.sum(DailyTruckRollup.problematic_routes).label('problematic_routes'),
+        func.sum(DailyTruckRollup.debt_amount).label('total_debt'),
+        func.sum(DailyTruckRollup.full_bottles).label('total_bottles_delivered')
     ).join(
-        RouteManifest, RouteManifest.truck_id == Truck.id
+        DailyTruckRollup, DailyTruckRollup.truck_id == Truck.id
     ).filter(
-        RouteManifest.date >= start_date,
-        RouteManifest.date <= end_date
+        DailyTruckRollup.date >= start_date,
+        DailyTruckRollup.date <= end_date
     ).group_by(
         Truck.id, Truck.nickname, Truck.plate
+    ).having(
+        func.sum(DailyTruckRollup.route_count) > 0
     ).all()
-    
+
     return {
         "trucks": [
             {
@@ -162,51 +157,63 @@ async def get_truck_performance(
                 "problematic_routes": row.problematic_routes or 0,
                 "total_debt": float(row.total_debt or 0),
                 "total_bottles_delivered": row.total_bottles_delivered or 0,
-                "success_rate": round(
-                    ((row.total_routes - (row.problematic_routes or 0)) / row.total_routes * 100)
-                    if row.total_routes > 0 else 100,
-                    2
-                )
+                "success_rate": _success_rate(row.total_routes, row.problematic_routes or 0)
             }
             for row in truck_stats
         ]
     }
 
 
-@router.get("/drivers/performance")
-async def get_driver_performance(
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    limit: int = Query(10, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Rendimiento por chofer"""
-    if not end_date:
-        end_date = date.today()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
-    
+def _driver_performance_report(db: Session, start_date: date, end_date: date, limit: int):
+    snapshot = columnar_store.snapshot(db)
+    if snapshot is not None:
+        totals = snapshot.driver_totals(start_date, end_date)
+        names = dict(
+            db.query(User.id, User.full_name).filter(
+                User.id.in_([d["id"] for d in totals]),
+                User.role == UserRole.CHOFER
+            ).all()
+        )
+        ranked = sorted(
+            (d for d in totals if d["id"] in names),
+            key=lambda d: (-d["total_routes"], d["id"])
+        )[:limit]
+        return {
+            "drivers": [
+                {
+                    "driver_id": d["id"],
+                    "full_name": names[d["id"]],
+                    "total_routes": d["total_routes"],
+                    "problematic_routes": d["problematic_routes"],
+                    "total_debt": d["total_debt"],
+                    "total_bottles_delivered": d["total_bottles_delivered"],
+                    "success_rate": _success_rate(d["total_routes"], d["problematic_routes"])
+                }
+                for d in ranked
+            ]
+        }
+
     driver_stats = db.query(
         User.id,
         User.full_name,
-        func.count(RouteManifest.id).label('total_routes'),
-        # 4. CORRECCIÓN TAMBIÉN AQUÍ
-        func.sum(func.cast(RouteManifest.audit_status == AuditStatus.DEBT, Integer)).label('problematic_routes'),
-        func.sum(RouteManifest.debt_amount).label('total_debt'),
-        func.sum(RouteManifest.initial_full_bottles).label('total_bottles_delivered')
+        func.sum(DailyDriverRollup.route_count).label('total_routes'),
+        func.sum(DailyDriverRollup.problematic_routes).label('problematic_routes'),
+        func.sum(DailyDriverRollup.debt_amount).label('total_debt'),
+        func.sum(DailyDriverRollup.full_bottles).label('total_bottles_delivered')
     ).join(
-        RouteManifest, RouteManifest.driver_id == User.id
+        DailyDriverRollup, DailyDriverRollup.driver_id == User.id
     ).filter(
-        RouteManifest.date >= start_date,
-        RouteManifest.date <= end_date,
-        User.role == 'driver'
+        DailyDriverRollup.date >= start_date,
+        DailyDriverRollup.date <= end_date,
+        User.role == UserRole.CHOFER
     ).group_by(
         User.id, User.full_name
+    ).having(
+        func.sum(DailyDriverRollup.route_count) > 0
     ).order_by(
         desc('total_routes')
     ).limit(limit).all()
-    
+
     return {
         "drivers": [
             {
@@ -216,74 +223,39 @@ async def get_driver_performance(
                 "problematic_routes": row.problematic_routes or 0,
                 "total_debt": float(row.total_debt or 0),
                 "total_bottles_delivered": row.total_bottles_delivered or 0,
-                "success_rate": round(
-                    ((row.total_routes - (row.problematic_routes or 0)) / row.total_routes * 100)
-                    if row.total_routes > 0 else 100,
-                    2
-                )
+                "success_rate": _success_rate(row.total_routes, row.problematic_routes or 0)
             }
             for row in driver_stats
         ]
     }
 
 
-@router.get("/status/distribution")
-async def get_status_distribution(
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Distribución de estados de rutas"""
-    if not end_date:
-        end_date = date.today()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
-    
-    status_distribution = db.query(
-        RouteManifest.audit_status,
-        func.count(RouteManifest.id).label('count')
-    ).filter(
-        RouteManifest.date >= start_date,
-        RouteManifest.date <= end_date
-    ).group_by(
-        RouteManifest.audit_status
-    ).all()
-    
+def _status_distribution_report(db: Session, start_date: date, end_date: date):
+    # Comparte el motor de KPIs: la distribución sale de la misma pasada
+    kpis = _kpi_engine(db, start_date, end_date)
+
     return {
-        "distribution": [
-            {
-                "status": row.audit_status.value,
-                "count": row.count
-            }
-            for row in status_distribution
-        ]
+        "distribution": status_distribution(kpis)
     }
 
 
-@router.get("/monthly/summary")
-async def get_monthly_summary(
-    months: int = Query(12, le=24, ge=1),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Resumen mensual de operaciones"""
-    start_date = date.today() - timedelta(days=months * 30)
-    
+def _monthly_summary_report(db: Session, start_date: date):
     monthly_data = db.query(
-        func.extract('year', RouteManifest.date).label('year'),
-        func.extract('month', RouteManifest.date).label('month'),
-        func.count(RouteManifest.id).label('total_routes'),
-        func.sum(RouteManifest.initial_full_bottles).label('total_bottles'),
-        func.sum(RouteManifest.debt_amount).label('total_debt')
+        func.extract('year', DailyStatusRollup.date).label('year'),
+        func.extract('month', DailyStatusRollup.date).label('month'),
+        func.sum(DailyStatusRollup.route_count).label('total_routes'),
+        func.sum(DailyStatusRollup.full_bottles).label('total_bottles'),
+        func.sum(DailyStatusRollup.debt_amount).label('total_debt')
     ).filter(
-        RouteManifest.date >= start_date
+        DailyStatusRollup.date >= start_date
     ).group_by(
         'year', 'month'
+    ).having(
+        func.sum(DailyStatusRollup.route_count) > 0
     ).order_by(
         'year', 'month'
     ).all()
-    
+
     return {
         "monthly": [
             {
@@ -295,4 +267,220 @@ async def get_monthly_summary(
             }
             for row in monthly_data
         ]
-    }
\ No newline at end of file
+    }
+
+
+def _today_routes_report(db: Session):
+    """
+    Rutas de hoy con el mismo formato que GET /routes (RouteListPage): `total`
+    es el tamaño de la página y `next_cursor` continúa en GET /routes si hay más.
+    """
+    today = date.today()
+    page = list_routes_page(db, today, today, limit=TODAY_ROUTES_LIMIT)
+    return RouteListPage.model_validate(page).model_dump(mode="json")
+
+
+# Rutas de hoy en el dashboard: una página del listado (máximo de GET /routes)
+TODAY_ROUTES_LIMIT = 500
+
+# Secciones disponibles en /dashboard
+DASHBOARD_SECTIONS = ("kpis", "trends", "distribution", "today_routes", "trucks", "drivers", "monthly")
+DEFAULT_DASHBOARD_FIELDS = "kpis,trends,distribution,today_routes"
+
+
+# --- ENDPOINTS ---
+
+@router.get("/kpis")
+def get_kpis(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = report_etag
+):
+    """KPIs principales del sistema"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return _cached(db, "kpis", (start_date, end_date), lambda: _kpis_report(db, start_date, end_date))
+
+
+@router.get("/trends/daily")
+def get_daily_trends(
+    days: int = Query(30, le=365, ge=7),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = report_etag
+):
+    """Tendencias diarias de rutas y problemas"""
+    start_date = date.today() - timedelta(days=days)
+    return _cached(db, "trends/daily", (start_date,), lambda: _daily_trends_report(db, start_date))
+
+
+@router.get("/trucks/performance")
+def get_truck_performance(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = report_etag
+):
+    """Rendimiento por camioneta"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return _cached(
+        db, "trucks/performance", (start_date, end_date),
+        lambda: _truck_performance_report(db, start_date, end_date)
+    )
+
+
+@router.get("/drivers/performance")
+def get_driver_performance(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(10, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = report_etag
+):
+    """Rendimiento por chofer"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return _cached(
+        db, "drivers/performance", (start_date, end_date, limit),
+        lambda: _driver_performance_report(db, start_date, end_date, limit)
+    )
+
+
+@router.get("/status/distribution")
+def get_status_distribution(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = report_etag
+):
+    """Distribución de estados de rutas"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return _cached(
+        db, "status/distribution", (start_date, end_date),
+        lambda: _status_distribution_report(db, start_date, end_date)
+    )
+
+
+@router.get("/monthly/summary")
+def get_monthly_summary(
+    months: int = Query(12, le=24, ge=1),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = report_etag
+):
+    """Resumen mensual de operaciones"""
+    start_date = date.today() - timedelta(days=months * 30)
+    return _cached(db, "monthly/summary", (start_date,), lambda: _monthly_summary_report(db, start_date))
+
+
+@router.get("/dashboard")
+def get_dashboard(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    days: int = Query(30, le=365, ge=7),
+    months: int = Query(12, le=24, ge=1),
+    limit: int = Query(10, le=100),
+    fields: str = Query(DEFAULT_DASHBOARD_FIELDS, description="Secciones separadas por coma"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = report_etag
+):
+    """
+    Dashboard completo en una sola petición.
+    Todas las secciones se leen de la misma instantánea (get_read_db);
+    `fields` limita la respuesta a lo que la página muestra.
+    """
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(requested) - set(DASHBOARD_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Secciones desconocidas: {', '.join(sorted(unknown))}. Disponibles: {', '.join(DASHBOARD_SECTIONS)}"
+        )
+
+    start_date, end_date = _default_range(start_date, end_date)
+    today = date.today()
+
+    builders = {
+        "kpis": lambda: _cached(
+            db, "kpis", (start_date, end_date), lambda: _kpis_report(db, start_date, end_date)
+        ),
+        "trends": lambda: _cached(
+            db, "trends/daily", (today - timedelta(days=days),),
+            lambda: _daily_trends_report(db, today - timedelta(days=days))
+        ),
+        "distribution": lambda: _cached(
+            db, "status/distribution", (start_date, end_date),
+            lambda: _status_distribution_report(db, start_date, end_date)
+        ),
+        "today_routes": lambda: _cached(db, "today_routes", (), lambda: _today_routes_report(db)),
+        "trucks": lambda: _cached(
+            db, "trucks/performance", (start_date, end_date),
+            lambda: _truck_performance_report(db, start_date, end_date)
+        ),
+        "drivers": lambda: _cached(
+            db, "drivers/performance", (start_date, end_date, limit),
+            lambda: _driver_performance_report(db, start_date, end_date, limit)
+        ),
+        "monthly": lambda: _cached(
+            db, "monthly/summary", (today - timedelta(days=months * 30),),
+            lambda: _monthly_summary_report(db, today - timedelta(days=months * 30))
+        ),
+    }
+    return {section: builders[section]() for section in requested}
+
+
+# --- FEDERACIÓN (todas las plantas registradas, ver services/federation) ---
+
+@router.get("/federated/kpis")
+def get_federated_kpis(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """KPIs del grupo: suma de todas las plantas"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return federation.federated_kpis(start_date, end_date)
+
+
+@router.get("/federated/trends/daily")
+def get_federated_trends(
+    days: int = Query(30, le=365, ge=7),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Tendencias diarias del grupo"""
+    return federation.federated_trends(date.today() - timedelta(days=days))
+
+
+@router.get("/federated/trucks/performance")
+def get_federated_truck_performance(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Ranking de camionetas de todas las plantas"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return federation.federated_trucks(start_date, end_date)
+
+
+@router.get("/federated/drivers/performance")
+def get_federated_driver_performance(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(10, le=100),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Ranking de choferes de todas las plantas"""
+    start_date, end_date = _default_range(start_date, end_date)
+    return federation.federated_drivers(start_date, end_date, limit)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Contadores del cache de reportes (aciertos, fallos, desalojos)"""
+    return report_cache.stats()
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from loguru import logger
 import uuid
 from pydantic import BaseModel
 from typing import Optional
@@ -8,11 +8,24 @@ from typing import Optional
 from app.database import get_db
 from app.models.user import User
 from app.models.truck import Truck
+from app.api.deps import conditional_get
+from app.api.v1.auth import get_current_active_user
+from app.services.unit_of_work import UnitOfWork, get_uow
+from app.services.audit_service import log_activity
 
-# Configuración de hash
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-def get_password_hash(password):
-    return pwd_context.hash(password)
+from app.utils.security import get_password_hash
+from app.services.password_pool import PasswordPoolBusy
+
+# Contraseña inicial de los choferes: se hashea una sola vez por proceso
+DEFAULT_DRIVER_PASSWORD = "driver123"
+_default_driver_hash = None
+
+
+def default_driver_hash() -> str:
+    global _default_driver_hash
+    if _default_driver_hash is None:
+        _default_driver_hash = get_password_hash(DEFAULT_DRIVER_PASSWORD)
+    return _default_driver_hash
 
 router = APIRouter()
 
@@ -31,14 +44,20 @@ class TruckCreate(BaseModel):
 # --- ENDPOINTS ---
 
 @router.get("/drivers")
-def get_active_drivers(db: Session = Depends(get_db)):
+def get_active_drivers(
+    db: Session = Depends(get_db),
+    _etag: None = Depends(conditional_get(["users"]))
+):
     # Filtramos por el rol correcto en la DB: "CHOFER"
     return db.query(User).filter(User.role == "CHOFER", User.is_active == True).all()
 
 @router.post("/drivers")
-def create_driver(driver: DriverCreate, db: Session = Depends(get_db)):
-    print(f"\n👇 PETICIÓN DE CREACIÓN RECIBIDA 👇")
-
+def create_driver(
+    request: Request,
+    driver: DriverCreate,
+    uow: UnitOfWork = Depends(get_uow),
+    current_user: User = Depends(get_current_active_user)
+):
     try:
         # 1. Generación de datos automáticos
         unique_id = str(uuid.uuid4())[:8]
@@ -50,7 +69,7 @@ def create_driver(driver: DriverCreate, db: Session = Depends(get_db)):
         final_email = driver.email if driver.email else f"{generated_username}@waterlog.local"
         
         # 2. Contraseña por defecto
-        hashed_pw = get_password_hash("driver123")
+        hashed_pw = default_driver_hash()
 
         new_driver = User(
             username=generated_username,
@@ -61,25 +80,41 @@ def create_driver(driver: DriverCreate, db: Session = Depends(get_db)):
             is_active=True
         )
         
-        db.add(new_driver)
-        db.commit()
-        db.refresh(new_driver)
-        
-        print(f" ✅ ÉXITO: Chofer creado: {new_driver.full_name}")
+        uow.add(new_driver)
+        uow.flush()  # ID para la bitácora
+        log_activity(uow.db, current_user.id, "DRIVER_CREATED", "User", new_driver.id,
+                     new_value={"username": new_driver.username, "full_name": new_driver.full_name,
+                                "email": new_driver.email, "role": "CHOFER"},
+                     request=request)
+        uow.commit()
+        uow.db.refresh(new_driver)
+
+        logger.info(f"Chofer creado: {new_driver.full_name} ({new_driver.username})")
         return new_driver
         
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, reintentar", headers={"Retry-After": "1"})
     except Exception as e:
-        print(f" ❌ ERROR EN BASE DE DATOS: {str(e)}")
-        db.rollback()
+        logger.error(f"Error creando chofer: {e}")
+        uow.rollback()
         # Si el error es por duplicado u otra cosa, lo informamos bien
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @router.get("/trucks")
-def get_active_trucks(db: Session = Depends(get_db)):
+def get_active_trucks(
+    db: Session = Depends(get_db),
+    _etag: None = Depends(conditional_get(["trucks"]))
+):
     return db.query(Truck).filter(Truck.is_active == True).all()
 
 @router.post("/trucks")
-def create_truck(truck: TruckCreate, db: Session = Depends(get_db)):
+def create_truck(
+    request: Request,
+    truck: TruckCreate,
+    uow: UnitOfWork = Depends(get_uow),
+    current_user: User = Depends(get_current_active_user)
+):
+    db = uow.db
     if db.query(Truck).filter(Truck.plate == truck.plate).first():
         raise HTTPException(status_code=400, detail="Esa placa ya está registrada")
     
@@ -91,7 +126,10 @@ def create_truck(truck: TruckCreate, db: Session = Depends(get_db)):
         year=truck.year,
         is_active=True
     )
-    db.add(new_truck)
-    db.commit()
+    uow.add(new_truck)
+    uow.flush()  # ID para la bitácora
+    log_activity(db, current_user.id, "TRUCK_CREATED", "Truck", new_truck.id,
+                 new_value=truck.model_dump(), request=request)
+    uow.commit()
     db.refresh(new_truck)
     return new_truck
\ No newline at end of file
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+import json
 
 from app.database import get_db
 from app.models.user import User
 from app.models.route_manifest import RouteManifest, AuditStatus
-from app.models.client import Client
-from app.models.sales_detail import SalesDetail
 from app.api.v1.auth import get_current_active_user
-from app.services.reconciliation_service import reconcile_route
+from app.api.deps import conditional_get
 from app.services.audit_service import log_activity
+from app.services.rollup_service import record_route_change
+from app.services.columnar_store import columnar_store
+from app.services.unit_of_work import UnitOfWork, get_uow
+from app.services import route_service
+from app.services.route_service import list_routes_page, InvalidCursor
+from app.utils.timing import PhaseTimer
+from app.schemas.route import RouteListPage
 from app.config import settings
 
 router = APIRouter()
@@ -27,6 +34,9 @@ class CheckoutSchema(BaseModel):
     truck_id: int
     initial_full_bottles: int
 
+class CheckoutBatchSchema(BaseModel):
+    entries: List[CheckoutSchema] = Field(..., min_length=1, max_length=500)
+
 class CheckinSchema(BaseModel):
     returned_full_bottles: int
     returned_empty_bottles: int
@@ -35,32 +45,62 @@ class CheckinSchema(BaseModel):
     notes: Optional[str] = None
     sales: List[SaleItemSchema] = [] # <--- LISTA DE VENTAS
 
+class CheckinBatchItem(CheckinSchema):
+    route_id: int
+    client_timestamp: datetime  # Hora de captura en el depósito
+
+class CheckinBatchSchema(BaseModel):
+    items: List[CheckinBatchItem] = Field(..., min_length=1, max_length=settings.CHECKIN_BATCH_MAX_ITEMS)
+
 # --- ENDPOINTS ---
 
-# ... (El endpoint de list_routes y checkout se quedan igual que antes) ...
-@router.get("/")
-async def list_routes(
-    date_filter: date = None,
+@router.get("/", response_model=RouteListPage)
+def list_routes(
+    date_filter: Optional[date] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[List[AuditStatus]] = Query(None),
+    truck_id: Optional[int] = None,
+    driver_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    include_sales: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    _etag: None = Depends(conditional_get(["route_manifests", "users", "trucks", "sales_details"]))
 ):
-    query = db.query(RouteManifest)
+    """
+    Listado de rutas con filtros y paginación por cursor.
+    Sin fechas devuelve las de hoy; `date_filter` equivale a start_date = end_date.
+    Devuelve como mucho `limit` filas (`total` cuenta las de esta página): quien
+    necesite el rango completo sigue `next_cursor` (ver routesApi.listRoutes).
+    """
     if date_filter:
-        query = query.filter(RouteManifest.date == date_filter)
-    else:
-        query = query.filter(RouteManifest.date == date.today())
-    routes = query.all()
-    
-    # Simplificamos la respuesta para la lista
-    return {"total": len(routes), "routes": routes}
+        start_date = end_date = date_filter
+    if not start_date and not end_date:
+        start_date = end_date = date.today()
+    start_date = start_date or date.min
+    end_date = end_date or date.max
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date debe ser anterior a end_date")
+
+    try:
+        return list_routes_page(
+            db, start_date, end_date,
+            statuses=status, truck_id=truck_id, driver_id=driver_id,
+            cursor=cursor, limit=limit, include_sales=include_sales
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 @router.post("/checkout")
-async def checkout_route(
+def checkout_route(
     request: Request,
     data: CheckoutSchema, 
-    db: Session = Depends(get_db),
+    uow: UnitOfWork = Depends(get_uow),
     current_user: User = Depends(get_current_active_user)
 ):
+    db = uow.db
     now = datetime.now()
     new_route = RouteManifest(
         driver_id=data.driver_id,
@@ -72,85 +112,93 @@ async def checkout_route(
         date=now.date(),
         checkout_timestamp=now
     )
-    db.add(new_route)
-    db.commit()
-    db.refresh(new_route)
-    
+    uow.add(new_route)
+    uow.flush()  # ID para la bitácora
+    # Acumulados diarios y auditoría en la misma transacción que la ruta
+    record_route_change(db, None, new_route)
     log_activity(db, current_user.id, "ROUTE_CHECKOUT", "RouteManifest", new_route.id, f"Salida ruta {new_route.id}", request=request)
+    uow.commit()
+    db.refresh(new_route)
+    columnar_store.routes_committed([new_route])
 
     return {"message": "Ruta iniciada", "route_id": new_route.id}
 
 
+@router.post("/checkout/batch")
+def checkout_batch(
+    request: Request,
+    data: CheckoutBatchSchema,
+    uow: UnitOfWork = Depends(get_uow),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Salida de la flota completa en una petición y un commit.
+    Cada entrada se valida por separado; las rechazadas no impiden las demás.
+    """
+    db = uow.db
+    results, routes = route_service.checkout_batch(db, data.entries, current_user.id)
+    for route in routes:
+        log_activity(db, current_user.id, "ROUTE_CHECKOUT", "RouteManifest", route.id, f"Salida ruta {route.id}", request=request)
+    uow.commit()
+    if routes:
+        # Recargar las rutas expiradas por el commit en un solo SELECT
+        routes = db.query(RouteManifest).filter(RouteManifest.id.in_([r.id for r in routes])).all()
+    columnar_store.routes_committed(routes)
+
+    return {
+        "created": len(routes),
+        "rejected": len(results) - len(routes),
+        "results": results
+    }
+
+
 # === EL CHECK-IN BRUTAL ===
 @router.post("/{route_id}/checkin")
-async def checkin_route(
+def checkin_route(
     request: Request,
+    response: Response,
     route_id: int,
     data: CheckinSchema, 
-    db: Session = Depends(get_db),
+    uow: UnitOfWork = Depends(get_uow),
     current_user: User = Depends(get_current_active_user)
 ):
-    route = db.query(RouteManifest).filter(RouteManifest.id == route_id).first()
+    db = uow.db
+    timer = PhaseTimer()
+    with timer.phase("load"):
+        route = db.query(RouteManifest).filter(RouteManifest.id == route_id).first()
     if not route:
         raise HTTPException(status_code=404, detail="Ruta no encontrada")
 
-    # 1. Procesar Ventas y Calcular Dinero
-    total_sales_money = 0.0
-    total_units_sold = 0
-    
-    # Limpiar detalles anteriores si hubiera (por si reintentan el checkin)
-    db.query(SalesDetail).filter(SalesDetail.route_id == route.id).delete()
-
-    for item in data.sales:
-        # Buscar precio del cliente
-        client = db.query(Client).filter(Client.id == item.client_id).first()
-        if not client:
-            continue # O lanzar error
-            
-        # Lógica de Precio: Si tiene precio especial usalo, si no, usa el global
-        final_price = client.special_price if client.special_price is not None else settings.BOTTLE_PRICE
-        
-        subtotal = item.quantity * final_price
-        
-        # Guardar Detalle
-        detail = SalesDetail(
-            route_id=route.id,
-            client_id=client.id,
-            quantity=item.quantity,
-            unit_price=final_price,
-            subtotal=subtotal
-        )
-        db.add(detail)
-        
-        total_sales_money += subtotal
-        total_units_sold += item.quantity
-
-    # 2. Actualizar Ruta
-    route.returned_full_bottles = data.returned_full_bottles
-    route.returned_empty_bottles = data.returned_empty_bottles
-    route.reported_damaged = data.reported_damaged
-    route.evidence_verified = 1 if data.evidence_verified else 0
-    route.notes = data.notes
-    route.checkin_by_user_id = current_user.id
-    route.checkin_timestamp = datetime.now()
-
-    # 3. Conciliar (Usando el nuevo servicio)
-    result = reconcile_route(
-        route=route,
-        returned_full=data.returned_full_bottles,
-        returned_empty=data.returned_empty_bottles,
-        reported_damaged=data.reported_damaged,
-        calculated_sales_total=total_sales_money,
-        total_units_sold_reported=total_units_sold
-    )
-
-    route.audit_status = result["status"]
-    route.debt_amount = result["debt"]
-
-    db.commit()
-    db.refresh(route)
+    result = route_service.checkin_route(db, route, data, current_user.id, timer=timer)
 
     # Auditoría
     log_activity(db, current_user.id, "ROUTE_CHECKIN", "RouteManifest", route.id, result["message"], request=request)
 
-    return result
\ No newline at end of file
+    with timer.phase("commit"):
+        uow.commit()
+        db.refresh(route)
+    columnar_store.routes_committed([route])
+
+    response.headers["Server-Timing"] = timer.server_timing()
+    return result
+
+
+@router.post("/checkin/batch")
+async def checkin_batch(
+    request: Request,
+    data: CheckinBatchSchema,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Ingesta de check-ins acumulados sin conexión.
+    Se aplican en orden de captura, con commit cada CHECKIN_BATCH_CHUNK_SIZE,
+    y el resultado de cada uno se envía como una línea NDJSON.
+    """
+    outcomes = route_service.ingest_checkins(
+        data.items, current_user.id, request=request,
+        chunk_size=settings.CHECKIN_BATCH_CHUNK_SIZE
+    )
+    return StreamingResponse(
+        (json.dumps(outcome, ensure_ascii=False) + "\n" for outcome in outcomes),
+        media_type="application/x-ndjson"
+    )
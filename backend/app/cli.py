@@ -0,0 +1,94 @@
+"""
+Comandos de mantenimiento de WaterLog
+Ejecutar: docker-compose exec backend python -m app.cli <comando>
+"""
+
+import argparse
+
+from app.database import SessionLocal, engine, Base
+import app.models  # noqa: F401  (registra todos los modelos en Base.metadata)
+from app.models.sales_detail import SalesDetail  # noqa: F401
+from app.models.client import Client  # noqa: F401
+
+
+def rebuild_rollups_command(args):
+    """Reconstruir los acumulados diarios desde route_manifests"""
+    from app.services.rollup_service import rebuild_rollups
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        counts = rebuild_rollups(db)
+        for table, rows in counts.items():
+            print(f"  ✓ {table}: {rows} filas")
+        print("✅ Acumulados reconstruidos")
+    finally:
+        db.close()
+
+
+def payroll_run_command(args):
+    """Deducir de nómina las deudas PENDING del periodo (reanuda si se interrumpió)"""
+    from datetime import date
+    from app.models.user import User
+    from app.services.payroll_service import run_payroll
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.user).first()
+        if user is None:
+            raise SystemExit(f"❌ Usuario no encontrado: {args.user}")
+        user_id = user.id
+    finally:
+        db.close()
+
+    def progress(run):
+        print(f"  ✓ {run.deducted_records} deudas (${run.deducted_amount:.2f})")
+
+    result = run_payroll(
+        date.fromisoformat(args.start), date.fromisoformat(args.end), user_id,
+        chunk_size=args.chunk_size, on_chunk=progress
+    )
+    print(f"✅ Corrida {result['id']}: {result['deducted_records']} deudas deducidas "
+          f"por ${result['deducted_amount']:.2f}")
+    print(f"   Estado de cuenta: {result['statement_path']}")
+
+
+def archive_audit_command(args):
+    """Sellar en archivos comprimidos los meses cerrados de la bitácora"""
+    from app.services.audit_archive import archive_closed_months, seal_month
+
+    Base.metadata.create_all(bind=engine)
+    if args.month:
+        sealed = [s for s in [seal_month(args.month)] if s]
+    else:
+        sealed = archive_closed_months()["sealed"]
+    for segment in sealed:
+        print(f"  ✓ {segment['month']}: {segment['row_count']} filas -> {segment['path']}")
+    print(f"✅ {len(sealed)} segmentos sellados")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Comandos de WaterLog")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subcommands.add_parser("rebuild-rollups", help="Backfill de los acumulados diarios")
+    rebuild.set_defaults(handler=rebuild_rollups_command)
+
+    payroll = subcommands.add_parser("payroll-run", help="Deducir de nómina las deudas del periodo")
+    payroll.add_argument("--start", required=True, help="Inicio del periodo (AAAA-MM-DD)")
+    payroll.add_argument("--end", required=True, help="Fin del periodo (AAAA-MM-DD)")
+    payroll.add_argument("--user", required=True, help="Usuario que autoriza (queda en la bitácora)")
+    payroll.add_argument("--chunk-size", type=int, default=None, help="Deudas por transacción")
+    payroll.set_defaults(handler=payroll_run_command)
+
+    archive = subcommands.add_parser("archive-audit", help="Sellar los meses cerrados de la bitácora")
+    archive.add_argument("--month", default=None, help="Solo este mes (AAAA-MM)")
+    archive.set_defaults(handler=archive_audit_command)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
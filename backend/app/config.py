@@ -12,6 +12,40 @@ class Settings(BaseSettings):
     # Base de datos
     DATABASE_URL: str = "sqlite:///./data/waterlog.db"
     
+    # Hilos para endpoints síncronos (todo acceso a la BD corre fuera del event loop)
+    DB_THREADPOOL_SIZE: int = 40
+    
+    # Pools de conexiones: escrituras/operación y reportes (engine de solo lectura) por separado
+    DB_WRITE_POOL_SIZE: int = 20
+    DB_WRITE_POOL_MAX_OVERFLOW: int = 10
+    DB_READ_POOL_SIZE: int = 8
+    DB_READ_POOL_MAX_OVERFLOW: int = 0
+    
+    # Métricas de latencia por endpoint (últimas N muestras de cada uno)
+    METRICS_LATENCY_WINDOW: int = 2048
+    
+    # Perfil de SQLite (PRAGMAs aplicados a cada conexión)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE_MB: int = 256
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_WRITE_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    # Solo aplica al crear la base (en una existente requiere un VACUUM completo)
+    SQLITE_AUTO_VACUUM: str = "INCREMENTAL"
+    
+    # Mantenimiento programado (ANALYZE, optimize, vacuum incremental, checkpoint, revisión de acumulados)
+    MAINTENANCE_ENABLED: bool = True
+    MAINTENANCE_WINDOW_START: str = "03:00"  # Hora local
+    MAINTENANCE_WINDOW_END: str = "05:00"
+    MAINTENANCE_BUDGET_SECONDS: float = 300.0
+    MAINTENANCE_POLL_SECONDS: float = 60.0
+    MAINTENANCE_WAL_MAX_MB: float = 64.0
+    MAINTENANCE_VACUUM_PAGES: int = 1000
+    MAINTENANCE_ANALYSIS_LIMIT: int = 1000
+    MAINTENANCE_REPAIR_ROLLUPS: bool = False
+    
     # Seguridad
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -21,9 +55,62 @@ class Settings(BaseSettings):
     PLANT_ID: int = 1
     PLANT_NAME: str = "Planta Centro"
     
+    # Federación: bases de otras plantas para los reportes de grupo
+    # Entradas "ID:Nombre:URL" (JSON en el .env); la planta local siempre participa
+    FEDERATION_PLANTS: List[str] = []
+    FEDERATION_WORKERS: int = 4
+    
     # Precios
     BOTTLE_PRICE: float = 60.00
     
+    # Cache de reportes (LRU + TTL, invalidado por versión de datos)
+    REPORT_CACHE_MAX_ENTRIES: int = 256
+    REPORT_CACHE_TTL_SECONDS: int = 300
+    
+    # Analítica columnar en memoria (requiere NumPy; sin él se usan los acumulados SQL)
+    ANALYTICS_COLUMNAR_ENABLED: bool = True
+    
+    # Exportaciones: filas por lote leído y enviado en el stream
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Nómina: deudas deducidas por transacción y carpeta de estados de cuenta
+    PAYROLL_CHUNK_SIZE: int = 1000
+    PAYROLL_STATEMENT_DIR: str = "./data/payroll"
+    
+    # Ingesta de check-ins por lotes (depósitos sin conexión estable)
+    CHECKIN_BATCH_MAX_ITEMS: int = 2000
+    CHECKIN_BATCH_CHUNK_SIZE: int = 50
+    
+    # Idempotency-Key en POST de rutas
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0
+    
+    # Auditoría asíncrona por lotes (desactivada: se escribe en la transacción del endpoint)
+    AUDIT_ASYNC_ENABLED: bool = False
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 0.5
+    AUDIT_SPOOL_PATH: str = "./data/audit_spool.ndjson"
+    AUDIT_DEAD_LETTER_PATH: str = "./data/audit_dead_letter.ndjson"  # Registros que no se pudieron insertar
+    AUDIT_WRITE_RETRIES: int = 5  # Intentos ante base bloqueada u ocupada
+    
+    # Bitácora por meses: meses que quedan en audit_logs (incluido el actual);
+    # los anteriores se sellan en archivos comprimidos de solo lectura
+    AUDIT_HOT_MONTHS: int = 1
+    AUDIT_ARCHIVE_DIR: str = "./data/audit_archive"
+    AUDIT_ARCHIVE_CACHE_FILES: int = 4
+    
+    # Contraseñas: bcrypt en un pool de procesos acotado (0 workers = en el mismo proceso)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_POOL_WORKERS: int = 2
+    PASSWORD_POOL_MAX_PENDING: int = 8
+    PASSWORD_POOL_TIMEOUT_SECONDS: float = 10.0
+    
+    # Cache de tokens verificados (se invalida al modificar el usuario)
+    AUTH_CACHE_MAX_ENTRIES: int = 1024
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    
     # API
     API_V1_PREFIX: str = "/api/v1"
     BACKEND_CORS_ORIGINS: List[str] = [
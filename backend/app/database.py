@@ -1,21 +1,179 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
+import threading
 from app.config import settings
 
-# Crear engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-    echo=settings.ENVIRONMENT == "development"  # Log SQL queries en dev
-)
 
-# Session factory
+def apply_sqlite_profile(engine, read_only: bool = False):
+    """
+    Perfil de rendimiento de SQLite (valores en Settings), aplicado a cada conexión:
+    WAL para que las lecturas no bloqueen escrituras, synchronous, busy_timeout,
+    caché de páginas, mmap, temporales en memoria y auto_vacuum (para el
+    vacuum incremental del mantenimiento). Con `read_only` la conexión
+    además queda en query_only (cualquier escritura falla).
+
+    pysqlite emite BEGIN (DEFERRED) justo antes del primer INSERT/UPDATE; cuando
+    la sesión abre la transacción con execution_options(sqlite_begin="IMMEDIATE")
+    (ver write_transaction) se emite BEGIN IMMEDIATE desde el inicio.
+    """
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only and cursor.execute("PRAGMA page_count").fetchone()[0] == 0:
+            # Solo en una base nueva (antes de crear tablas); en una existente
+            # escribiría el encabezado en cada conexión sin surtir efecto
+            cursor.execute(f"PRAGMA auto_vacuum={settings.SQLITE_AUTO_VACUUM}")
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_MB) * 1024 * 1024}")
+        cursor.execute(f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        if conn.get_execution_options().get("sqlite_begin") != "IMMEDIATE":
+            return
+        dbapi_connection = conn.connection.dbapi_connection
+        if not dbapi_connection.in_transaction:
+            dbapi_connection.execute("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def _create_engine(pool_size: int, max_overflow: int, **kwargs):
+    in_memory = settings.DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
+    return create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+        echo=settings.ENVIRONMENT == "development",  # Log SQL queries en dev
+        # SQLite en memoria usa un pool de una conexión por hilo, sin tamaño
+        **({} if in_memory else {"pool_size": pool_size, "max_overflow": max_overflow}),
+        **kwargs
+    )
+
+
+# Crear engine (escrituras y lecturas operativas)
+engine = _create_engine(settings.DB_WRITE_POOL_SIZE, settings.DB_WRITE_POOL_MAX_OVERFLOW)
+IS_SQLITE = engine.dialect.name == "sqlite"
+if IS_SQLITE:
+    apply_sqlite_profile(engine)
+
+# Engine de solo lectura para reportes: pool propio, así un escaneo largo no
+# ocupa las conexiones que necesitan los check-ins. En SQLite en memoria no
+# hay otro archivo que abrir y se comparte el engine.
+if settings.DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    read_engine = engine
+elif IS_SQLITE:
+    read_engine = apply_sqlite_profile(
+        _create_engine(settings.DB_READ_POOL_SIZE, settings.DB_READ_POOL_MAX_OVERFLOW), read_only=True
+    )
+else:
+    # Fuera de SQLite la instantánea por petición la da REPEATABLE READ
+    read_engine = _create_engine(
+        settings.DB_READ_POOL_SIZE, settings.DB_READ_POOL_MAX_OVERFLOW, isolation_level="REPEATABLE READ"
+    )
+
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Base para modelos
 Base = declarative_base()
 
+# Registra los eventos de sesión que versionan las tablas modificadas
+from app.services import data_version  # noqa: E402
+
+
+def begin_read_snapshot(db):
+    """
+    Abre explícitamente la transacción de lectura de la sesión.
+    pysqlite no emite BEGIN antes de un SELECT, así que cada consulta vería
+    su propio estado de la base; con BEGIN todas las lecturas siguientes
+    comparten la misma instantánea hasta que la sesión se cierra.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    dbapi_connection = db.connection().connection.dbapi_connection
+    if not dbapi_connection.in_transaction:
+        dbapi_connection.execute("BEGIN")
+
+
+class WriteQueueTimeout(Exception):
+    """No se obtuvo turno de escritura dentro del tiempo configurado"""
+
+
+class WriteQueue:
+    """
+    Cola de un solo escritor. SQLite admite un escritor a la vez: en lugar de
+    que las transacciones concurrentes choquen ("database is locked"), cada
+    una espera su turno aquí, en orden de llegada.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._turns = threading.Condition(self._lock)
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()  # Turnos cuyo dueño se cansó de esperar
+        self.waits = 0
+
+    def acquire(self, timeout: float = None) -> bool:
+        with self._lock:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            if ticket != self._serving:
+                self.waits += 1
+            if not self._turns.wait_for(lambda: ticket == self._serving, timeout):
+                # Saltar este turno cuando llegue, para no bloquear la fila
+                self._abandoned.add(ticket)
+                return False
+            return True
+
+    def release(self):
+        with self._lock:
+            self._serving += 1
+            while self._serving in self._abandoned:
+                self._abandoned.discard(self._serving)
+                self._serving += 1
+            self._turns.notify_all()
+
+
+write_queue = WriteQueue()
+
+
+@contextmanager
+def write_transaction(db, timeout: float = None):
+    """
+    Turno exclusivo de escritura para la sesión: espera en la cola y abre la
+    transacción con BEGIN IMMEDIATE (el candado de SQLite se toma al inicio,
+    no a mitad de la transacción). El turno se libera al salir del bloque.
+    En otros motores no hace nada.
+    """
+    if not IS_SQLITE:
+        yield
+        return
+    timeout = settings.SQLITE_WRITE_QUEUE_TIMEOUT_SECONDS if timeout is None else timeout
+    if not write_queue.acquire(timeout):
+        raise WriteQueueTimeout()
+    try:
+        begin_immediate(db)
+        yield
+    finally:
+        write_queue.release()
+
+
+def begin_immediate(db):
+    """Abrir la transacción de escritura de la sesión (requiere el turno de write_queue)"""
+    if db.in_transaction():
+        db.rollback()  # Descarta una lectura previa: su instantánea podría quedar vieja
+    db.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+
 
 # Dependency para obtener DB session
 def get_db():
@@ -27,4 +185,22 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    """
+    Dependency de solo lectura para reportes (engine y pool propios).
+    Toda la petición lee una sola instantánea; las versiones de datos se fijan
+    ANTES de abrirla (ya con los commits de otros procesos, ver
+    data_version.sync), así lo que se cachee con ellas nunca es más viejo
+    que su llave (ver report_cache).
+    """
+    db = ReadSessionLocal()
+    try:
+        data_version.sync(db)
+        db.info["data_versions"] = data_version.all_versions()
+        begin_read_snapshot(db)
+        yield db
+    finally:
+        db.close()
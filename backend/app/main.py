@@ -1,24 +1,38 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 from loguru import logger
+import anyio
 import time
 
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, read_engine, Base, IS_SQLITE
+from app.api.deps import NotModified
+from app.services.unit_of_work import start_request_stats
+from app.services.audit_writer import audit_writer
+from app.services.idempotency import idempotency_middleware
+from app.services.password_pool import password_pool
+from app.services.federation import federation
+from app.services.latency_metrics import latency_recorder
+from app.services.maintenance import maintenance
 
 # --- IMPORTANTE: Importar TODOS los modelos para que create_all los detecte ---
-from app.models.user import User
+from app.models.user import User, UserRole
 from app.models.truck import Truck 
 from app.models.route_manifest import RouteManifest
 from app.models.audit_log import AuditLog
+from app.models.audit_archive import AuditArchive
 from app.models.debt_record import DebtRecord 
+from app.models.debt_balance import DriverDebtBalance, DriverDebtAging
+from app.models.payroll_run import PayrollRun
 from app.models.client import Client
 from app.models.sales_detail import SalesDetail # <--- IMPRESCINDIBLE
+from app.models.daily_rollup import DailyStatusRollup, DailyTruckRollup, DailyDriverRollup
 
 # Routers
-from app.api.v1 import auth, reports, routes, resources, clients
+from app.api.v1 import auth, reports, routes, resources, clients, exports, debts, payroll, audit
+from app.api.v1.auth import get_current_active_user
 
 # Configurar logger
 logger.add(
@@ -35,13 +49,26 @@ async def lifespan(app: FastAPI):
     logger.info(f"Iniciando WaterLog - Planta {settings.PLANT_ID}")
     logger.info(f"Entorno: {settings.ENVIRONMENT}")
     
+    # Los endpoints que usan la BD son `def`: FastAPI los corre en este pool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.DB_THREADPOOL_SIZE
+    
     # Crear tablas si no existen (Aquí se crean 'sales_details', 'clients', etc.)
     Base.metadata.create_all(bind=engine)
     logger.info("Base de datos inicializada y tablas verificadas")
     
+    if settings.AUDIT_ASYNC_ENABLED:
+        audit_writer.start()
+    
+    if settings.MAINTENANCE_ENABLED and IS_SQLITE:
+        maintenance.start()
+    
     yield
     
     # Shutdown
+    maintenance.stop()
+    audit_writer.stop()
+    password_pool.shutdown()
+    federation.shutdown()
     logger.info("Cerrando WaterLog")
 
 
@@ -68,6 +95,34 @@ origins = [
 if isinstance(settings.BACKEND_CORS_ORIGINS, list):
     origins.extend(settings.BACKEND_CORS_ORIGINS)
 
+# Reintentos de POST con Idempotency-Key (checkout / check-in)
+app.middleware("http")(idempotency_middleware)
+
+# Commits por petición: una mutación debe confirmar una sola vez
+@app.middleware("http")
+async def count_db_commits(request: Request, call_next):
+    stats = start_request_stats()
+    response = await call_next(request)
+    response.headers["X-DB-Commits"] = str(stats["commits"])
+    if stats["commits"] > 1:
+        logger.warning(f"{request.method} {request.url.path}: {stats['commits']} commits en una petición")
+    return response
+
+# Latencia por endpoint (GET /metrics/latency)
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    latency_recorder.record(
+        f"{request.method} {route.path if route is not None else '(sin ruta)'}",
+        time.perf_counter() - started
+    )
+    return response
+
+# CORS al final: queda como el middleware más externo, así también llevan
+# Access-Control-Allow-Origin las respuestas que arman los otros middlewares
+# (rechazos y reintentos de Idempotency-Key)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -82,6 +137,10 @@ app.include_router(routes.router, prefix=f"{settings.API_V1_PREFIX}/routes", tag
 app.include_router(reports.router, prefix=f"{settings.API_V1_PREFIX}/reports", tags=["reports"])
 app.include_router(resources.router, prefix=f"{settings.API_V1_PREFIX}/resources", tags=["resources"])
 app.include_router(clients.router, prefix=f"{settings.API_V1_PREFIX}/clients", tags=["clients"])
+app.include_router(exports.router, prefix=f"{settings.API_V1_PREFIX}/exports", tags=["exports"])
+app.include_router(debts.router, prefix=f"{settings.API_V1_PREFIX}/debts", tags=["debts"])
+app.include_router(payroll.router, prefix=f"{settings.API_V1_PREFIX}/payroll", tags=["payroll"])
+app.include_router(audit.router, prefix=f"{settings.API_V1_PREFIX}/audit", tags=["audit"])
 
 # Health check
 @app.get("/health", tags=["system"])
@@ -93,6 +152,31 @@ async def health_check():
         "environment": settings.ENVIRONMENT
     }
 
+# Métricas y mantenimiento: solo administradores (rutas internas, pools, tamaños)
+def require_admin(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Solo administradores pueden ver el estado del sistema")
+
+
+@app.get("/metrics/latency", tags=["system"], dependencies=[Depends(require_admin)])
+async def latency_metrics():
+    """
+    Percentiles de latencia por endpoint y estado de los pools de conexiones
+    (escritura y solo lectura para reportes, dimensionados por separado)
+    """
+    return {
+        "latency": latency_recorder.summary(),
+        "pools": {
+            "write": engine.pool.status(),
+            "read": read_engine.pool.status(),
+        },
+    }
+
+@app.get("/maintenance/status", tags=["system"], dependencies=[Depends(require_admin)])
+async def maintenance_status():
+    """Última ejecución de cada trabajo de mantenimiento (estado, duración, detalle)"""
+    return maintenance.status()
+
 # Root endpoint
 @app.get("/", tags=["system"])
 async def root():
@@ -106,6 +190,15 @@ async def root():
     }
 
 # Exception handlers
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    """GET condicional: el cliente ya tiene la versión vigente"""
+    return Response(
+        status_code=304,
+        headers={"ETag": exc.etag, "Cache-Control": "private, no-cache"}
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Error no manejado: {str(exc)}")
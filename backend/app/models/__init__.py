@@ -2,7 +2,12 @@ from app.models.user import User, UserRole
 from app.models.truck import Truck
 from app.models.route_manifest import RouteManifest, AuditStatus
 from app.models.debt_record import DebtRecord, DebtStatus
+from app.models.debt_balance import DriverDebtBalance, DriverDebtAging
+from app.models.payroll_run import PayrollRun, PayrollRunStatus
 from app.models.audit_log import AuditLog
+from app.models.audit_archive import AuditArchive
+from app.models.daily_rollup import DailyStatusRollup, DailyTruckRollup, DailyDriverRollup
+from app.models.table_version import TableVersion
 
 __all__ = [
     "User",
@@ -12,5 +17,14 @@ __all__ = [
     "AuditStatus",
     "DebtRecord",
     "DebtStatus",
+    "DriverDebtBalance",
+    "DriverDebtAging",
+    "PayrollRun",
+    "PayrollRunStatus",
     "AuditLog",
+    "AuditArchive",
+    "DailyStatusRollup",
+    "DailyTruckRollup",
+    "DailyDriverRollup",
+    "TableVersion",
 ]
\ No newline at end of file
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+
+class AuditArchive(Base):
+    """
+    Segmento sellado de la bitácora: filas de audit_logs de un mes cerrado,
+    movidas a un archivo SQLite comprimido y de solo lectura (ver audit_archive).
+    Un mes puede tener varios segmentos si llegaron filas tarde (spool).
+    """
+    __tablename__ = "audit_archives"
+    __table_args__ = (
+        # Segmentos que tocan un rango de fechas
+        Index("ix_audit_archives_range", "min_timestamp", "max_timestamp"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    month = Column(String(7), nullable=False, index=True)  # "2024-03"
+    path = Column(String(500), nullable=False, unique=True)
+
+    # Contenido
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    min_timestamp = Column(DateTime, nullable=False)
+    max_timestamp = Column(DateTime, nullable=False)
+
+    # Archivo comprimido (la suma se revisa al descomprimir)
+    sha256 = Column(String(64), nullable=False)
+    compressed_bytes = Column(Integer, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AuditArchive {self.month} #{self.first_id}-{self.last_id} ({self.row_count} filas)>"
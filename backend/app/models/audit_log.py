@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
 from datetime import datetime
 from app.database import Base
 
@@ -9,6 +9,10 @@ class AuditLog(Base):
     Registra TODAS las acciones sensibles del sistema.
     """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Historial de una entidad: WHERE entity_type = ? AND entity_id = ?
+        Index("ix_audit_logs_entity", "entity_type", "entity_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
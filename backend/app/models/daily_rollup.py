@@ -0,0 +1,65 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey, Enum as SQLEnum, Index
+from app.database import Base
+from app.models.route_manifest import AuditStatus
+
+
+class DailyStatusRollup(Base):
+    """
+    Acumulado diario por estado de ruta.
+    Se mantiene incrementalmente en checkout/check-in (ver rollup_service).
+    """
+    __tablename__ = "daily_status_rollups"
+    __table_args__ = (
+        # Rutas activas de cualquier fecha (WHERE audit_status = 'IN_PROGRESS')
+        Index("ix_daily_status_rollups_status_date", "audit_status", "date"),
+    )
+
+    date = Column(Date, primary_key=True)
+    audit_status = Column(SQLEnum(AuditStatus), primary_key=True)
+
+    route_count = Column(Integer, default=0, nullable=False)
+    full_bottles = Column(Integer, default=0, nullable=False)       # initial_full_bottles
+    total_bottles = Column(Integer, default=0, nullable=False)      # initial_full + initial_empty
+    debt_amount = Column(Float, default=0.0, nullable=False)
+    positive_debt_amount = Column(Float, default=0.0, nullable=False)  # Solo deudas > 0
+
+    def __repr__(self):
+        return f"<DailyStatusRollup {self.date} {self.audit_status} - {self.route_count} rutas>"
+
+
+class DailyTruckRollup(Base):
+    """Acumulado diario por camioneta"""
+    __tablename__ = "daily_truck_rollups"
+    __table_args__ = (
+        Index("ix_daily_truck_rollups_truck_date", "truck_id", "date"),
+    )
+
+    date = Column(Date, primary_key=True)
+    truck_id = Column(Integer, ForeignKey("trucks.id"), primary_key=True)
+
+    route_count = Column(Integer, default=0, nullable=False)
+    problematic_routes = Column(Integer, default=0, nullable=False)  # Rutas en estado DEBT
+    debt_amount = Column(Float, default=0.0, nullable=False)
+    full_bottles = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<DailyTruckRollup {self.date} Truck:{self.truck_id} - {self.route_count} rutas>"
+
+
+class DailyDriverRollup(Base):
+    """Acumulado diario por chofer"""
+    __tablename__ = "daily_driver_rollups"
+    __table_args__ = (
+        Index("ix_daily_driver_rollups_driver_date", "driver_id", "date"),
+    )
+
+    date = Column(Date, primary_key=True)
+    driver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    route_count = Column(Integer, default=0, nullable=False)
+    problematic_routes = Column(Integer, default=0, nullable=False)  # Rutas en estado DEBT
+    debt_amount = Column(Float, default=0.0, nullable=False)
+    full_bottles = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<DailyDriverRollup {self.date} Driver:{self.driver_id} - {self.route_count} rutas>"
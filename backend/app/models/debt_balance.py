@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+
+class DriverDebtBalance(Base):
+    """
+    Saldo vigente por chofer (deudas PENDING + DISPUTED).
+    Se mantiene en la misma transacción que cada cambio de DebtRecord (ver debt_service).
+    """
+    __tablename__ = "driver_debt_balances"
+
+    driver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    pending_amount = Column(Float, default=0.0, nullable=False)
+    disputed_amount = Column(Float, default=0.0, nullable=False)
+    open_records = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DriverDebtBalance Driver:{self.driver_id} - ${self.pending_amount + self.disputed_amount}>"
+
+
+class DriverDebtAging(Base):
+    """
+    Deuda abierta por chofer y fecha de la ruta que la generó.
+    Los rangos de antigüedad (0-30, 31-60...) se calculan al consultar: una
+    fila por día con deuda abierta, no por ruta. Las filas que llegan a cero
+    se borran.
+    """
+    __tablename__ = "driver_debt_aging"
+
+    driver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    debt_date = Column(Date, primary_key=True)
+
+    open_amount = Column(Float, default=0.0, nullable=False)
+    open_records = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<DriverDebtAging Driver:{self.driver_id} {self.debt_date} - ${self.open_amount}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -20,12 +20,22 @@ class DebtRecord(Base):
     Tabla para tracking detallado de deudas generadas por descuadres.
     """
     __tablename__ = "debt_records"
+    __table_args__ = (
+        # Deudas de un chofer por estado y las de una ruta (re-check-in)
+        Index("ix_debt_records_driver_status", "driver_id", "status"),
+        Index("ix_debt_records_route", "route_manifest_id"),
+        # Estado de cuenta de una corrida de nómina
+        Index("ix_debt_records_payroll_run", "payroll_run_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
     # Referencia a la ruta que generó la deuda
     route_manifest_id = Column(Integer, ForeignKey("route_manifests.id"), nullable=False)
     
+    # Chofer que debe (copiado de la ruta para los saldos sin JOIN)
+    driver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    
     # Monto
     amount = Column(Float, nullable=False)
     
@@ -37,6 +47,9 @@ class DebtRecord(Base):
     resolved_at = Column(DateTime, nullable=True)
     resolved_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
+    # Corrida de nómina que la dedujo
+    payroll_run_id = Column(Integer, ForeignKey("payroll_runs.id"), nullable=True)
+    
     # Notas y justificación
     notes = Column(Text, nullable=True)
     resolution_notes = Column(Text, nullable=True)  # Por qué se perdonó/disputó
@@ -44,6 +57,7 @@ class DebtRecord(Base):
     # Relationships
     route_manifest = relationship("RouteManifest", backref="debt_records")
     resolved_by = relationship("User", foreign_keys=[resolved_by_user_id])
+    driver = relationship("User", foreign_keys=[driver_id])
     
     def __repr__(self):
         return f"<DebtRecord #{self.id} - Route:{self.route_manifest_id} - ${self.amount} - {self.status}>"
\ No newline at end of file
@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, Enum as SQLEnum, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import enum
+from app.database import Base
+
+
+class PayrollRunStatus(str, enum.Enum):
+    """Estados de una corrida de nómina"""
+    RUNNING = "RUNNING"          # En proceso (o interrumpida: se reanuda)
+    COMPLETED = "COMPLETED"      # Deducciones aplicadas y estado de cuenta escrito
+
+
+class PayrollRun(Base):
+    """
+    Corrida de deducciones de nómina para un periodo.
+    Una por periodo: si se interrumpe, volver a lanzarla continúa desde
+    last_debt_id (ver payroll_service).
+    """
+    __tablename__ = "payroll_runs"
+    __table_args__ = (
+        UniqueConstraint("period_start", "period_end", name="uq_payroll_runs_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Periodo (fecha de la ruta que generó la deuda, inclusive)
+    period_start = Column(Date, nullable=False)
+    period_end = Column(Date, nullable=False)
+
+    status = Column(SQLEnum(PayrollRunStatus), default=PayrollRunStatus.RUNNING, nullable=False)
+
+    # Avance: última deuda procesada (las deudas se recorren por id)
+    last_debt_id = Column(Integer, default=0, nullable=False)
+    deducted_records = Column(Integer, default=0, nullable=False)
+    deducted_amount = Column(Float, default=0.0, nullable=False)
+
+    statement_path = Column(String(500), nullable=True)
+
+    created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    created_by = relationship("User", foreign_keys=[created_by_user_id])
+
+    def __repr__(self):
+        return f"<PayrollRun #{self.id} {self.period_start}..{self.period_end} - {self.status}>"
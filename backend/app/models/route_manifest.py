@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum as SQLEnum, Text, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
 import enum
@@ -19,6 +19,18 @@ class RouteManifest(Base):
     Representa el ciclo completo de una ruta diaria.
     """
     __tablename__ = "route_manifests"
+    __table_args__ = (
+        # Filtros calientes de reportes y listados
+        Index("ix_route_manifests_date_status", "date", "audit_status"),
+        Index("ix_route_manifests_truck_date", "truck_id", "date"),
+        Index("ix_route_manifests_driver_date", "driver_id", "date"),
+        # Parcial: solo las rutas en curso (pocas filas, siempre consultadas)
+        Index(
+            "ix_route_manifests_in_progress", "truck_id", "driver_id",
+            sqlite_where=text("audit_status = 'IN_PROGRESS'"),
+            postgresql_where=text("audit_status = 'IN_PROGRESS'")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -27,7 +39,7 @@ class RouteManifest(Base):
     truck_id = Column(Integer, ForeignKey("trucks.id"), nullable=False)
     
     # Fecha
-    date = Column(Date, default=date.today, nullable=False, index=True)
+    date = Column(Date, default=date.today, nullable=False)  # Indexado en ix_route_manifests_date_status
     
     # ===== SNAPSHOT DE SALIDA (Check-out) =====
     initial_full_bottles = Column(Integer, nullable=False)
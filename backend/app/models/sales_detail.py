@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float
+from sqlalchemy import Column, Integer, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -7,6 +7,10 @@ class SalesDetail(Base):
     Tabla pivote: Detalle de venta por cliente en una ruta.
     """
     __tablename__ = "sales_details"
+    __table_args__ = (
+        # Cubre el borrado/lectura por ruta del check-in
+        Index("ix_sales_details_route_client", "route_id", "client_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+
+class TableVersion(Base):
+    """
+    Versión confirmada de cada tabla, compartida por todos los procesos.
+    Cada commit incrementa aquí las tablas que modificó (ver data_version),
+    así los comandos de app.cli y otros workers invalidan los caches del
+    servidor.
+    """
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TableVersion {self.table_name}={self.version}>"
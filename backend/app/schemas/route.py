@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date, datetime
+
+from app.models.route_manifest import AuditStatus
+
+
+class RouteSaleItem(BaseModel):
+    """Línea de venta dentro del listado (sin relaciones)"""
+    client_id: int
+    quantity: int
+    unit_price: float
+    subtotal: float
+
+    class Config:
+        from_attributes = True
+
+
+class RouteListItem(BaseModel):
+    """Fila del listado de rutas: solo columnas planas y nombres ya resueltos"""
+    id: int
+    date: date
+    driver_id: int
+    driver_name: Optional[str] = None
+    truck_id: int
+    truck_name: Optional[str] = None
+    truck_plate: Optional[str] = None
+    audit_status: AuditStatus
+    initial_full_bottles: int
+    initial_empty_bottles: int
+    returned_full_bottles: Optional[int] = None
+    returned_empty_bottles: Optional[int] = None
+    reported_damaged: Optional[int] = None
+    debt_amount: float = 0.0
+    checkout_timestamp: Optional[datetime] = None
+    checkin_timestamp: Optional[datetime] = None
+    sales: Optional[List[RouteSaleItem]] = None
+
+
+class RouteListPage(BaseModel):
+    """Página del listado. `next_cursor` es None en la última página"""
+    total: int  # Filas en esta página
+    next_cursor: Optional[str] = None
+    routes: List[RouteListItem]
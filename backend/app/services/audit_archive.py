@@ -0,0 +1,425 @@
+"""
+Bitácora particionada por mes.
+
+audit_logs es la partición caliente: ahí siguen escribiendo log_activity, el
+escritor asíncrono y la nómina, sin cambios. Los meses cerrados (anteriores
+a los AUDIT_HOT_MONTHS más recientes) se sellan:
+
+1. sus filas se copian por lotes a un archivo SQLite nuevo con el mismo
+   esquema e índices de audit_logs, y se compacta (VACUUM);
+2. el archivo se comprime (gzip) en AUDIT_ARCHIVE_DIR, queda de solo
+   lectura y su sha256 se anota en audit_archives;
+3. en UNA transacción se registra el segmento y se borran las filas de
+   audit_logs (si el conteo no cuadra se revierte y el archivo se descarta).
+
+Las filas que lleguen tarde a un mes ya sellado (spool del escritor
+asíncrono) forman otro segmento en la siguiente pasada: un archivo sellado
+no se reescribe.
+
+query_logs consulta la partición caliente y los segmentos cuyo rango de
+fechas toca el filtro, con la misma sentencia, y mezcla los resultados por
+fecha. Los segmentos se descomprimen (verificando la suma) a una caché local
+de AUDIT_ARCHIVE_CACHE_FILES archivos y se abren en modo immutable.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import stat
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import create_engine, delete, func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.database import SessionLocal, write_transaction
+from app.models.audit_log import AuditLog
+from app.models.audit_archive import AuditArchive
+
+AUDIT_TABLE = AuditLog.__table__
+
+_CHUNK_BYTES = 1024 * 1024
+
+
+class AuditArchiveError(Exception):
+    """Un segmento no se pudo sellar (conteo distinto) o leer (falta o su suma no coincide)"""
+
+
+# --- Meses ---
+
+def month_key(moment: datetime) -> str:
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def month_bounds(month: str) -> Tuple[datetime, datetime]:
+    """"2024-03" -> [2024-03-01, 2024-04-01)"""
+    year, number = (int(part) for part in month.split("-"))
+    start = datetime(year, number, 1)
+    end = datetime(year + number // 12, number % 12 + 1, 1)
+    return start, end
+
+
+def hot_cutoff(today: Optional[date] = None) -> datetime:
+    """Inicio del mes más viejo que sigue en audit_logs"""
+    today = today or datetime.utcnow().date()
+    index = today.year * 12 + today.month - 1 - (max(1, settings.AUDIT_HOT_MONTHS) - 1)
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def closed_months(db: Session, today: Optional[date] = None) -> List[str]:
+    """Meses con filas en audit_logs anteriores al corte (del más viejo al más nuevo)"""
+    cutoff = hot_cutoff(today)
+    oldest = db.query(func.min(AuditLog.timestamp)).filter(AuditLog.timestamp < cutoff).scalar()
+    months = []
+    while oldest is not None and oldest < cutoff:
+        months.append(month_key(oldest))
+        oldest = month_bounds(months[-1])[1]
+    return months
+
+
+# --- Sellado ---
+
+def _segment_path(month: str, first_id: int, last_id: int) -> str:
+    return os.path.join(settings.AUDIT_ARCHIVE_DIR, f"audit_{month}_{first_id}-{last_id}.sqlite.gz")
+
+
+def _cache_dir() -> str:
+    return os.path.join(settings.AUDIT_ARCHIVE_DIR, "cache")
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _segment_engine(path: str, writable: bool = False):
+    if writable:
+        return create_engine(f"sqlite:///{path}", poolclass=NullPool)
+    # immutable: el archivo no cambia, SQLite no toma candados ni busca -wal
+    return create_engine(
+        f"sqlite:///file:{path}?mode=ro&immutable=1&uri=true",
+        connect_args={"check_same_thread": False}, poolclass=NullPool,
+    )
+
+
+def _copy_month(db: Session, month: str, raw_path: str) -> Optional[dict]:
+    """Copiar las filas del mes a un SQLite nuevo. Regresa el rango copiado (o None)"""
+    start, end = month_bounds(month)
+    rows = db.execute(
+        select(AUDIT_TABLE).where(
+            AUDIT_TABLE.c.timestamp >= start, AUDIT_TABLE.c.timestamp < end
+        ).order_by(AUDIT_TABLE.c.id).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+    segment = _segment_engine(raw_path, writable=True)
+    info = None
+    try:
+        AUDIT_TABLE.create(segment)
+        with segment.begin() as conn:
+            for batch in rows.partitions():
+                batch = [dict(row._mapping) for row in batch]
+                conn.execute(insert(AUDIT_TABLE), batch)
+                if info is None:
+                    info = {"first_id": batch[0]["id"], "row_count": 0,
+                            "min_timestamp": batch[0]["timestamp"], "max_timestamp": batch[0]["timestamp"]}
+                info["last_id"] = batch[-1]["id"]
+                info["row_count"] += len(batch)
+                info["min_timestamp"] = min(info["min_timestamp"], *(r["timestamp"] for r in batch))
+                info["max_timestamp"] = max(info["max_timestamp"], *(r["timestamp"] for r in batch))
+        with segment.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+    finally:
+        segment.dispose()
+        db.rollback()  # Cierra la lectura antes de pedir turno de escritura
+    return info
+
+
+def seal_month(month: str, today: Optional[date] = None) -> Optional[dict]:
+    """
+    Sellar las filas de un mes cerrado en un segmento comprimido y quitarlas
+    de audit_logs. Regresa el resumen del segmento (None si no había filas).
+    """
+    if month_bounds(month)[0] >= hot_cutoff(today):
+        raise ValueError(f"El mes {month} sigue abierto")
+
+    os.makedirs(_cache_dir(), exist_ok=True)
+    raw_path = os.path.join(_cache_dir(), f"sealing_{month}.sqlite")
+    if os.path.exists(raw_path):
+        os.remove(raw_path)  # Resto de un sellado interrumpido
+
+    db = SessionLocal()
+    try:
+        info = _copy_month(db, month, raw_path)
+        if info is None:
+            os.remove(raw_path)
+            return None
+
+        path = _segment_path(month, info["first_id"], info["last_id"])
+        tmp_path = f"{path}.tmp"
+        with open(raw_path, "rb") as source, gzip.open(tmp_path, "wb") as target:
+            shutil.copyfileobj(source, target, _CHUNK_BYTES)
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmp_path, path)
+
+        start, end = month_bounds(month)
+        with write_transaction(db):
+            db.add(AuditArchive(
+                month=month, path=path, sha256=_sha256(path),
+                compressed_bytes=os.path.getsize(path), raw_bytes=os.path.getsize(raw_path),
+                **info,
+            ))
+            deleted = db.execute(delete(AuditLog).where(
+                AuditLog.id >= info["first_id"], AuditLog.id <= info["last_id"],
+                AuditLog.timestamp >= start, AuditLog.timestamp < end,
+            )).rowcount
+            if deleted != info["row_count"]:
+                db.rollback()
+                os.remove(path)
+                raise AuditArchiveError(
+                    f"Sellado de {month} cancelado: se copiaron {info['row_count']} filas y se borrarían {deleted}"
+                )
+            db.commit()
+    finally:
+        db.close()
+
+    # La copia sin comprimir ya sirve como caché del segmento recién sellado
+    archive_cache.adopt(path, raw_path)
+    logger.info(f"Bitácora: {month} sellado ({info['row_count']} filas) en {path}")
+    return {"month": month, "path": path, **info,
+            "min_timestamp": info["min_timestamp"].isoformat(),
+            "max_timestamp": info["max_timestamp"].isoformat()}
+
+
+def archive_closed_months(today: Optional[date] = None, deadline: Optional[float] = None) -> dict:
+    """Sellar todos los meses cerrados (hasta agotar `deadline`, time.monotonic())"""
+    db = SessionLocal()
+    try:
+        months = closed_months(db, today)
+    finally:
+        db.close()
+
+    sealed, pending = [], list(months)
+    while pending and (deadline is None or time.monotonic() < deadline):
+        result = seal_month(pending.pop(0), today)
+        if result:
+            sealed.append(result)
+    return {"sealed": sealed, "rows": sum(s["row_count"] for s in sealed), "pending_months": pending}
+
+
+# --- Lectura de segmentos ---
+
+class _Segment:
+    """Un segmento descomprimido en la caché y cuántas lecturas lo usan"""
+
+    def __init__(self, local_path: str):
+        self.local_path = local_path
+        self.engine = _segment_engine(local_path)
+        self.pins = 0
+        self.evicted = False
+
+    def drop(self):
+        self.engine.dispose()
+        try:
+            os.remove(self.local_path)
+        except OSError:
+            pass
+
+
+class ArchiveCache:
+    """
+    Segmentos descomprimidos en disco (LRU) y su engine de solo lectura.
+
+    Una lectura fija su segmento mientras lo usa (connect): si el LRU lo
+    desaloja en ese momento, el archivo se borra al soltarlo la última
+    lectura. La verificación y la descompresión se hacen fuera del candado
+    global, con un candado por segmento para no descomprimir dos veces.
+    """
+
+    def __init__(self, max_files: int):
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Segment]" = OrderedDict()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._serial = 0
+
+    def _local_path(self, path: str) -> str:
+        # Nombre único por carga: un segmento desalojado pero aún en uso no
+        # comparte archivo con su siguiente carga
+        self._serial += 1
+        return os.path.join(_cache_dir(), f"{os.path.basename(path)[:-len('.gz')]}.{self._serial}")
+
+    def _insert(self, path: str, segment: _Segment):
+        self._entries[path] = segment
+        while len(self._entries) > max(1, self.max_files):
+            _, old = self._entries.popitem(last=False)
+            old.evicted = True
+            if not old.pins:
+                old.drop()
+
+    def _pin(self, path: str) -> Optional[_Segment]:
+        segment = self._entries.get(path)
+        if segment is not None:
+            self._entries.move_to_end(path)
+            segment.pins += 1
+        return segment
+
+    def _unpin(self, segment: _Segment):
+        with self._lock:
+            segment.pins -= 1
+            if segment.evicted and not segment.pins:
+                segment.drop()
+
+    def adopt(self, path: str, raw_path: str):
+        """Registrar la copia sin comprimir de un segmento recién sellado"""
+        with self._lock:
+            local_path = self._local_path(path)
+            os.replace(raw_path, local_path)
+            self._insert(path, _Segment(local_path))
+
+    def _load(self, archive: AuditArchive) -> _Segment:
+        """Verificar y descomprimir el segmento (sin el candado global); regresa el segmento fijado"""
+        with self._lock:
+            loading = self._loading.setdefault(archive.path, threading.Lock())
+        with loading:
+            with self._lock:
+                segment = self._pin(archive.path)  # Lo cargó otra lectura mientras esperábamos
+                if segment is not None:
+                    return segment
+                os.makedirs(_cache_dir(), exist_ok=True)
+                local_path = self._local_path(archive.path)
+
+            try:
+                if not os.path.exists(archive.path):
+                    raise AuditArchiveError(f"Falta el segmento {archive.path}")
+                if _sha256(archive.path) != archive.sha256:
+                    raise AuditArchiveError(f"El segmento {archive.path} está dañado (sha256)")
+                with gzip.open(archive.path, "rb") as source, open(f"{local_path}.tmp", "wb") as target:
+                    shutil.copyfileobj(source, target, _CHUNK_BYTES)
+                os.replace(f"{local_path}.tmp", local_path)
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(archive.path, None)
+                raise
+
+            with self._lock:
+                segment = _Segment(local_path)
+                segment.pins += 1
+                self._insert(archive.path, segment)
+                self._loading.pop(archive.path, None)
+                return segment
+
+    @contextmanager
+    def connect(self, archive: AuditArchive):
+        """Conexión de solo lectura al segmento; el archivo no se borra mientras esté abierta"""
+        with self._lock:
+            segment = self._pin(archive.path)
+        if segment is None:
+            segment = self._load(archive)
+        try:
+            with segment.engine.connect() as conn:
+                yield conn
+        finally:
+            self._unpin(segment)
+
+    def clear(self):
+        with self._lock:
+            for segment in self._entries.values():
+                segment.evicted = True
+                if not segment.pins:
+                    segment.drop()
+            self._entries.clear()
+
+
+archive_cache = ArchiveCache(settings.AUDIT_ARCHIVE_CACHE_FILES)
+
+
+# --- Consulta ---
+
+def _row(row) -> dict:
+    item = dict(row._mapping)
+    item["timestamp"] = item["timestamp"].isoformat()
+    return item
+
+
+def query_logs(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    action: Optional[str] = None,
+    user_id: Optional[int] = None,
+    limit: int = 100,
+) -> List[dict]:
+    """
+    Entradas de la bitácora (más recientes primero) en la partición caliente
+    y en los segmentos sellados. `end` es exclusivo.
+    """
+    conditions = []
+    if start is not None:
+        conditions.append(AUDIT_TABLE.c.timestamp >= start)
+    if end is not None:
+        conditions.append(AUDIT_TABLE.c.timestamp < end)
+    if entity_type is not None:
+        conditions.append(AUDIT_TABLE.c.entity_type == entity_type)
+    if entity_id is not None:
+        conditions.append(AUDIT_TABLE.c.entity_id == entity_id)
+    if action is not None:
+        conditions.append(AUDIT_TABLE.c.action == action)
+    if user_id is not None:
+        conditions.append(AUDIT_TABLE.c.user_id == user_id)
+    statement = select(AUDIT_TABLE).where(*conditions).order_by(
+        AUDIT_TABLE.c.timestamp.desc(), AUDIT_TABLE.c.id.desc()
+    ).limit(limit)
+
+    rows = list(db.execute(statement))
+
+    archives = db.query(AuditArchive)
+    if start is not None:
+        archives = archives.filter(AuditArchive.max_timestamp >= start)
+    if end is not None:
+        archives = archives.filter(AuditArchive.min_timestamp < end)
+    for archive in archives.order_by(AuditArchive.max_timestamp.desc()).all():
+        # Segmentos del más nuevo al más viejo: si ya hay `limit` filas más
+        # recientes que todo el segmento, los siguientes tampoco entran
+        if len(rows) >= limit and rows[limit - 1].timestamp > archive.max_timestamp:
+            break
+        with archive_cache.connect(archive) as conn:
+            rows.extend(conn.execute(statement))
+        rows.sort(key=lambda row: (row.timestamp, row.id), reverse=True)
+        del rows[limit:]
+
+    rows.sort(key=lambda row: (row.timestamp, row.id), reverse=True)
+    return [_row(row) for row in rows[:limit]]
+
+
+def archives_summary(db: Session) -> Dict[str, object]:
+    archives = db.query(AuditArchive).order_by(AuditArchive.min_timestamp).all()
+    return {
+        "hot_rows": db.query(func.count(AuditLog.id)).scalar(),
+        "hot_cutoff": hot_cutoff().isoformat(),
+        "archives": [
+            {
+                "month": a.month,
+                "path": a.path,
+                "rows": a.row_count,
+                "first_id": a.first_id,
+                "last_id": a.last_id,
+                "min_timestamp": a.min_timestamp.isoformat(),
+                "max_timestamp": a.max_timestamp.isoformat(),
+                "compressed_bytes": a.compressed_bytes,
+                "raw_bytes": a.raw_bytes,
+            }
+            for a in archives
+        ],
+    }
@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
 from fastapi import Request
 from typing import Dict, Any, Optional
+from datetime import datetime
 from app.models.audit_log import AuditLog
+from app.services.audit_writer import audit_writer, defer
 
 def log_activity(
     db: Session,
@@ -17,20 +19,37 @@ def log_activity(
     """
     Registra una acción en la bitácora de auditoría.
     Captura automáticamente la IP y el User-Agent si se proporciona el objeto request.
+    No confirma: la fila se guarda con el commit de la unidad de trabajo del endpoint.
+    Con AUDIT_ASYNC_ENABLED el registro se entrega, tras ese commit, al escritor por lotes.
     """
     ip_address = None
     user_agent = None
     
     if request:
-        ip_address = request.client.host
+        ip_address = request.client.host if request.client else None
         user_agent = request.headers.get("user-agent")
 
+    if audit_writer.running:
+        defer(db, {
+            "timestamp": datetime.utcnow().isoformat(),
+            "user_id": user_id,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "notes": details,
+            "old_value": old_value,
+            "new_value": new_value,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+        })
+        return None
+
     new_log = AuditLog(
         user_id=user_id,
         action=action,
         entity_type=entity_type,
         entity_id=entity_id,
-        details=details,
+        notes=details,
         old_value=old_value,
         new_value=new_value,
         ip_address=ip_address,
@@ -38,4 +57,4 @@ def log_activity(
     )
     
     db.add(new_log)
-    db.commit()
\ No newline at end of file
+    return new_log
\ No newline at end of file
@@ -0,0 +1,340 @@
+"""
+Escritor asíncrono de la bitácora de auditoría (opcional, AUDIT_ASYNC_ENABLED).
+
+log_activity deja el registro en la sesión; al confirmar la transacción se
+encola aquí y un hilo en segundo plano los inserta por lotes en audit_logs.
+Así la petición no espera el INSERT ni compite por el candado de escritura
+de la bitácora, y un rollback sigue descartando su auditoría.
+
+- Cola acotada: antes del commit se reserva lugar para los registros de la
+  transacción. Si no hay lugar (o el escritor está detenido) se insertan ahí
+  mismo, dentro de la transacción y del turno de write_queue que ya tiene la
+  petición. Nunca se espera lugar en la cola con el turno tomado: el hilo
+  consumidor necesita ese turno para vaciarla.
+- Archivo spool: cada registro se anexa antes de encolarse y el archivo se
+  vacía cuando no queda nada pendiente. El fsync lo hace el hilo consumidor
+  (a lo más cada AUDIT_FLUSH_INTERVAL_SECONDS), no la petición. Al arrancar
+  se reinsertan las líneas que hayan quedado (entrega al-menos-una-vez: tras
+  una caída justo después de un lote puede duplicarse alguna entrada).
+- Errores al insertar: los transitorios (base bloqueada u ocupada, turno de
+  escritura agotado) se reintentan hasta AUDIT_WRITE_RETRIES veces con
+  espera creciente y acotada. Un lote rechazado por otra causa se reintenta
+  registro por registro; los que no entran (o siguen fallando por bloqueo)
+  van al archivo de descarte AUDIT_DEAD_LETTER_PATH con su error, y el
+  escritor sigue con lo demás.
+- El lifespan de la app llama a stop(), que vacía la cola antes de salir.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from loguru import logger
+from sqlalchemy import insert, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, WriteQueueTimeout, write_transaction
+from app.models.audit_log import AuditLog
+
+_PENDING_KEY = "audit_pending"
+_RESERVED_KEY = "audit_reserved"
+_STOP = object()
+
+# Errores que pueden pasar solos: se reintentan
+TRANSIENT_ERRORS = (OperationalError, WriteQueueTimeout)
+_MAX_BACKOFF_SECONDS = 5.0
+
+
+def _to_row(record: dict) -> dict:
+    row = dict(record)
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+def insert_records(records: List[dict]):
+    """Insertar registros serializados en una sola transacción (executemany)"""
+    if not records:
+        return
+    db = SessionLocal()
+    try:
+        with write_transaction(db):
+            db.execute(insert(AuditLog), [_to_row(r) for r in records])
+            db.commit()
+    finally:
+        db.close()
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        spool_path: Optional[str],
+        dead_letter_path: Optional[str] = None,
+        max_retries: int = 5,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.dead_letter_path = dead_letter_path
+        self.max_retries = max(1, max_retries)
+        self.max_queue = max_queue
+        self._queue: "queue.Queue" = queue.Queue()  # El límite lo imponen las reservas
+        self._reserve_lock = threading.Lock()
+        self._reserved = 0  # Lugares apartados por transacciones a punto de confirmar
+        self._spool_lock = threading.Lock()
+        self._spool_dirty = False  # Hay líneas anexadas sin fsync
+        self._pending = 0  # Registros en el spool aún no insertados
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.batches = 0
+        self.fallbacks = 0
+        self.dead_letters = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        if self.running:
+            return
+        self.recover()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        logger.info("Escritor asíncrono de auditoría iniciado")
+
+    def stop(self, timeout: float = 30.0):
+        """Vaciar la cola y detener el hilo (se llama en el shutdown del lifespan)"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("El escritor de auditoría no terminó a tiempo; el spool conserva lo pendiente")
+        self._thread = None
+        logger.info(f"Escritor de auditoría detenido ({self.written} registros en {self.batches} lotes)")
+
+    def recover(self) -> int:
+        """Reinsertar lo que quedó en el spool de una ejecución anterior"""
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return 0
+        with self._spool_lock:
+            with open(self.spool_path, encoding="utf-8") as spool:
+                records = [json.loads(line) for line in spool if line.strip()]
+            for start in range(0, len(records), self.batch_size):
+                self._write_chunk(records[start:start + self.batch_size])
+            self._truncate_spool()
+        if records:
+            logger.warning(f"Recuperados {len(records)} registros de auditoría del spool")
+        return len(records)
+
+    # --- Productor ---
+
+    def reserve(self, count: int) -> bool:
+        """Apartar lugar en la cola para `count` registros (no espera)"""
+        with self._reserve_lock:
+            if not self.running or self._queue.qsize() + self._reserved + count > self.max_queue:
+                return False
+            self._reserved += count
+            return True
+
+    def release(self, count: int):
+        with self._reserve_lock:
+            self._reserved -= count
+
+    def submit(self, records: List[dict]):
+        """Encolar registros ya confirmados, con lugar apartado por reserve()"""
+        self._append_spool(records)
+        for record in records:
+            self._queue.put_nowait(record)
+        self.release(len(records))
+
+    # --- Consumidor ---
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                    self._sync_spool()
+            if stopping:
+                # Drenar lo que quede detrás de la señal de paro
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+            self._sync_spool()
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[dict]):
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            self._write_chunk(chunk)
+            self.batches += 1
+            self._mark_written(len(chunk))
+
+    def _insert_with_retry(self, records: List[dict]):
+        """insert_records reintentando solo los errores transitorios, con espera acotada"""
+        delay = self.flush_interval
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                insert_records(records)
+                return
+            except TRANSIENT_ERRORS as exc:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Auditoría: lote no escrito ({exc}); reintento {attempt} en {delay:.2f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, _MAX_BACKOFF_SECONDS)
+
+    def _write_chunk(self, chunk: List[dict]):
+        """Insertar un lote; lo que no se puede insertar va al archivo de descarte"""
+        try:
+            self._insert_with_retry(chunk)
+            self.written += len(chunk)
+            return
+        except TRANSIENT_ERRORS as exc:
+            # Sigue bloqueada tras los reintentos: no tiene caso probar uno por uno
+            self._dead_letter(chunk, exc)
+            return
+        except Exception as exc:  # Error permanente: aislar los registros que lo causan
+            if len(chunk) == 1:
+                self._dead_letter(chunk, exc)
+                return
+            logger.error(f"Auditoría: lote rechazado ({exc}); se escribe registro por registro")
+        for record in chunk:
+            try:
+                self._insert_with_retry([record])
+                self.written += 1
+            except Exception as exc:
+                self._dead_letter([record], exc)
+
+    def _dead_letter(self, records: List[dict], exc: Exception):
+        self.dead_letters += len(records)
+        logger.error(f"Auditoría: {len(records)} registros al archivo de descarte: {exc}")
+        if not self.dead_letter_path:
+            return
+        failed_at = datetime.utcnow().isoformat()
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letter:
+            dead_letter.write("".join(
+                json.dumps({"failed_at": failed_at, "error": str(exc), "record": record},
+                           ensure_ascii=False, default=str) + "\n"
+                for record in records
+            ))
+            dead_letter.flush()
+            os.fsync(dead_letter.fileno())
+
+    # --- Spool ---
+
+    def _append_spool(self, records: List[dict]):
+        with self._spool_lock:
+            self._pending += len(records)
+            if not self.spool_path:
+                return
+            with open(self.spool_path, "a", encoding="utf-8") as spool:
+                spool.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records))
+            self._spool_dirty = True
+
+    def _sync_spool(self):
+        """fsync del spool (hilo consumidor; agrupa los anexos de varias peticiones)"""
+        with self._spool_lock:
+            if not self._spool_dirty or not self.spool_path or not os.path.exists(self.spool_path):
+                return
+            with open(self.spool_path, "a", encoding="utf-8") as spool:
+                os.fsync(spool.fileno())
+            self._spool_dirty = False
+
+    def _mark_written(self, count: int):
+        with self._spool_lock:
+            self._pending -= count
+            if self._pending == 0:
+                self._truncate_spool()
+
+    def _truncate_spool(self):
+        if self.spool_path and os.path.exists(self.spool_path):
+            open(self.spool_path, "w").close()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "reserved": self._reserved,
+            "pending": self._pending,
+            "written": self.written,
+            "batches": self.batches,
+            "fallbacks": self.fallbacks,
+            "dead_letters": self.dead_letters,
+        }
+
+
+audit_writer = AuditWriter(
+    max_queue=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    spool_path=settings.AUDIT_SPOOL_PATH or None,
+    dead_letter_path=settings.AUDIT_DEAD_LETTER_PATH or None,
+    max_retries=settings.AUDIT_WRITE_RETRIES,
+)
+
+
+def defer(db: Session, record: dict):
+    """Guardar el registro hasta que la transacción de `db` confirme"""
+    db.info.setdefault(_PENDING_KEY, []).append(record)
+
+
+# --- Eventos de sesión: solo se encola lo que llegó a confirmarse ---
+
+# insert=True: antes que data_version, que registra las tablas escritas aquí
+@event.listens_for(Session, "before_commit", insert=True)
+def _reserve_or_write_inline(session):
+    records = session.info.get(_PENDING_KEY)
+    if not records or session.info.get(_RESERVED_KEY):
+        return
+    if audit_writer.reserve(len(records)):
+        session.info[_RESERVED_KEY] = len(records)
+        return
+    # Cola llena o escritor detenido: a la transacción actual (mismo turno)
+    session.info.pop(_PENDING_KEY)
+    session.execute(insert(AuditLog), [_to_row(r) for r in records])
+    audit_writer.fallbacks += len(records)
+    logger.warning(f"Cola de auditoría llena; {len(records)} registros se escriben en la transacción")
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_committed(session):
+    records = session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_RESERVED_KEY, None)
+    if records:
+        audit_writer.submit(records)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
+    reserved = session.info.pop(_RESERVED_KEY, None)
+    if reserved:
+        audit_writer.release(reserved)
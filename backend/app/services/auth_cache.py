@@ -0,0 +1,149 @@
+"""
+Cache de autenticación: token verificado -> usuario ya resuelto.
+
+get_current_active_user decodifica el JWT y consulta `users` en cada petición
+(el dashboard y los polls autentican muchas veces el mismo token). Aquí se
+guarda el usuario, separado de su sesión, bajo el digest del token hasta que
+el token expire o pase AUTH_CACHE_TTL_SECONDS, lo que ocurra primero.
+
+Cualquier cambio confirmado sobre un usuario (desactivación, rol, contraseña)
+borra sus entradas: se detecta con eventos de sesión, como data_version.
+Quien va a cargar un usuario toma antes generation() y lo pasa a put: si el
+usuario se invalidó entre tanto, lo cargado ya es viejo y no se guarda.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+
+_PENDING_KEY = "changed_users"
+_ALL_USERS = "*"
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        # Generación: sube en cada invalidación; se anota la última de cada usuario
+        self._generation = 0
+        self._invalidated_at: Dict[int, int] = {}
+        self._cleared_at = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[User]:
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self) -> int:
+        """Tomar ANTES de leer el usuario de la base; se pasa a put"""
+        with self._lock:
+            return self._generation
+
+    def put(self, token: str, user: User, token_exp: Optional[float], generation: int):
+        """Guardar el usuario, salvo que se haya invalidado después de `generation`"""
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        key = self.digest(token)
+        with self._lock:
+            if max(self._cleared_at, self._invalidated_at.get(user.id, 0)) > generation:
+                return
+            self._remove(key)
+            self._entries[key] = (user, expires_at)
+            self._by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at[user_id] = self._generation
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cleared_at = self._generation
+            self._invalidated_at.clear()  # _cleared_at ya las cubre
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._by_user.get(entry[0].id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[entry[0].id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+
+# --- Eventos de sesión: invalidar al confirmar cambios en usuarios ---
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = {obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault(_PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(orm_execute_state):
+    # UPDATE/DELETE masivos sobre users: no se sabe a quién afectan
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name == User.__tablename__:
+            orm_execute_state.session.info.setdefault(_PENDING_KEY, set()).add(_ALL_USERS)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    changed = session.info.pop(_PENDING_KEY, None)
+    if not changed:
+        return
+    if _ALL_USERS in changed:
+        principal_cache.clear()
+        return
+    for user_id in changed:
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
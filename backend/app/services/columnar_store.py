@@ -0,0 +1,329 @@
+"""
+Almacén columnar en memoria para analítica de rangos arbitrarios.
+
+Mantiene las rutas como arreglos NumPy (fecha, camioneta, chofer, estado,
+garrafones, deuda) y sumas prefijas por día. Cualquier rango sale de restar
+dos filas de prefijos: O(1) para KPIs y O(k) para totales por camioneta o
+chofer, sin volver a agregar en SQL.
+
+Se actualiza incrementalmente después de cada checkout/check-in, sobre una
+copia que reemplaza a la instantánea: una instantánea publicada nunca cambia,
+así los reportes la leen sin candado. Si detecta un commit sobre
+route_manifests que no pasó por aquí (otra ruta de código, comandos de
+mantenimiento), se recarga completo en la siguiente lectura.
+El estado es por proceso: con varios workers, cada uno mantiene el suyo.
+Una lectura con versiones fijadas (get_read_db) solo lo usa si coincide con
+ellas; si no, cae a los acumulados SQL de su instantánea.
+"""
+
+import copy
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.route_manifest import RouteManifest, AuditStatus
+from app.services import data_version
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él los reportes usan los acumulados SQL
+    np = None
+
+STATUSES = list(AuditStatus)
+STATUS_CODE = {status: code for code, status in enumerate(STATUSES)}
+DEBT_CODE = STATUS_CODE[AuditStatus.DEBT]
+IN_PROGRESS_CODE = STATUS_CODE[AuditStatus.IN_PROGRESS]
+
+# Marca las consultas que recorren la tabla completa a propósito (ver tests/test_query_plans.py)
+FULL_SCAN_HINT = "/* full-scan: columnar_store */"
+
+# Columnas crudas (una fila por ruta)
+COLUMNS = ("route_id", "day", "truck", "driver", "status", "full", "total", "debt_cents")
+
+# Métricas por camioneta/chofer: rutas, rutas DEBT, deuda (centavos), garrafones llenos
+RESOURCE_METRICS = 4
+
+
+def _cents(amount) -> int:
+    """Deuda en centavos: las sumas prefijas quedan exactas"""
+    return int(round((amount or 0.0) * 100))
+
+
+class ColumnarSnapshot:
+    """Columnas de rutas + sumas prefijas por día, por estado y por recurso"""
+
+    def __init__(self, rows: Dict[str, "np.ndarray"]):
+        self._size = len(rows["route_id"])
+        capacity = max(1024, self._size * 2)
+        self._columns = {}
+        for name in COLUMNS:
+            column = np.zeros(capacity, dtype=np.int64)
+            column[:self._size] = rows[name]
+            self._columns[name] = column
+        self._position = {int(route_id): i for i, route_id in enumerate(rows["route_id"])}
+        self._build_aggregates()
+
+    # --- Construcción ---
+
+    def _column(self, name):
+        return self._columns[name][:self._size]
+
+    def _build_aggregates(self):
+        """Recalcula todas las sumas prefijas a partir de las columnas crudas"""
+        day = self._column("day")
+        today = date.today().toordinal()
+        self.origin = int(day.min()) if self._size else today
+        # Margen hacia adelante para que los checkouts de los próximos días no reconstruyan
+        self.n_days = max(int(day.max()) if self._size else today, today) - self.origin + 8
+
+        self.truck_ids = np.unique(self._column("truck"))
+        self.driver_ids = np.unique(self._column("driver"))
+        self._truck_index = {int(t): i for i, t in enumerate(self.truck_ids)}
+        self._driver_index = {int(d): i for i, d in enumerate(self.driver_ids)}
+
+        day_idx = day - self.origin
+        status = self._column("status")
+        debt = self._column("debt_cents")
+
+        per_status = np.zeros((self.n_days, len(STATUSES)), dtype=np.int64)
+        np.add.at(per_status, (day_idx, status), 1)
+        per_day = np.zeros((self.n_days, 2), dtype=np.int64)  # garrafones totales, deuda positiva
+        np.add.at(per_day, (day_idx, 0), self._column("total"))
+        np.add.at(per_day, (day_idx, 1), np.where(debt > 0, debt, 0))
+
+        metrics = np.stack([
+            np.ones(self._size, dtype=np.int64),
+            (status == DEBT_CODE).astype(np.int64),
+            debt,
+            self._column("full"),
+        ], axis=1)
+        per_truck = np.zeros((self.n_days, len(self.truck_ids), RESOURCE_METRICS), dtype=np.int64)
+        np.add.at(per_truck, (day_idx, np.searchsorted(self.truck_ids, self._column("truck"))), metrics)
+        per_driver = np.zeros((self.n_days, len(self.driver_ids), RESOURCE_METRICS), dtype=np.int64)
+        np.add.at(per_driver, (day_idx, np.searchsorted(self.driver_ids, self._column("driver"))), metrics)
+
+        # Fila 0 en ceros: suma del rango [a, b] = P[b + 1] - P[a]
+        self._status_prefix = self._prefix(per_status)
+        self._day_prefix = self._prefix(per_day)
+        self._truck_prefix = self._prefix(per_truck)
+        self._driver_prefix = self._prefix(per_driver)
+
+    @staticmethod
+    def _prefix(values):
+        prefix = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=np.int64)
+        np.cumsum(values, axis=0, out=prefix[1:])
+        return prefix
+
+    # --- Actualización incremental ---
+
+    def _apply_row(self, i: int, sign: int) -> bool:
+        """Suma (o resta) la fila i a los prefijos. False si cae fuera de las dimensiones actuales."""
+        columns = self._columns
+        d = int(columns["day"][i]) - self.origin
+        truck = self._truck_index.get(int(columns["truck"][i]))
+        driver = self._driver_index.get(int(columns["driver"][i]))
+        if not 0 <= d < self.n_days or truck is None or driver is None:
+            return False
+
+        status = int(columns["status"][i])
+        debt = int(columns["debt_cents"][i])
+        metrics = np.array([1, int(status == DEBT_CODE), debt, int(columns["full"][i])], dtype=np.int64) * sign
+
+        # Los prefijos de todos los días >= d cambian: O(días)
+        self._status_prefix[d + 1:, status] += sign
+        self._day_prefix[d + 1:, 0] += sign * int(columns["total"][i])
+        self._day_prefix[d + 1:, 1] += sign * max(debt, 0)
+        self._truck_prefix[d + 1:, truck] += metrics
+        self._driver_prefix[d + 1:, driver] += metrics
+        return True
+
+    def with_routes(self, rows: Iterable[Dict[str, int]]) -> "ColumnarSnapshot":
+        """
+        Copia con las rutas agregadas o reemplazadas. La instantánea original
+        no cambia: un reporte que ya la tiene sigue leyendo cifras coherentes.
+        """
+        updated = copy.copy(self)
+        updated._columns = {name: column.copy() for name, column in self._columns.items()}
+        updated._position = dict(self._position)
+        for name in ("_status_prefix", "_day_prefix", "_truck_prefix", "_driver_prefix"):
+            setattr(updated, name, getattr(self, name).copy())
+        for values in rows:
+            updated._upsert(values)
+        return updated
+
+    def _upsert(self, values: Dict[str, int]):
+        """Agrega una ruta nueva o reemplaza la versión anterior de una existente (en sitio)"""
+        i = self._position.get(values["route_id"])
+        if i is not None:
+            self._apply_row(i, -1)
+        else:
+            if self._size == len(self._columns["route_id"]):
+                for name, column in self._columns.items():
+                    self._columns[name] = np.concatenate([column, np.zeros_like(column)])
+            i = self._size
+            self._size += 1
+            self._position[values["route_id"]] = i
+
+        for name in COLUMNS:
+            self._columns[name][i] = values[name]
+        if not self._apply_row(i, +1):
+            # Día fuera de la ventana o camioneta/chofer nuevos: reconstruir sin ir a la BD
+            self._build_aggregates()
+
+    # --- Consultas ---
+
+    def _bounds(self, start_date: date, end_date: date):
+        """Índices [a, b) de prefijos para el rango, recortados a la ventana"""
+        a = min(max(start_date.toordinal() - self.origin, 0), self.n_days)
+        b = min(max(end_date.toordinal() - self.origin + 1, 0), self.n_days)
+        return a, max(a, b)
+
+    def kpis(self, start_date: date, end_date: date, today: date) -> dict:
+        """Mismo contrato que kpi_service.compute_kpis"""
+        a, b = self._bounds(start_date, end_date)
+        per_status = self._status_prefix[b] - self._status_prefix[a]
+        bottles, debt_cents = self._day_prefix[b] - self._day_prefix[a]
+        t, t_end = self._bounds(today, today)
+        today_routes = int((self._status_prefix[t_end] - self._status_prefix[t]).sum())
+
+        total_routes = int(per_status.sum())
+        problematic_routes = int(per_status[DEBT_CODE])
+        success_rate = ((total_routes - problematic_routes) / total_routes * 100) if total_routes > 0 else 100
+        return {
+            "total_routes": total_routes,
+            "problematic_routes": problematic_routes,
+            "total_bottles": int(bottles),
+            "total_debt": int(debt_cents) / 100,
+            "success_rate": round(success_rate, 2),
+            "today_routes": today_routes,
+            "active_routes": int(self._status_prefix[-1, IN_PROGRESS_CODE]),
+            "distribution": {
+                status.value: int(per_status[code]) for code, status in enumerate(STATUSES)
+            },
+        }
+
+    def _resource_totals(self, prefix, ids, start_date: date, end_date: date) -> List[dict]:
+        a, b = self._bounds(start_date, end_date)
+        totals = prefix[b] - prefix[a]  # (recursos, métricas): O(k)
+        active = np.nonzero(totals[:, 0] > 0)[0]
+        return [
+            {
+                "id": int(ids[k]),
+                "total_routes": int(totals[k, 0]),
+                "problematic_routes": int(totals[k, 1]),
+                "total_debt": int(totals[k, 2]) / 100,
+                "total_bottles_delivered": int(totals[k, 3]),
+            }
+            for k in active
+        ]
+
+    def truck_totals(self, start_date: date, end_date: date) -> List[dict]:
+        return self._resource_totals(self._truck_prefix, self.truck_ids, start_date, end_date)
+
+    def driver_totals(self, start_date: date, end_date: date) -> List[dict]:
+        return self._resource_totals(self._driver_prefix, self.driver_ids, start_date, end_date)
+
+
+def _route_values(route: RouteManifest) -> Dict[str, int]:
+    full = route.initial_full_bottles or 0
+    return {
+        "route_id": route.id,
+        "day": route.date.toordinal(),
+        "truck": route.truck_id,
+        "driver": route.driver_id,
+        "status": STATUS_CODE[route.audit_status],
+        "full": full,
+        "total": full + (route.initial_empty_bottles or 0),
+        "debt_cents": _cents(route.debt_amount),
+    }
+
+
+class ColumnarStore:
+    """Administra la instantánea del proceso y su sincronía con route_manifests"""
+
+    TABLES = ("route_manifests",)
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled and np is not None
+        self._snapshot: Optional[ColumnarSnapshot] = None
+        self._version: Optional[tuple] = None
+        self._lock = threading.RLock()
+
+    def snapshot(self, db: Session) -> Optional[ColumnarSnapshot]:
+        """
+        Instantánea al día, o None si el almacén está deshabilitado.
+
+        Si la sesión fijó versiones (get_read_db), solo se usa el almacén
+        cuando está en esas mismas versiones: así el dashboard no mezcla
+        cifras de otro momento con las de su instantánea. Si el almacén va
+        adelante (o atrás) de la sesión, None: el llamador usa los
+        acumulados SQL de su propia instantánea.
+        """
+        if not self.enabled:
+            return None
+        pinned = db.info.get("data_versions")
+        with self._lock:
+            current = data_version.current_versions(self.TABLES)
+            wanted = current if pinned is None else tuple(pinned.get(t, 0) for t in self.TABLES)
+            if self._snapshot is not None and self._version == wanted:
+                return self._snapshot
+            if wanted != current:
+                return None
+            self._snapshot = self._load(db)
+            self._version = current
+            return self._snapshot
+
+    def routes_committed(self, routes: Iterable[RouteManifest]):
+        """
+        Aplicar rutas recién confirmadas (llamar DESPUÉS del commit).
+        Si hubo otro commit intermedio que no vimos, se marca para recarga.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._snapshot is None:
+                return
+            current = data_version.current_versions(self.TABLES)
+            if current[0] != self._version[0] + 1:
+                self._snapshot = None
+                return
+            # Copia y cambio de referencia: quien ya tiene la instantánea no la ve cambiar
+            self._snapshot = self._snapshot.with_routes([_route_values(route) for route in routes])
+            self._version = current
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    @staticmethod
+    def _load(db: Session) -> ColumnarSnapshot:
+        """Carga completa: una sola consulta sobre route_manifests"""
+        # Escaneo completo intencional (una vez por cambio de datos, no por petición)
+        rows = db.query(
+            RouteManifest.id,
+            RouteManifest.date,
+            RouteManifest.truck_id,
+            RouteManifest.driver_id,
+            RouteManifest.audit_status,
+            RouteManifest.initial_full_bottles,
+            RouteManifest.initial_empty_bottles,
+            RouteManifest.debt_amount,
+        ).prefix_with(FULL_SCAN_HINT).all()
+        full = np.fromiter((r.initial_full_bottles or 0 for r in rows), dtype=np.int64, count=len(rows))
+        return ColumnarSnapshot({
+            "route_id": np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows)),
+            "day": np.fromiter((r.date.toordinal() for r in rows), dtype=np.int64, count=len(rows)),
+            "truck": np.fromiter((r.truck_id for r in rows), dtype=np.int64, count=len(rows)),
+            "driver": np.fromiter((r.driver_id for r in rows), dtype=np.int64, count=len(rows)),
+            "status": np.fromiter((STATUS_CODE[r.audit_status] for r in rows), dtype=np.int64, count=len(rows)),
+            "full": full,
+            "total": full + np.fromiter((r.initial_empty_bottles or 0 for r in rows), dtype=np.int64, count=len(rows)),
+            "debt_cents": np.fromiter((_cents(r.debt_amount) for r in rows), dtype=np.int64, count=len(rows)),
+        })
+
+
+# Instancia global usada por reports.py y las rutas
+columnar_store = ColumnarStore(enabled=settings.ANALYTICS_COLUMNAR_ENABLED)
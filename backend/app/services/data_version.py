@@ -0,0 +1,155 @@
+"""
+Versiones de datos por tabla.
+
+Cada commit que modifica una tabla incrementa su contador. Los caches usan
+estas versiones como parte de la llave, así un dato viejo nunca se sirve:
+al cambiar la versión, la llave anterior simplemente deja de consultarse.
+
+Los contadores se leen en memoria, pero cada commit también incrementa
+la fila de sus tablas en `table_versions`, dentro de la misma transacción.
+Antes de fijar versiones (get_read_db) o calcular un ETag, sync() compara
+esa tabla con lo último que vio el proceso: lo que confirmaron los
+comandos de app.cli u otro worker de uvicorn sube los contadores locales
+igual que un commit propio. EPOCH cambia en cada arranque para que nada
+calculado con contadores de un proceso anterior se confunda con los
+actuales.
+"""
+
+import hashlib
+import threading
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+_synced: Dict[str, int] = {}  # Última versión de table_versions vista por este proceso
+
+_PENDING_KEY = "changed_tables"
+_PERSISTED_KEY = "persisted_versions"
+# Sesiones que no registran versiones en table_versions (migraciones previas a 0005)
+UNVERSIONED_KEY = "unversioned"
+
+EPOCH = uuid.uuid4().hex
+
+
+def current_versions(tables: Iterable[str]) -> Tuple[int, ...]:
+    """Versión actual de cada tabla, en el orden recibido"""
+    with _lock:
+        return tuple(_versions.get(table, 0) for table in tables)
+
+
+def all_versions() -> Dict[str, int]:
+    """Copia de todas las versiones (para fijarlas al abrir una instantánea)"""
+    with _lock:
+        return dict(_versions)
+
+
+def fingerprint(tables: Iterable[str], *parts, versions: Optional[Dict[str, int]] = None) -> str:
+    """
+    Huella estable de (arranque, versiones de las tablas, partes extra).
+    `versions`: las fijadas por una instantánea (get_read_db); sin ellas, las actuales.
+    """
+    tables = tuple(tables)
+    table_versions = current_versions(tables) if versions is None else tuple(versions.get(t, 0) for t in tables)
+    raw = repr((EPOCH, tables, table_versions, parts))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def bump(*tables: str):
+    """Marcar tablas como modificadas (invalida todo lo que dependa de ellas)"""
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def sync(db: Session):
+    """
+    Incorporar los commits de otros procesos: cada tabla cuya versión en
+    table_versions difiere de la última vista se marca como modificada.
+    Una sola consulta a una tabla de pocas filas, en la sesión de la petición.
+    """
+    from app.models.table_version import TableVersion
+
+    stored = dict(db.execute(select(TableVersion.table_name, TableVersion.version)).all())
+    with _lock:
+        for table in set(stored) | set(_synced):
+            version = stored.get(table)
+            if _synced.get(table) == version:
+                continue
+            # Otro proceso confirmó (o la base se restauró): versión local nueva
+            _versions[table] = _versions.get(table, 0) + 1
+            if version is None:
+                _synced.pop(table)
+            else:
+                _synced[table] = version
+
+
+def mark_changed(db: Session, *tables: str):
+    """
+    Registrar tablas modificadas en la transacción actual.
+    Se confirman (bump) solo si la transacción hace commit.
+    """
+    db.info.setdefault(_PENDING_KEY, set()).update(tables)
+
+
+# --- Eventos de sesión: detectan los cambios sin tocar cada endpoint ---
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    if tables:
+        mark_changed(session, *tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_tables(orm_execute_state):
+    # INSERT/UPDATE/DELETE masivos (Core o query.delete()) no pasan por el flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            mark_changed(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _persist_changed_tables(session):
+    # Mismo commit que los datos: nunca se ve un cambio sin su versión
+    if session.info.get(UNVERSIONED_KEY):
+        return
+    session.flush()  # commit() hace el último flush después de este evento
+    tables = session.info.get(_PENDING_KEY)
+    if not tables:
+        return
+    from app.models.table_version import TableVersion
+
+    connection = session.connection()
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(TableVersion).values([{"table_name": table, "version": 1} for table in sorted(tables)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["table_name"], set_={"version": TableVersion.version + 1}
+    ).returning(TableVersion.table_name, TableVersion.version)
+    # Por la conexión y no por la sesión: esta escritura no se registra como cambio
+    session.info[_PERSISTED_KEY] = dict(connection.execute(stmt).all())
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    tables = session.info.pop(_PENDING_KEY, None)
+    persisted = session.info.pop(_PERSISTED_KEY, {})
+    if tables:
+        bump(*tables)
+    with _lock:
+        _synced.update(persisted)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_tables(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_PERSISTED_KEY, None)
@@ -0,0 +1,250 @@
+"""
+Libro de deudas de los choferes.
+
+El check-in registra la deuda de la ruta como un DebtRecord PENDING. Los
+cambios de estado (PAID, FORGIVEN, DEDUCTED, DISPUTED) pasan por
+change_status. Cada cambio actualiza, en la MISMA transacción, el saldo
+del chofer (driver_debt_balances) y su deuda abierta por fecha
+(driver_debt_aging). Así el saldo y la antigüedad de toda la flotilla se
+leen de tablas con una fila por chofer (o por chofer y día), no sumando el
+historial de rutas.
+
+Deuda abierta = PENDING + DISPUTED. PAID, FORGIVEN y DEDUCTED la cierran.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.debt_record import DebtRecord, DebtStatus
+from app.models.debt_balance import DriverDebtBalance, DriverDebtAging
+from app.models.route_manifest import RouteManifest
+from app.models.user import User
+from app.services.rollup_service import apply_deltas
+
+OPEN_STATUSES = (DebtStatus.PENDING, DebtStatus.DISPUTED)
+
+# Estado actual -> estados permitidos
+TRANSITIONS = {
+    DebtStatus.PENDING: {DebtStatus.PAID, DebtStatus.FORGIVEN, DebtStatus.DEDUCTED, DebtStatus.DISPUTED},
+    DebtStatus.DISPUTED: {DebtStatus.PENDING, DebtStatus.PAID, DebtStatus.FORGIVEN, DebtStatus.DEDUCTED},
+    DebtStatus.PAID: set(),
+    DebtStatus.FORGIVEN: set(),
+    DebtStatus.DEDUCTED: set(),
+}
+
+BALANCE_KEYS = {
+    DriverDebtBalance: ("driver_id",),
+    DriverDebtAging: ("driver_id", "debt_date"),
+}
+
+# Rangos de antigüedad en días (inclusive), el último sin tope
+AGING_BUCKETS = (("0_30", 0, 30), ("31_60", 31, 60), ("61_90", 61, 90), ("90_plus", 91, None))
+
+
+class InvalidDebtTransition(Exception):
+    """El estado actual de la deuda no permite el cambio pedido"""
+
+
+def debt_contribution(record: DebtRecord, debt_date: date) -> Dict[tuple, Dict[str, float]]:
+    """Aporte de una deuda a los saldos (vacío si está cerrada)"""
+    if record.driver_id is None or record.status not in OPEN_STATUSES:
+        return {}
+    amount = record.amount or 0.0
+    disputed = record.status == DebtStatus.DISPUTED
+    return {
+        (DriverDebtBalance, (record.driver_id,)): {
+            "pending_amount": 0.0 if disputed else amount,
+            "disputed_amount": amount if disputed else 0.0,
+            "open_records": 1,
+        },
+        (DriverDebtAging, (record.driver_id, debt_date)): {
+            "open_amount": amount,
+            "open_records": 1,
+        },
+    }
+
+
+def _collect(deltas, contribution, sign: float):
+    for key, values in contribution.items():
+        bucket = deltas.setdefault(key, defaultdict(float))
+        for column, value in values.items():
+            bucket[column] += sign * value
+
+
+def _apply(db: Session, deltas):
+    apply_deltas(db, deltas, BALANCE_KEYS)
+    # Días sin deuda abierta: se borran para que la tabla no crezca con el historial
+    drivers = {key[0] for (model, key) in deltas if model is DriverDebtAging}
+    if drivers:
+        db.execute(delete(DriverDebtAging).where(
+            DriverDebtAging.driver_id.in_(drivers), DriverDebtAging.open_records <= 0
+        ))
+
+
+def record_route_debt(db: Session, route: RouteManifest) -> Optional[DebtRecord]:
+    """
+    Registrar (o ajustar, si reintentan el check-in) la deuda de la ruta.
+    Lo ya cerrado (pagado, perdonado, deducido) se descuenta; lo abierto se
+    reemplaza por el monto nuevo. No hace commit.
+    """
+    records = db.query(DebtRecord).filter(DebtRecord.route_manifest_id == route.id).all()
+    deltas = {}
+    settled = sum(r.amount for r in records if r.status not in OPEN_STATUSES)
+    open_records = [r for r in records if r.status in OPEN_STATUSES]
+    owed = round((route.debt_amount or 0.0) - settled, 2)
+
+    kept = open_records[0] if open_records and owed > 0 else None
+    for record in open_records:
+        _collect(deltas, debt_contribution(record, route.date), -1)
+        if record is not kept:
+            db.delete(record)
+
+    if owed > 0:
+        if kept is None:
+            kept = DebtRecord(
+                route_manifest_id=route.id,
+                driver_id=route.driver_id,
+                status=DebtStatus.PENDING,
+                notes=f"Check-in ruta {route.id}",
+            )
+            db.add(kept)
+        kept.amount = owed
+        kept.driver_id = route.driver_id
+        _collect(deltas, debt_contribution(kept, route.date), 1)
+
+    _apply(db, deltas)
+    return kept
+
+
+def change_status(
+    db: Session,
+    record: DebtRecord,
+    new_status: DebtStatus,
+    user_id: int,
+    notes: Optional[str] = None,
+) -> dict:
+    """
+    Cambiar el estado de una deuda y sus saldos. Regresa el estado anterior
+    (para la bitácora). No hace commit.
+    """
+    if new_status not in TRANSITIONS[record.status]:
+        raise InvalidDebtTransition(f"No se puede pasar de {record.status.value} a {new_status.value}")
+
+    debt_date = db.query(RouteManifest.date).filter(RouteManifest.id == record.route_manifest_id).scalar()
+    before = {"status": record.status.value, "amount": record.amount}
+    deltas = {}
+    _collect(deltas, debt_contribution(record, debt_date), -1)
+
+    record.status = new_status
+    if new_status in OPEN_STATUSES:
+        record.resolved_at = None
+        record.resolved_by_user_id = None
+    else:
+        record.resolved_at = datetime.utcnow()
+        record.resolved_by_user_id = user_id
+    if notes:
+        record.resolution_notes = notes
+
+    _collect(deltas, debt_contribution(record, debt_date), 1)
+    _apply(db, deltas)
+    return before
+
+
+def pending_debts_query(period_start: date, period_end: date, after_id: int = 0):
+    """
+    Deudas PENDING de rutas del periodo, por id. Cada fila trae lo que
+    necesita debt_contribution (driver_id, status, amount) y la fecha.
+    """
+    return select(
+        DebtRecord.id, DebtRecord.driver_id, DebtRecord.status, DebtRecord.amount,
+        RouteManifest.date.label("debt_date"),
+    ).join(
+        RouteManifest, RouteManifest.id == DebtRecord.route_manifest_id
+    ).where(
+        DebtRecord.id > after_id,
+        DebtRecord.status == DebtStatus.PENDING,
+        DebtRecord.driver_id.isnot(None),
+        RouteManifest.date >= period_start,
+        RouteManifest.date <= period_end,
+    ).order_by(DebtRecord.id)
+
+
+def deduct_in_bulk(db: Session, rows, user_id: int, payroll_run_id: int, notes: Optional[str] = None):
+    """
+    Pasar a DEDUCTED las deudas de `rows` (filas de pending_debts_query) con
+    un solo UPDATE y un ajuste de saldos por chofer/día. Equivale a
+    change_status en cada una, sin cargarlas como objetos. No hace commit.
+    """
+    deltas = {}
+    for row in rows:
+        _collect(deltas, debt_contribution(row, row.debt_date), -1)
+    db.execute(
+        update(DebtRecord).where(
+            DebtRecord.id.in_([row.id for row in rows]),
+            DebtRecord.status == DebtStatus.PENDING,
+        ).values(
+            status=DebtStatus.DEDUCTED,
+            resolved_at=datetime.utcnow(),
+            resolved_by_user_id=user_id,
+            payroll_run_id=payroll_run_id,
+            resolution_notes=notes,
+        ).execution_options(synchronize_session=False)
+    )
+    _apply(db, deltas)
+
+
+# --- Consultas (una fila por chofer) ---
+
+def driver_balances(db: Session, driver_id: Optional[int] = None) -> List[dict]:
+    query = db.query(DriverDebtBalance, User.full_name).join(
+        User, User.id == DriverDebtBalance.driver_id
+    ).filter(DriverDebtBalance.open_records > 0)
+    if driver_id is not None:
+        query = query.filter(DriverDebtBalance.driver_id == driver_id)
+    return [
+        {
+            "driver_id": balance.driver_id,
+            "full_name": full_name,
+            "balance": round(balance.pending_amount + balance.disputed_amount, 2),
+            "pending_amount": round(balance.pending_amount, 2),
+            "disputed_amount": round(balance.disputed_amount, 2),
+            "open_records": balance.open_records,
+        }
+        for balance, full_name in query.order_by(
+            (DriverDebtBalance.pending_amount + DriverDebtBalance.disputed_amount).desc()
+        ).all()
+    ]
+
+
+def driver_aging(db: Session, today: Optional[date] = None) -> List[dict]:
+    """Deuda abierta por chofer en rangos de antigüedad (días desde la fecha de la ruta)"""
+    today = today or date.today()
+    columns = []
+    for name, low, high in AGING_BUCKETS:
+        # Fechas límite en Python: la consulta compara fechas, sin aritmética en SQL
+        newest = date.fromordinal(today.toordinal() - low)
+        condition = DriverDebtAging.debt_date <= newest
+        if high is not None:
+            condition = condition & (DriverDebtAging.debt_date >= date.fromordinal(today.toordinal() - high))
+        columns.append(func.sum(case((condition, DriverDebtAging.open_amount), else_=0.0)).label(name))
+
+    rows = db.query(
+        DriverDebtAging.driver_id, User.full_name, *columns
+    ).join(
+        User, User.id == DriverDebtAging.driver_id
+    ).group_by(
+        DriverDebtAging.driver_id, User.full_name
+    ).order_by(DriverDebtAging.driver_id).all()
+
+    return [
+        {
+            "driver_id": row.driver_id,
+            "full_name": row.full_name,
+            **{name: round(getattr(row, name) or 0.0, 2) for name, _, _ in AGING_BUCKETS},
+        }
+        for row in rows
+    ]
@@ -0,0 +1,351 @@
+"""
+Reportes federados: varias plantas en un solo tablero.
+
+Cada despliegue es una planta con su propia base. La oficina central registra
+las bases de las demás plantas (FEDERATION_PLANTS) y cada reporte se reparte
+en paralelo, una consulta por planta, en un pool de hilos acotado
+(FEDERATION_WORKERS; sqlite3 suelta el GIL mientras ejecuta la consulta).
+
+Cada planta regresa agregados PARCIALES que se pueden sumar (conteos,
+garrafones, deuda); los porcentajes de éxito se recalculan a partir de los
+conteos ya sumados, nunca promediando porcentajes. Las consultas van a los
+acumulados diarios por SQL: el almacén columnar solo refleja la base local.
+
+Las bases remotas se abren en solo lectura. Si una planta falla, el reporte
+se arma con las demás y la falla se informa en `plants`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import create_engine, event, func, desc, case
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.database import ReadSessionLocal, begin_read_snapshot
+from app.models.user import User, UserRole
+from app.models.truck import Truck
+from app.models.route_manifest import AuditStatus
+from app.models.daily_rollup import DailyStatusRollup, DailyTruckRollup, DailyDriverRollup
+from app.services.kpi_service import compute_kpis, success_rate
+
+
+class FederationConfigError(ValueError):
+    """Entrada mal formada en FEDERATION_PLANTS"""
+
+
+@dataclass
+class Plant:
+    plant_id: int
+    name: str
+    session_factory: Callable[[], Session]
+
+
+def _read_only_url(url: str) -> str:
+    """
+    Archivo SQLite en modo solo lectura (URI mode=ro): una ruta mal escrita
+    falla en lugar de crear una base vacía que reportaría ceros.
+    """
+    prefix = "sqlite:///"
+    if not url.startswith(prefix) or "?" in url:
+        return url
+    return f"{prefix}file:{url[len(prefix):]}?mode=ro&uri=true"
+
+
+def _plant_engine(url: str):
+    engine = create_engine(
+        _read_only_url(url),
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+    )
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _query_only(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA query_only=ON")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+            cursor.close()
+    return engine
+
+
+def parse_plants(entries: List[str]) -> List[tuple]:
+    """
+    Entradas "ID:Nombre:URL", p. ej. "2:Planta Norte:sqlite:///./data/norte.db".
+    Regresa [(plant_id, nombre, url)].
+    """
+    plants = []
+    for entry in entries:
+        parts = entry.split(":", 2)
+        if len(parts) != 3 or not parts[0].strip().isdigit() or not parts[2].strip():
+            raise FederationConfigError(f"Planta mal configurada: {entry!r} (formato ID:Nombre:URL)")
+        plants.append((int(parts[0]), parts[1].strip(), parts[2].strip()))
+    return plants
+
+
+class Federation:
+    """Registro de plantas y pool de hilos que reparte las consultas"""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._plants: Optional[List[Plant]] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def plants(self) -> List[Plant]:
+        """La planta local siempre participa; las demás salen de la configuración"""
+        with self._lock:
+            if self._plants is None:
+                # Planta local por el engine de solo lectura: no compite con los check-ins
+                plants = [Plant(settings.PLANT_ID, settings.PLANT_NAME, ReadSessionLocal)]
+                for plant_id, name, url in parse_plants(settings.FEDERATION_PLANTS):
+                    if any(p.plant_id == plant_id for p in plants):
+                        raise FederationConfigError(f"Planta {plant_id} registrada dos veces")
+                    plants.append(Plant(plant_id, name, sessionmaker(bind=_plant_engine(url))))
+                self._plants = plants
+            return self._plants
+
+    def register(self, plant_id: int, name: str, url: str):
+        """Alta en caliente (pruebas y scripts); la configuración es la vía normal"""
+        plants = self.plants()
+        with self._lock:
+            if any(p.plant_id == plant_id for p in plants):
+                raise FederationConfigError(f"Planta {plant_id} registrada dos veces")
+            plants.append(Plant(plant_id, name, sessionmaker(bind=_plant_engine(url))))
+
+    def reset(self):
+        with self._lock:
+            self._plants = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="federation"
+                )
+            return self._executor
+
+    def fan_out(self, partial: Callable[[Session], Any]) -> List[Dict[str, Any]]:
+        """
+        Ejecuta `partial(db)` en cada planta en paralelo, cada una en su propia
+        instantánea de lectura. Regresa [{"plant": Plant, "result" | "error"}].
+        """
+        def run(plant: Plant):
+            db = plant.session_factory()
+            try:
+                begin_read_snapshot(db)
+                return {"plant": plant, "result": partial(db)}
+            except Exception as exc:
+                logger.warning(f"Federación: planta {plant.plant_id} no respondió: {exc}")
+                return {"plant": plant, "error": str(exc)}
+            finally:
+                db.close()
+
+        return list(self._pool().map(run, self.plants()))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+federation = Federation(workers=settings.FEDERATION_WORKERS)
+
+
+# --- Agregados parciales por planta ---
+
+def _partial_kpis(start_date: date, end_date: date, today: date):
+    return lambda db: compute_kpis(db, start_date, end_date, today=today, use_columnar=False)
+
+
+def _partial_trends(start_date: date):
+    def query(db: Session):
+        return db.query(
+            DailyStatusRollup.date,
+            func.sum(DailyStatusRollup.route_count).label("total"),
+            func.sum(case(
+                (DailyStatusRollup.audit_status == AuditStatus.DEBT, DailyStatusRollup.route_count),
+                else_=0
+            )).label("with_debt"),
+            func.sum(DailyStatusRollup.debt_amount).label("debt_amount")
+        ).filter(
+            DailyStatusRollup.date >= start_date
+        ).group_by(
+            DailyStatusRollup.date
+        ).having(
+            func.sum(DailyStatusRollup.route_count) > 0
+        ).all()
+    return query
+
+
+def _partial_trucks(start_date: date, end_date: date):
+    def query(db: Session):
+        return db.query(
+            Truck.id,
+            Truck.nickname,
+            Truck.plate,
+            func.sum(DailyTruckRollup.route_count).label("total_routes"),
+            func.sum(DailyTruckRollup.problematic_routes).label("problematic_routes"),
+            func.sum(DailyTruckRollup.debt_amount).label("total_debt"),
+            func.sum(DailyTruckRollup.full_bottles).label("total_bottles_delivered")
+        ).join(
+            DailyTruckRollup, DailyTruckRollup.truck_id == Truck.id
+        ).filter(
+            DailyTruckRollup.date >= start_date,
+            DailyTruckRollup.date <= end_date
+        ).group_by(
+            Truck.id, Truck.nickname, Truck.plate
+        ).having(
+            func.sum(DailyTruckRollup.route_count) > 0
+        ).all()
+    return query
+
+
+def _partial_drivers(start_date: date, end_date: date, limit: int):
+    # Los choferes no se comparten entre plantas: el top-N global está
+    # contenido en la unión de los top-N de cada planta
+    def query(db: Session):
+        return db.query(
+            User.id,
+            User.full_name,
+            func.sum(DailyDriverRollup.route_count).label("total_routes"),
+            func.sum(DailyDriverRollup.problematic_routes).label("problematic_routes"),
+            func.sum(DailyDriverRollup.debt_amount).label("total_debt"),
+            func.sum(DailyDriverRollup.full_bottles).label("total_bottles_delivered")
+        ).join(
+            DailyDriverRollup, DailyDriverRollup.driver_id == User.id
+        ).filter(
+            DailyDriverRollup.date >= start_date,
+            DailyDriverRollup.date <= end_date,
+            User.role == UserRole.CHOFER
+        ).group_by(
+            User.id, User.full_name
+        ).having(
+            func.sum(DailyDriverRollup.route_count) > 0
+        ).order_by(
+            desc("total_routes"), User.id
+        ).limit(limit).all()
+    return query
+
+
+# --- Fusión ---
+
+def _plant_status(outcomes) -> List[Dict[str, Any]]:
+    return [
+        {
+            "plant_id": o["plant"].plant_id,
+            "name": o["plant"].name,
+            "ok": "error" not in o,
+            **({"error": o["error"]} if "error" in o else {}),
+        }
+        for o in outcomes
+    ]
+
+
+def _succeeded(outcomes):
+    return [(o["plant"], o["result"]) for o in outcomes if "error" not in o]
+
+
+def merge_kpis(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Suma los KPIs de cada planta; el porcentaje de éxito sale de los conteos sumados"""
+    merged = {
+        "total_routes": 0,
+        "problematic_routes": 0,
+        "total_bottles": 0,
+        "total_debt": 0.0,
+        "today_routes": 0,
+        "active_routes": 0,
+        "distribution": {status.value: 0 for status in AuditStatus},
+    }
+    for kpis in partials:
+        for key in ("total_routes", "problematic_routes", "total_bottles", "total_debt",
+                    "today_routes", "active_routes"):
+            merged[key] += kpis[key]
+        for status, count in kpis["distribution"].items():
+            merged["distribution"][status] += count
+    merged["total_debt"] = round(merged["total_debt"], 2)
+    merged["success_rate"] = success_rate(merged["total_routes"], merged["problematic_routes"])
+    return merged
+
+
+def _performance_row(plant: Plant, key: str, row, **names) -> Dict[str, Any]:
+    problematic = row.problematic_routes or 0
+    return {
+        "plant_id": plant.plant_id,
+        "plant_name": plant.name,
+        key: row.id,
+        **names,
+        "total_routes": row.total_routes,
+        "problematic_routes": problematic,
+        "total_debt": float(row.total_debt or 0),
+        "total_bottles_delivered": row.total_bottles_delivered or 0,
+        "success_rate": success_rate(row.total_routes, problematic),
+    }
+
+
+def _rank(rows: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+    return sorted(rows, key=lambda r: (-r["total_routes"], r["plant_id"], r[key]))
+
+
+# --- Reportes ---
+
+def federated_kpis(start_date: date, end_date: date, today: date = None) -> Dict[str, Any]:
+    today = today or date.today()
+    outcomes = federation.fan_out(_partial_kpis(start_date, end_date, today))
+    succeeded = _succeeded(outcomes)
+    merged = merge_kpis([kpis for _, kpis in succeeded])
+    merged["by_plant"] = [
+        {
+            "plant_id": plant.plant_id,
+            "plant_name": plant.name,
+            "total_routes": kpis["total_routes"],
+            "problematic_routes": kpis["problematic_routes"],
+            "total_debt": kpis["total_debt"],
+            "success_rate": kpis["success_rate"],
+        }
+        for plant, kpis in succeeded
+    ]
+    merged["period"] = {"start": start_date.isoformat(), "end": end_date.isoformat()}
+    merged["plants"] = _plant_status(outcomes)
+    return merged
+
+
+def federated_trends(start_date: date) -> Dict[str, Any]:
+    outcomes = federation.fan_out(_partial_trends(start_date))
+    by_day: Dict[date, Dict[str, Any]] = {}
+    for _, rows in _succeeded(outcomes):
+        for row in rows:
+            day = by_day.setdefault(row.date, {"total_routes": 0, "routes_with_debt": 0, "debt_amount": 0.0})
+            day["total_routes"] += row.total
+            day["routes_with_debt"] += row.with_debt or 0
+            day["debt_amount"] += float(row.debt_amount or 0)
+    return {
+        "trends": [
+            {"date": day.isoformat(), **{**totals, "debt_amount": round(totals["debt_amount"], 2)}}
+            for day, totals in sorted(by_day.items())
+        ],
+        "plants": _plant_status(outcomes),
+    }
+
+
+def federated_trucks(start_date: date, end_date: date) -> Dict[str, Any]:
+    outcomes = federation.fan_out(_partial_trucks(start_date, end_date))
+    rows = [
+        _performance_row(plant, "truck_id", row, nickname=row.nickname, plate=row.plate)
+        for plant, result in _succeeded(outcomes)
+        for row in result
+    ]
+    return {"trucks": _rank(rows, "truck_id"), "plants": _plant_status(outcomes)}
+
+
+def federated_drivers(start_date: date, end_date: date, limit: int) -> Dict[str, Any]:
+    outcomes = federation.fan_out(_partial_drivers(start_date, end_date, limit))
+    rows = [
+        _performance_row(plant, "driver_id", row, full_name=row.full_name)
+        for plant, result in _succeeded(outcomes)
+        for row in result
+    ]
+    return {"drivers": _rank(rows, "driver_id")[:limit], "plants": _plant_status(outcomes)}
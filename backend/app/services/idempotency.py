@@ -0,0 +1,187 @@
+"""
+Almacén de Idempotency-Key para los POST de rutas (checkout / check-in).
+
+Las handhelds reintentan cuando la red falla. Con el header Idempotency-Key
+la primera petición se ejecuta y su respuesta se guarda; un reintento con la
+misma llave recibe esa respuesta guardada sin tocar las tablas de rutas.
+Si el reintento llega mientras la primera sigue en curso, espera a que
+termine en lugar de competir con ella.
+
+La llave se aísla por credencial, método y ruta; si se reutiliza con otro
+cuerpo se rechaza (422). Solo se guardan respuestas < 500: tras un error
+del servidor el cliente puede reintentar con la misma llave. El reintento
+recibe también los headers de la original (sin los de conexión).
+
+Vive en memoria del proceso (un worker, ver data_version) con TTL y tope de
+entradas; las más antiguas se descartan primero.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from app.config import settings
+
+
+@dataclass
+class IdempotentEntry:
+    fingerprint: str
+    expires_at: float
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    status_code: Optional[int] = None
+    body: bytes = b""
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def completed(self) -> bool:
+        return self.status_code is not None
+
+
+class KeyReuseError(Exception):
+    """La llave ya se usó con otro cuerpo de petición"""
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, IdempotentEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.replays = 0
+
+    @staticmethod
+    def scope(credential: str, method: str, path: str, key: str) -> str:
+        """Llave interna: no guarda el token en claro"""
+        return hashlib.sha256(f"{credential}\0{method}\0{path}\0{key}".encode()).hexdigest()
+
+    @staticmethod
+    def fingerprint(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def begin(self, scope: str, fingerprint: str) -> Tuple[IdempotentEntry, bool]:
+        """
+        Regresa (entrada, es_nueva). Si es nueva, el llamador ejecuta la
+        petición y después llama a complete() o abandon().
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(scope)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    raise KeyReuseError()
+                return entry, False
+            entry = IdempotentEntry(fingerprint=fingerprint, expires_at=now + self.ttl_seconds)
+            self._entries[scope] = entry
+            return entry, True
+
+    def complete(self, entry: IdempotentEntry, status_code: int, body: bytes, headers: List[Tuple[str, str]]):
+        entry.status_code = status_code
+        entry.body = body
+        entry.headers = headers
+        entry.done.set()
+
+    def abandon(self, scope: str, entry: IdempotentEntry):
+        """La petición falló: liberar la llave y despertar a quien espera"""
+        with self._lock:
+            if self._entries.get(scope) is entry:
+                del self._entries[scope]
+        entry.done.set()
+
+    def _evict(self, now: float):
+        while self._entries:
+            scope, oldest = next(iter(self._entries.items()))
+            if oldest.expires_at > now and len(self._entries) < self.max_entries:
+                break
+            if not oldest.completed and oldest.expires_at > now:
+                break  # No descartar una petición en curso
+            del self._entries[scope]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "replays": self.replays}
+
+
+# --- Middleware ---
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+)
+
+IDEMPOTENT_PREFIX = f"{settings.API_V1_PREFIX}/routes/"
+
+# No se guardan: son de la conexión, no de la respuesta (content-length se recalcula)
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "trailers", "transfer-encoding", "upgrade", "content-length",
+}
+
+
+def _stored_headers(response) -> List[Tuple[str, str]]:
+    """Headers de la respuesta original, en orden y con repetidos (set-cookie)"""
+    return [
+        (name.decode("latin-1"), value.decode("latin-1"))
+        for name, value in response.raw_headers
+        if name.decode("latin-1").lower() not in HOP_BY_HOP_HEADERS
+    ]
+
+
+def _build_response(content: bytes, status_code: int, headers: List[Tuple[str, str]]) -> Response:
+    response = Response(content=content, status_code=status_code)
+    for name, value in headers:
+        response.headers.append(name, value)
+    return response
+
+
+async def idempotency_middleware(request: Request, call_next):
+    key = request.headers.get("idempotency-key")
+    if request.method != "POST" or not key or not request.url.path.startswith(IDEMPOTENT_PREFIX):
+        return await call_next(request)
+    if len(key) > 255:
+        return JSONResponse(status_code=400, content={"detail": "Idempotency-Key demasiado larga"})
+
+    body = await request.body()
+    scope = IdempotencyStore.scope(request.headers.get("authorization", ""), request.method, request.url.path, key)
+    try:
+        entry, is_new = idempotency_store.begin(scope, IdempotencyStore.fingerprint(body))
+    except KeyReuseError:
+        return JSONResponse(status_code=422, content={"detail": "Idempotency-Key ya usada con otra petición"})
+
+    if not is_new:
+        if not entry.completed:
+            try:
+                await asyncio.wait_for(entry.done.wait(), settings.IDEMPOTENCY_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                return JSONResponse(status_code=409, content={"detail": "La petición original sigue en proceso"})
+        if not entry.completed:
+            # La original falló sin guardar respuesta: esta toma su lugar
+            return await idempotency_middleware(request, call_next)
+        idempotency_store.replays += 1
+        replay = _build_response(entry.body, entry.status_code, entry.headers)
+        replay.headers["Idempotent-Replayed"] = "true"
+        return replay
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        idempotency_store.abandon(scope, entry)
+        raise
+
+    media_type = response.headers.get("content-type")
+    if response.status_code >= 500 or (media_type or "").startswith("application/x-ndjson"):
+        # Errores del servidor y respuestas en stream no se guardan
+        idempotency_store.abandon(scope, entry)
+        return response
+
+    content = b"".join([chunk async for chunk in response.body_iterator])
+    headers = _stored_headers(response)
+    idempotency_store.complete(entry, response.status_code, content, headers)
+    return _build_response(content, response.status_code, headers)
@@ -0,0 +1,91 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, or_, and_
+from datetime import date
+from typing import Dict, Any
+
+from app.models.route_manifest import AuditStatus
+from app.models.daily_rollup import DailyStatusRollup
+from app.services.columnar_store import columnar_store
+
+
+def compute_kpis(
+    db: Session, start_date: date, end_date: date, today: date = None, use_columnar: bool = True
+) -> Dict[str, Any]:
+    """
+    Motor de KPIs en una sola pasada.
+
+    Obtiene todas las cifras del dashboard (totales del rango, deuda, garrafones,
+    rutas de hoy, rutas activas y distribución por estado) con UNA consulta de
+    agregación condicional sobre los acumulados diarios por estado, en lugar de
+    un escaneo del rango por cada cifra.
+
+    `use_columnar=False` fuerza la consulta SQL: el almacén columnar solo
+    refleja la base local (la federación lo usa así contra otras plantas).
+    """
+    if today is None:
+        today = date.today()
+
+    # Con el almacén columnar activo, el rango sale de restar sumas prefijas
+    snapshot = columnar_store.snapshot(db) if use_columnar else None
+    if snapshot is not None:
+        return snapshot.kpis(start_date, end_date, today)
+
+    in_range = and_(DailyStatusRollup.date >= start_date, DailyStatusRollup.date <= end_date)
+    is_today = DailyStatusRollup.date == today
+    is_active = DailyStatusRollup.audit_status == AuditStatus.IN_PROGRESS
+
+    # Agrupar por estado da la distribución y las rutas activas sin columnas extra
+    rows = db.query(
+        DailyStatusRollup.audit_status,
+        func.sum(case((in_range, DailyStatusRollup.route_count), else_=0)).label("in_range"),
+        func.sum(case((in_range, DailyStatusRollup.total_bottles), else_=0)).label("bottles"),
+        func.sum(case((in_range, DailyStatusRollup.positive_debt_amount), else_=0)).label("debt"),
+        func.sum(case((is_today, DailyStatusRollup.route_count), else_=0)).label("today"),
+        func.sum(DailyStatusRollup.route_count).label("matched"),
+    ).filter(
+        # Solo se leen los acumulados que aportan a alguna cifra
+        or_(in_range, is_today, is_active)
+    ).group_by(
+        DailyStatusRollup.audit_status
+    ).all()
+
+    distribution = {status.value: 0 for status in AuditStatus}
+    total_bottles = total_debt = today_routes = active_routes = 0
+    for row in rows:
+        distribution[row.audit_status.value] = row.in_range or 0
+        total_bottles += row.bottles or 0
+        total_debt += row.debt or 0
+        today_routes += row.today or 0
+        if row.audit_status == AuditStatus.IN_PROGRESS:
+            active_routes = row.matched or 0
+
+    total_routes = sum(distribution.values())
+    problematic_routes = distribution[AuditStatus.DEBT.value]
+
+    return {
+        "total_routes": total_routes,
+        "problematic_routes": problematic_routes,
+        "total_bottles": int(total_bottles),
+        "total_debt": float(total_debt),
+        "success_rate": success_rate(total_routes, problematic_routes),
+        "today_routes": today_routes,
+        "active_routes": active_routes,
+        "distribution": distribution,
+    }
+
+
+def success_rate(total_routes: int, problematic_routes: int) -> float:
+    """Porcentaje de rutas sin deuda (100 si no hay rutas)"""
+    return round(
+        ((total_routes - problematic_routes) / total_routes * 100) if total_routes > 0 else 100,
+        2
+    )
+
+
+def status_distribution(kpis: Dict[str, Any]):
+    """Formato de status/distribution a partir del resultado de compute_kpis"""
+    return [
+        {"status": status, "count": count}
+        for status, count in kpis["distribution"].items()
+        if count > 0
+    ]
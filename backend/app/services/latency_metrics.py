@@ -0,0 +1,61 @@
+"""
+Latencia por endpoint (p50/p95/p99) en memoria del proceso.
+
+Cada endpoint guarda sus últimas N muestras (METRICS_LATENCY_WINDOW); los
+percentiles se calculan al consultar GET /metrics/latency. La llave es la
+plantilla de la ruta ("POST /api/v1/routes/{route_id}/checkin"), no la URL,
+para que los ids no multipliquen las entradas.
+
+En respuestas en stream se mide hasta que salen los encabezados.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, List
+
+from app.config import settings
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LatencyRecorder:
+    def __init__(self, window: int):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds * 1000)
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {key: sorted(samples) for key, samples in self._samples.items()}
+            counts = dict(self._counts)
+        return {
+            key: {
+                "count": counts[key],
+                "window": len(ordered),
+                "p50_ms": round(_percentile(ordered, 50), 2),
+                "p95_ms": round(_percentile(ordered, 95), 2),
+                "p99_ms": round(_percentile(ordered, 99), 2),
+                "max_ms": round(ordered[-1], 2),
+            }
+            for key, ordered in sorted(snapshot.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+latency_recorder = LatencyRecorder(window=settings.METRICS_LATENCY_WINDOW)
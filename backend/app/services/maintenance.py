@@ -0,0 +1,309 @@
+"""
+Mantenimiento de la base SQLite dentro del proceso (MAINTENANCE_ENABLED).
+
+Un hilo despierta cada MAINTENANCE_POLL_SECONDS y:
+- hace checkpoint del WAL cuando el archivo -wal pasa de MAINTENANCE_WAL_MAX_MB
+  (a cualquier hora: un WAL grande vuelve lentas todas las lecturas);
+- una vez al día, dentro de la ventana de poca actividad
+  (MAINTENANCE_WINDOW_START-MAINTENANCE_WINDOW_END, hora local), corre la
+  rutina nocturna: ANALYZE, PRAGMA optimize, incremental_vacuum, checkpoint
+  y la revisión de los acumulados contra route_manifests. Antes sella en
+  archivos comprimidos los meses cerrados de la bitácora (audit_archive),
+  así el vacuum incremental recupera las páginas que liberan.
+
+La rutina tiene un presupuesto de tiempo (MAINTENANCE_BUDGET_SECONDS): la
+sentencia en curso se interrumpe al agotarse (progress handler de sqlite3) y
+los trabajos que no alcanzaron quedan como "skipped". Los trabajos que
+escriben toman turno en write_queue como cualquier transacción, así los
+check-ins que lleguen se intercalan entre pasos.
+
+El resultado de cada trabajo (estado, duración, detalle) queda en status()
+y se expone en GET /maintenance/status (solo administradores).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as clock
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.database import (
+    engine, SessionLocal, ReadSessionLocal, begin_read_snapshot,
+    write_queue, write_transaction, WriteQueueTimeout,
+)
+from app.services.audit_archive import archive_closed_months
+from app.services.rollup_service import check_rollups, rebuild_rollups
+
+
+def parse_clock(value: str) -> clock:
+    """"HH:MM" -> time"""
+    hours, minutes = value.split(":")
+    return clock(int(hours), int(minutes))
+
+
+def in_window(now: clock, start: clock, end: clock) -> bool:
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end  # La ventana cruza la medianoche
+
+
+@contextmanager
+def _deadline(dbapi_connection, deadline: float):
+    """Interrumpe la sentencia en curso ("interrupted") al pasar el límite"""
+    dbapi_connection.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+    try:
+        yield
+    finally:
+        dbapi_connection.set_progress_handler(None, 0)
+
+
+class MaintenanceScheduler:
+    def __init__(
+        self,
+        window_start: str,
+        window_end: str,
+        budget_seconds: float,
+        poll_seconds: float,
+        wal_max_mb: float,
+        vacuum_pages: int,
+        analysis_limit: int,
+        repair_rollups: bool,
+    ):
+        self.window_start = parse_clock(window_start)
+        self.window_end = parse_clock(window_end)
+        self.budget_seconds = budget_seconds
+        self.poll_seconds = poll_seconds
+        self.wal_max_mb = wal_max_mb
+        self.vacuum_pages = vacuum_pages
+        self.analysis_limit = analysis_limit
+        self.repair_rollups = repair_rollups
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+        self.last_nightly: Optional[str] = None
+        self.jobs: Dict[str, dict] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Mantenimiento programado {self.window_start:%H:%M}-{self.window_end:%H:%M} "
+            f"(presupuesto {self.budget_seconds:.0f} s)"
+        )
+
+    def stop(self, timeout: float = 30.0):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.tick(datetime.now())
+            except Exception as exc:
+                logger.error(f"Mantenimiento: error en el ciclo: {exc}")
+
+    def tick(self, now: datetime):
+        """Un ciclo del hilo (recibe la hora para poder probarlo)"""
+        if self.wal_size_mb() > self.wal_max_mb:
+            self.run_job("wal_checkpoint", self._checkpoint, time.monotonic() + self.budget_seconds)
+        if in_window(now.time(), self.window_start, self.window_end) \
+                and self.last_nightly != now.date().isoformat():
+            self.run_nightly(now)
+
+    # --- Rutina nocturna ---
+
+    def nightly_jobs(self) -> List[Tuple[str, Callable[[float], dict]]]:
+        return [
+            ("audit_archive", self._audit_archive),
+            ("analyze", self._analyze),
+            ("optimize", self._optimize),
+            ("incremental_vacuum", self._incremental_vacuum),
+            ("wal_checkpoint", self._checkpoint),
+            ("rollup_consistency", self._rollup_consistency),
+        ]
+
+    def run_nightly(self, now: Optional[datetime] = None) -> dict:
+        now = now or datetime.now()
+        with self._run_lock:
+            deadline = time.monotonic() + self.budget_seconds
+            for name, job in self.nightly_jobs():
+                if time.monotonic() >= deadline:
+                    self._record(name, "skipped", datetime.now(), 0.0, {"reason": "presupuesto agotado"})
+                    continue
+                self.run_job(name, job, deadline)
+            self.last_nightly = now.date().isoformat()
+        return self.status()
+
+    def run_job(self, name: str, job: Callable[[float], dict], deadline: float) -> dict:
+        started_at = datetime.now()
+        started = time.perf_counter()
+        try:
+            detail = job(deadline) or {}
+            status = detail.pop("status", "ok")
+        except WriteQueueTimeout:
+            status, detail = "skipped", {"reason": "sin turno de escritura"}
+        except (OperationalError, sqlite3.OperationalError) as exc:
+            # sqlite3.OperationalError: los trabajos que usan la conexión cruda (ANALYZE, vacuum...)
+            if "interrupted" not in str(exc):
+                status, detail = "error", {"error": str(getattr(exc, "orig", None) or exc)}
+            else:
+                status, detail = "timeout", {"reason": "presupuesto agotado a mitad del trabajo"}
+        except Exception as exc:
+            status, detail = "error", {"error": str(exc)}
+        return self._record(name, status, started_at, (time.perf_counter() - started) * 1000, detail)
+
+    def _record(self, name: str, status: str, started_at: datetime, duration_ms: float, detail: dict) -> dict:
+        result = {
+            "status": status,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "duration_ms": round(duration_ms, 1),
+            **detail,
+        }
+        self.jobs[name] = result
+        log = logger.info if status == "ok" else logger.warning
+        log(f"Mantenimiento: {name} {status} en {duration_ms:.0f} ms {detail or ''}")
+        return result
+
+    # --- Trabajos ---
+
+    @contextmanager
+    def _write_turn(self, deadline: float):
+        """
+        Turno de write_queue y una conexión cruda fuera de transacción:
+        ANALYZE/VACUUM/checkpoint no pasan por la sesión (executescript corre
+        el PRAGMA hasta el final; execute lo detiene en el primer paso).
+        """
+        if not write_queue.acquire(max(0.0, deadline - time.monotonic())):
+            raise WriteQueueTimeout()
+        connection = engine.raw_connection()
+        try:
+            with _deadline(connection.driver_connection, deadline):
+                yield connection.driver_connection
+        finally:
+            connection.close()
+            write_queue.release()
+
+    def _audit_archive(self, deadline: float) -> dict:
+        result = archive_closed_months(deadline=deadline)
+        return {
+            "months": [segment["month"] for segment in result["sealed"]],
+            "rows": result["rows"],
+            "pending_months": result["pending_months"],
+            **({"status": "partial"} if result["pending_months"] else {}),
+        }
+
+    def _analyze(self, deadline: float) -> dict:
+        # analysis_limit: estadísticas aproximadas por índice en lugar de recorrer tablas completas
+        with self._write_turn(deadline) as dbapi_connection:
+            dbapi_connection.executescript(f"PRAGMA analysis_limit={int(self.analysis_limit)}; ANALYZE;")
+        return {"analysis_limit": self.analysis_limit}
+
+    def _optimize(self, deadline: float) -> dict:
+        with self._write_turn(deadline) as dbapi_connection:
+            dbapi_connection.executescript("PRAGMA optimize;")
+        return {}
+
+    def _incremental_vacuum(self, deadline: float) -> dict:
+        with engine.connect() as conn:
+            auto_vacuum = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+            free_pages = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if auto_vacuum != 2:
+            # Activarlo en una base existente requiere un VACUUM completo (fuera de este proceso)
+            return {"status": "skipped", "reason": "auto_vacuum no es INCREMENTAL", "free_pages": free_pages}
+
+        freed = 0
+        # Por pasos: el turno de escritura se suelta entre uno y otro
+        while free_pages > 0 and time.monotonic() < deadline:
+            with self._write_turn(deadline) as dbapi_connection:
+                dbapi_connection.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});")
+                remaining = dbapi_connection.execute("PRAGMA freelist_count").fetchone()[0]
+            freed += free_pages - remaining
+            free_pages = remaining
+        return {"freed_pages": freed, "free_pages": free_pages}
+
+    def _checkpoint(self, deadline: float) -> dict:
+        before = self.wal_size_mb()
+        with self._write_turn(deadline) as dbapi_connection:
+            busy, log_pages, checkpointed = dbapi_connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        return {
+            # busy: un lector seguía dentro del WAL; se copió lo posible y se reintenta en el siguiente ciclo
+            "status": "partial" if busy else "ok",
+            "wal_mb_before": round(before, 2),
+            "wal_mb_after": round(self.wal_size_mb(), 2),
+            "pages": checkpointed,
+        }
+
+    def _rollup_consistency(self, deadline: float) -> dict:
+        db = ReadSessionLocal()
+        try:
+            begin_read_snapshot(db)
+            with _deadline(db.connection().connection.driver_connection, deadline):
+                mismatches = check_rollups(db)
+        finally:
+            db.close()
+        if not any(mismatches.values()):
+            return {"mismatches": mismatches}
+
+        logger.warning(f"Mantenimiento: acumulados desviados de route_manifests: {mismatches}")
+        if not self.repair_rollups:
+            return {"status": "mismatch", "mismatches": mismatches}
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return {"status": "mismatch", "mismatches": mismatches,
+                    "reason": "presupuesto agotado antes de reparar"}
+        # Mismo presupuesto: la reconstrucción se interrumpe (y se revierte) al agotarse
+        db = SessionLocal()
+        try:
+            with write_transaction(db, timeout=remaining):
+                with _deadline(db.connection().connection.driver_connection, deadline):
+                    rebuild_rollups(db)
+        finally:
+            db.close()
+        return {"status": "repaired", "mismatches": mismatches}
+
+    # --- Estado ---
+
+    @staticmethod
+    def wal_size_mb() -> float:
+        path = f"{engine.url.database}-wal"
+        return os.path.getsize(path) / (1024 * 1024) if os.path.exists(path) else 0.0
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "window": f"{self.window_start:%H:%M}-{self.window_end:%H:%M}",
+            "budget_seconds": self.budget_seconds,
+            "last_nightly": self.last_nightly,
+            "wal_mb": round(self.wal_size_mb(), 2),
+            "jobs": dict(self.jobs),
+        }
+
+
+maintenance = MaintenanceScheduler(
+    window_start=settings.MAINTENANCE_WINDOW_START,
+    window_end=settings.MAINTENANCE_WINDOW_END,
+    budget_seconds=settings.MAINTENANCE_BUDGET_SECONDS,
+    poll_seconds=settings.MAINTENANCE_POLL_SECONDS,
+    wal_max_mb=settings.MAINTENANCE_WAL_MAX_MB,
+    vacuum_pages=settings.MAINTENANCE_VACUUM_PAGES,
+    analysis_limit=settings.MAINTENANCE_ANALYSIS_LIMIT,
+    repair_rollups=settings.MAINTENANCE_REPAIR_ROLLUPS,
+)
@@ -0,0 +1,91 @@
+"""
+Pool de procesos para bcrypt.
+
+Hashear o verificar una contraseña cuesta cientos de milisegundos de CPU;
+en un hilo del servidor compite por el GIL con todas las demás peticiones.
+Aquí se hace en PASSWORD_POOL_WORKERS procesos aparte.
+
+El pool es acotado: admite como mucho workers + PASSWORD_POOL_MAX_PENDING
+trabajos a la vez y rechaza el resto (PasswordPoolBusy -> 503), para que una
+avalancha de logins al inicio del turno no deje sin servicio al resto de la API.
+Un trabajo que pasa de PASSWORD_POOL_TIMEOUT_SECONDS también responde
+PasswordPoolBusy, pero conserva su lugar hasta que el proceso lo termina.
+Con PASSWORD_POOL_WORKERS=0 se trabaja en el mismo proceso (tests, scripts).
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.utils import password_worker
+
+
+class PasswordPoolBusy(Exception):
+    """El pool está lleno: el cliente debe reintentar"""
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_pending: int, rounds: int, timeout: float):
+        self.workers = workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending) if workers else None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: el servidor tiene hilos, fork podría heredar candados tomados
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # El lugar se libera cuando el trabajo termina, no cuando dejamos de esperarlo:
+        # un trabajo abandonado por timeout sigue ocupando un proceso
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+
+    def hash(self, password: str) -> str:
+        return self._run(password_worker.hash_password, password, self.rounds)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._run(password_worker.verify_password, password, hashed_password, self.rounds)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+                logger.info("Pool de contraseñas detenido")
+
+
+password_pool = PasswordPool(
+    workers=settings.PASSWORD_POOL_WORKERS,
+    max_pending=settings.PASSWORD_POOL_MAX_PENDING,
+    rounds=settings.BCRYPT_ROUNDS,
+    timeout=settings.PASSWORD_POOL_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,244 @@
+"""
+Corridas de nómina: deducir de una vez las deudas PENDING de un periodo.
+
+Una corrida (PayrollRun) por periodo. Las deudas elegibles (PENDING, de
+rutas dentro del periodo) se recorren por id en bloques de
+PAYROLL_CHUNK_SIZE; cada bloque es una transacción con su turno de
+write_queue que:
+- pasa las deudas a DEDUCTED con un UPDATE (debt_service.deduct_in_bulk,
+  que ajusta también los saldos por chofer);
+- inserta su fila DEBT_DEDUCTED en audit_logs por deuda (executemany, en la
+  misma transacción: una deducción nunca queda sin auditoría);
+- avanza el cursor de la corrida (last_debt_id y totales).
+
+Si el proceso se interrumpe, lo confirmado queda hecho y volver a lanzar la
+corrida del mismo periodo continúa desde el cursor. Al terminar se escribe
+el estado de cuenta por chofer (CSV en PAYROLL_STATEMENT_DIR), leyendo las
+deudas de la corrida por lotes, y la corrida queda COMPLETED.
+
+Las deudas del periodo que llegan después (check-in tardío, disputa que
+vuelve a PENDING) reabren la corrida COMPLETED al lanzarla otra vez: el
+cursor vuelve a 0 (las ya deducidas no son PENDING), los totales se suman
+y el estado de cuenta se reescribe con todas las deudas de la corrida.
+"""
+
+import csv
+import os
+import threading
+from datetime import date, datetime
+from typing import Callable, Optional
+
+from loguru import logger
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, write_transaction
+from app.models.audit_log import AuditLog
+from app.models.debt_record import DebtRecord, DebtStatus
+from app.models.payroll_run import PayrollRun, PayrollRunStatus
+from app.models.route_manifest import RouteManifest
+from app.models.user import User
+from app.services.audit_service import log_activity
+from app.services.debt_service import deduct_in_bulk, pending_debts_query
+
+STATEMENT_COLUMNS = ["line", "driver_id", "driver_name", "debt_id", "route_id", "route_date", "amount"]
+
+# Corridas ejecutándose en este proceso (dos hilos no avanzan el mismo cursor)
+_active_lock = threading.Lock()
+_active_runs = set()
+
+
+class PayrollRunInProgress(Exception):
+    """La corrida ya se está ejecutando en otro hilo"""
+
+
+def summary(run: PayrollRun) -> dict:
+    return {
+        "id": run.id,
+        "period_start": run.period_start.isoformat(),
+        "period_end": run.period_end.isoformat(),
+        "status": run.status.value,
+        "deducted_records": run.deducted_records,
+        "deducted_amount": round(run.deducted_amount, 2),
+        "last_debt_id": run.last_debt_id,
+        "statement_path": run.statement_path,
+        "created_at": run.created_at.isoformat() if run.created_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+    }
+
+
+def _notes(run: PayrollRun) -> str:
+    return f"Nómina {run.period_start.isoformat()} a {run.period_end.isoformat()} (corrida {run.id})"
+
+
+def start_run(db: Session, period_start: date, period_end: date, user_id: int) -> PayrollRun:
+    """
+    La corrida del periodo: la existente (para reanudarla), una nueva, o la
+    COMPLETED reabierta si desde entonces llegaron deudas PENDING del periodo.
+    """
+    with write_transaction(db):
+        run = db.query(PayrollRun).filter(
+            PayrollRun.period_start == period_start, PayrollRun.period_end == period_end
+        ).first()
+        if run is None:
+            run = PayrollRun(period_start=period_start, period_end=period_end,
+                             created_by_user_id=user_id, status=PayrollRunStatus.RUNNING,
+                             last_debt_id=0, deducted_records=0, deducted_amount=0.0)
+            db.add(run)
+        elif run.status == PayrollRunStatus.COMPLETED and db.execute(
+            pending_debts_query(period_start, period_end).limit(1)
+        ).first():
+            run.status = PayrollRunStatus.RUNNING
+            run.last_debt_id = 0
+            run.finished_at = None
+            log_activity(db, user_id, "PAYROLL_RUN_REOPENED", "PayrollRun", run.id,
+                         f"{_notes(run)}: deudas nuevas del periodo")
+        db.commit()
+    return run
+
+
+def _deduct_chunk(db: Session, run: PayrollRun, chunk_size: int) -> int:
+    """Un bloque de deducciones en la transacción actual (sin commit). Regresa cuántas"""
+    rows = db.execute(pending_debts_query(run.period_start, run.period_end, run.last_debt_id).limit(chunk_size)).all()
+    if not rows:
+        return 0
+
+    notes = _notes(run)
+    deduct_in_bulk(db, rows, run.created_by_user_id, run.id, notes)
+    now = datetime.utcnow()
+    db.execute(insert(AuditLog), [
+        {
+            "timestamp": now,
+            "user_id": run.created_by_user_id,
+            "action": "DEBT_DEDUCTED",
+            "entity_type": "DebtRecord",
+            "entity_id": row.id,
+            "notes": notes,
+            "old_value": {"status": DebtStatus.PENDING.value, "amount": row.amount},
+            "new_value": {"status": DebtStatus.DEDUCTED.value, "amount": row.amount, "payroll_run_id": run.id},
+        }
+        for row in rows
+    ])
+
+    run.last_debt_id = rows[-1].id
+    run.deducted_records += len(rows)
+    run.deducted_amount = round(run.deducted_amount + sum(row.amount for row in rows), 2)
+    return len(rows)
+
+
+def execute_run(
+    run_id: int,
+    chunk_size: Optional[int] = None,
+    on_chunk: Optional[Callable[[PayrollRun], None]] = None,
+) -> dict:
+    """
+    Aplicar (o reanudar) la corrida hasta terminarla. Abre su propia sesión;
+    cada bloque confirma por separado. Una corrida COMPLETED no se repite.
+    """
+    chunk_size = chunk_size or settings.PAYROLL_CHUNK_SIZE
+    with _active_lock:
+        if run_id in _active_runs:
+            raise PayrollRunInProgress(f"La corrida {run_id} ya está en proceso")
+        _active_runs.add(run_id)
+
+    db = SessionLocal()
+    try:
+        run = db.get(PayrollRun, run_id)
+        if run.status == PayrollRunStatus.COMPLETED:
+            return summary(run)
+        if run.last_debt_id:
+            logger.info(f"Nómina: reanudando corrida {run.id} después de la deuda {run.last_debt_id}")
+
+        while True:
+            with write_transaction(db):
+                run = db.get(PayrollRun, run_id)
+                processed = _deduct_chunk(db, run, chunk_size)
+                db.commit()
+            if not processed:
+                break
+            if on_chunk:
+                on_chunk(run)
+
+        path = write_statement(db, run)
+        with write_transaction(db):
+            run = db.get(PayrollRun, run_id)
+            run.statement_path = path
+            run.status = PayrollRunStatus.COMPLETED
+            run.finished_at = datetime.utcnow()
+            log_activity(db, run.created_by_user_id, "PAYROLL_RUN", "PayrollRun", run.id, _notes(run),
+                         new_value={"deducted_records": run.deducted_records,
+                                    "deducted_amount": round(run.deducted_amount, 2)})
+            db.commit()
+        logger.info(f"Nómina: corrida {run.id} terminada, {run.deducted_records} deudas por ${run.deducted_amount:.2f}")
+        return summary(run)
+    finally:
+        db.close()
+        with _active_lock:
+            _active_runs.discard(run_id)
+
+
+def run_payroll(
+    period_start: date,
+    period_end: date,
+    user_id: int,
+    chunk_size: Optional[int] = None,
+    on_chunk: Optional[Callable[[PayrollRun], None]] = None,
+) -> dict:
+    """Crear o reanudar la corrida del periodo y ejecutarla completa"""
+    db = SessionLocal()
+    try:
+        run_id = start_run(db, period_start, period_end, user_id).id
+    finally:
+        db.close()
+    return execute_run(run_id, chunk_size, on_chunk)
+
+
+# --- Estado de cuenta ---
+
+def statement_path(run: PayrollRun) -> str:
+    return os.path.join(
+        settings.PAYROLL_STATEMENT_DIR,
+        f"nomina_{run.id}_{run.period_start.isoformat()}_{run.period_end.isoformat()}.csv",
+    )
+
+
+def write_statement(db: Session, run: PayrollRun) -> str:
+    """
+    Estado de cuenta de la corrida: una línea por deuda deducida, agrupadas
+    por chofer, y una línea TOTAL al cerrar cada chofer. Se lee por lotes y
+    se escribe a un archivo temporal que se renombra al final (nunca queda
+    un estado de cuenta a medias con el nombre definitivo).
+    """
+    path = statement_path(run)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    statement = select(
+        DebtRecord.driver_id, User.full_name, DebtRecord.id, DebtRecord.route_manifest_id,
+        RouteManifest.date, DebtRecord.amount,
+    ).join(
+        RouteManifest, RouteManifest.id == DebtRecord.route_manifest_id
+    ).join(
+        User, User.id == DebtRecord.driver_id
+    ).where(
+        DebtRecord.payroll_run_id == run.id
+    ).order_by(
+        DebtRecord.driver_id, RouteManifest.date, DebtRecord.id
+    ).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(STATEMENT_COLUMNS)
+        current, name, total = None, None, 0.0
+        for driver_id, full_name, debt_id, route_id, route_date, amount in db.execute(statement):
+            if driver_id != current:
+                if current is not None:
+                    writer.writerow(["TOTAL", current, name, "", "", "", round(total, 2)])
+                current, name, total = driver_id, full_name, 0.0
+            writer.writerow(["DEUDA", driver_id, full_name, debt_id, route_id, route_date.isoformat(), round(amount, 2)])
+            total += amount
+        if current is not None:
+            writer.writerow(["TOTAL", current, name, "", "", "", round(total, 2)])
+    db.rollback()  # Cierra la lectura antes de pedir turno de escritura
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,123 @@
+"""
+Cache en proceso para los endpoints de reportes.
+
+LRU acotado + TTL. La llave incluye la versión de las tablas de las que
+depende el reporte (ver data_version), por lo que un checkout, check-in o
+cambio de recursos invalida el resultado sin tener que borrarlo a mano.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from app.config import settings
+from app.services import data_version
+
+# Tablas que alimentan los reportes
+REPORT_TABLES = (
+    "route_manifests",
+    "daily_status_rollups",
+    "daily_truck_rollups",
+    "daily_driver_rollups",
+    "trucks",
+    "users",
+)
+
+
+class ReportCache:
+    """Cache LRU/TTL con contadores de aciertos, fallos y desalojos"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Un lock por llave en cálculo: peticiones simultáneas esperan al primero
+        self._inflight: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(
+        self, key: Hashable, tables: Iterable[str], compute: Callable[[], Any],
+        versions: Optional[Dict[str, int]] = None
+    ) -> Any:
+        """
+        Regresa el valor cacheado para (key, versiones) o lo calcula una sola vez.
+        `versions` son las fijadas al abrir la instantánea de lectura (get_read_db);
+        sin ellas se usan las actuales.
+        """
+        tables = tuple(tables)
+        if versions is None:
+            full_key = (key, data_version.current_versions(tables))
+        else:
+            full_key = (key, tuple(versions.get(table, 0) for table in tables))
+
+        found, value = self._lookup(full_key)
+        if found:
+            return value
+
+        with self._lock:
+            inflight = self._inflight.setdefault(full_key, threading.Lock())
+        try:
+            with inflight:
+                # Otro hilo pudo calcularlo mientras esperábamos
+                found, value = self._lookup(full_key, count=False)
+                if found:
+                    return value
+                value = compute()
+                self._store(full_key, value)
+            return value
+        finally:
+            # También si compute() falla: el lock no se queda para siempre en _inflight
+            with self._lock:
+                self._inflight.pop(full_key, None)
+
+    def _lookup(self, full_key, count: bool = True):
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(full_key)
+                if count:
+                    self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                # Expirado por TTL
+                del self._entries[full_key]
+                self.evictions += 1
+            if count:
+                self.misses += 1
+            return False, None
+
+    def _store(self, full_key, value):
+        with self._lock:
+            self._entries[full_key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            }
+
+
+# Instancia global usada por reports.py
+report_cache = ReportCache(
+    max_entries=settings.REPORT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.REPORT_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,186 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func, case, literal, Integer
+from sqlalchemy.dialects import sqlite, postgresql
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from app.models.route_manifest import RouteManifest, AuditStatus
+from app.models.daily_rollup import DailyStatusRollup, DailyTruckRollup, DailyDriverRollup
+
+# Llaves primarias de cada tabla de acumulados
+ROLLUP_KEYS = {
+    DailyStatusRollup: ("date", "audit_status"),
+    DailyTruckRollup: ("date", "truck_id"),
+    DailyDriverRollup: ("date", "driver_id"),
+}
+
+# (Modelo, llave) -> {columna: delta}
+RollupDeltas = Dict[Tuple[type, tuple], Dict[str, float]]
+
+
+def route_contribution(route: RouteManifest) -> Dict[Tuple[type, tuple], Dict[str, float]]:
+    """
+    Aporte de una ruta a cada tabla de acumulados.
+    Se toma antes de modificar la ruta para poder restarlo después.
+    """
+    full = route.initial_full_bottles or 0
+    empty = route.initial_empty_bottles or 0
+    debt = route.debt_amount or 0.0
+    problematic = 1 if route.audit_status == AuditStatus.DEBT else 0
+
+    per_resource = {
+        "route_count": 1,
+        "problematic_routes": problematic,
+        "debt_amount": debt,
+        "full_bottles": full,
+    }
+    return {
+        (DailyStatusRollup, (route.date, route.audit_status)): {
+            "route_count": 1,
+            "full_bottles": full,
+            "total_bottles": full + empty,
+            "debt_amount": debt,
+            "positive_debt_amount": debt if debt > 0 else 0.0,
+        },
+        (DailyTruckRollup, (route.date, route.truck_id)): dict(per_resource),
+        (DailyDriverRollup, (route.date, route.driver_id)): dict(per_resource),
+    }
+
+
+def collect_route_change(
+    deltas: RollupDeltas,
+    before: Optional[dict],
+    route: RouteManifest
+) -> RollupDeltas:
+    """
+    Acumula en `deltas` la diferencia entre el aporte previo (`before`, None si
+    la ruta es nueva) y el aporte actual de la ruta.
+    """
+    for key, values in route_contribution(route).items():
+        bucket = deltas.setdefault(key, defaultdict(float))
+        for column, value in values.items():
+            bucket[column] += value
+    for key, values in (before or {}).items():
+        bucket = deltas.setdefault(key, defaultdict(float))
+        for column, value in values.items():
+            bucket[column] -= value
+    return deltas
+
+
+def _upsert(db: Session, model, rows, key_columns):
+    """INSERT ... ON CONFLICT DO UPDATE sumando los deltas a la fila existente"""
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(model)
+    value_columns = [c for c in rows[0] if c not in key_columns]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in value_columns}
+    )
+    db.execute(stmt, rows)
+
+
+def apply_deltas(db: Session, deltas: RollupDeltas, keys: Dict[type, tuple] = ROLLUP_KEYS):
+    """
+    Aplica los deltas acumulados dentro de la transacción actual.
+    No hace commit: el llamador confirma junto con el cambio de la ruta.
+    `keys` da la llave primaria de cada modelo (también lo usan los saldos de deuda).
+    """
+    rows_by_model = defaultdict(list)
+    for (model, key), values in deltas.items():
+        if not any(values.values()):
+            continue
+        row = dict(zip(keys[model], key))
+        for column, value in values.items():
+            row[column] = int(value) if isinstance(getattr(model, column).type, Integer) else value
+        rows_by_model[model].append(row)
+
+    for model, rows in rows_by_model.items():
+        _upsert(db, model, rows, keys[model])
+
+
+def record_route_change(db: Session, before: Optional[dict], route: RouteManifest):
+    """Actualiza los acumulados para una sola ruta (checkout o check-in)"""
+    apply_deltas(db, collect_route_change({}, before, route))
+
+
+def expected_rollups():
+    """
+    {modelo: (columnas, SELECT)} con el contenido correcto de cada tabla de
+    acumulados, calculado desde route_manifests.
+    """
+    is_debt = func.cast(RouteManifest.audit_status == AuditStatus.DEBT, Integer)
+    debt = func.coalesce(RouteManifest.debt_amount, 0)
+
+    expected = {
+        DailyStatusRollup: (
+            ["date", "audit_status", "route_count", "full_bottles", "total_bottles",
+             "debt_amount", "positive_debt_amount"],
+            select(
+                RouteManifest.date,
+                RouteManifest.audit_status,
+                func.count(RouteManifest.id),
+                func.sum(RouteManifest.initial_full_bottles),
+                func.sum(RouteManifest.initial_full_bottles + RouteManifest.initial_empty_bottles),
+                func.sum(debt),
+                func.sum(case((debt > 0, debt), else_=literal(0.0))),
+            ).group_by(RouteManifest.date, RouteManifest.audit_status)
+        )
+    }
+    for model, column in ((DailyTruckRollup, RouteManifest.truck_id),
+                          (DailyDriverRollup, RouteManifest.driver_id)):
+        expected[model] = (
+            ["date", ROLLUP_KEYS[model][1], "route_count", "problematic_routes",
+             "debt_amount", "full_bottles"],
+            select(
+                RouteManifest.date,
+                column,
+                func.count(RouteManifest.id),
+                func.sum(is_debt),
+                func.sum(debt),
+                func.sum(RouteManifest.initial_full_bottles),
+            ).group_by(RouteManifest.date, column)
+        )
+    return expected
+
+
+def rebuild_rollups(db: Session) -> Dict[str, int]:
+    """
+    Reconstruye todos los acumulados desde route_manifests.
+    Sirve para el backfill inicial o para corregir una desviación.
+    """
+    for model in ROLLUP_KEYS:
+        db.execute(delete(model))
+
+    for model, (columns, expected) in expected_rollups().items():
+        db.execute(model.__table__.insert().from_select(columns, expected))
+
+    db.commit()
+    return {
+        model.__tablename__: db.query(func.count()).select_from(model).scalar()
+        for model in ROLLUP_KEYS
+    }
+
+
+def _comparable(names, columns):
+    """Montos redondeados a centavos: las sumas de flotantes varían en el último decimal"""
+    return [func.round(col, 2) if name.endswith("amount") else col for name, col in zip(names, columns)]
+
+
+def check_rollups(db: Session) -> Dict[str, int]:
+    """
+    Diferencias de cada tabla de acumulados contra route_manifests: filas
+    faltantes más filas sobrantes (una fila con otras cifras cuenta en ambas).
+    """
+    mismatches = {}
+    for model, (names, expected) in expected_rollups().items():
+        expected_rows = select(*_comparable(names, list(expected.subquery().c)))
+        # Filas con route_count 0 quedan tras mover rutas de estado; no aportan nada
+        actual_rows = select(*_comparable(names, [getattr(model, name) for name in names])).where(
+            model.route_count != 0
+        )
+        mismatches[model.__tablename__] = sum(
+            db.execute(select(func.count()).select_from(difference.subquery())).scalar()
+            for difference in (expected_rows.except_(actual_rows), actual_rows.except_(expected_rows))
+        )
+    return mismatches
@@ -0,0 +1,379 @@
+"""
+Lógica de rutas fuera de los endpoints: listado paginado, salida de flota,
+check-in por lotes e ingesta diferida de check-ins.
+"""
+
+import base64
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, and_, select, insert, delete
+from sqlalchemy.orm import Session, joinedload, selectinload
+from loguru import logger
+
+from app.config import settings
+from app.database import SessionLocal, write_transaction
+from app.models.route_manifest import RouteManifest, AuditStatus
+from app.models.client import Client
+from app.models.sales_detail import SalesDetail
+from app.models.user import User, UserRole
+from app.models.truck import Truck
+from app.services.reconciliation_service import reconcile_route
+from app.services.rollup_service import (
+    route_contribution, record_route_change, collect_route_change, apply_deltas
+)
+from app.services.audit_service import log_activity
+from app.services.debt_service import record_route_debt
+from app.services.columnar_store import columnar_store
+from app.utils.timing import PhaseTimer
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no lo generó este servidor"""
+
+
+def encode_cursor(route_date: date, route_id: int) -> str:
+    """Cursor opaco con la llave (date, id) de la última fila entregada"""
+    raw = f"{route_date.isoformat()}|{route_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw_date, raw_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return date.fromisoformat(raw_date), int(raw_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor("Cursor inválido") from exc
+
+
+def _list_item(route: RouteManifest, include_sales: bool) -> dict:
+    item = {
+        "id": route.id,
+        "date": route.date,
+        "driver_id": route.driver_id,
+        "driver_name": route.driver.full_name if route.driver else None,
+        "truck_id": route.truck_id,
+        "truck_name": route.truck.nickname if route.truck else None,
+        "truck_plate": route.truck.plate if route.truck else None,
+        "audit_status": route.audit_status,
+        "initial_full_bottles": route.initial_full_bottles,
+        "initial_empty_bottles": route.initial_empty_bottles,
+        "returned_full_bottles": route.returned_full_bottles,
+        "returned_empty_bottles": route.returned_empty_bottles,
+        "reported_damaged": route.reported_damaged,
+        "debt_amount": route.debt_amount or 0.0,
+        "checkout_timestamp": route.checkout_timestamp,
+        "checkin_timestamp": route.checkin_timestamp,
+    }
+    if include_sales:
+        item["sales"] = [
+            {
+                "client_id": sale.client_id,
+                "quantity": sale.quantity,
+                "unit_price": sale.unit_price,
+                "subtotal": sale.subtotal,
+            }
+            for sale in route.sales_details
+        ]
+    return item
+
+
+def list_routes_page(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    statuses: Optional[Sequence[AuditStatus]] = None,
+    truck_id: Optional[int] = None,
+    driver_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    include_sales: bool = False,
+) -> dict:
+    """
+    Página de rutas, de la más reciente a la más antigua, paginada por llave
+    (date, id): cada página es un rango del índice, sin OFFSET.
+
+    Chofer y camioneta vienen en el mismo SELECT (joinedload); las ventas,
+    si se piden, en un solo SELECT ... IN por página (selectinload).
+    Pide `limit + 1` filas para saber si hay otra página sin hacer COUNT.
+    """
+    query = db.query(RouteManifest).options(
+        joinedload(RouteManifest.driver),
+        joinedload(RouteManifest.truck),
+    ).filter(
+        RouteManifest.date >= start_date,
+        RouteManifest.date <= end_date
+    )
+    if include_sales:
+        query = query.options(selectinload(RouteManifest.sales_details))
+    if statuses:
+        query = query.filter(RouteManifest.audit_status.in_(list(statuses)))
+    if truck_id is not None:
+        query = query.filter(RouteManifest.truck_id == truck_id)
+    if driver_id is not None:
+        query = query.filter(RouteManifest.driver_id == driver_id)
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            RouteManifest.date < cursor_date,
+            and_(RouteManifest.date == cursor_date, RouteManifest.id < cursor_id)
+        ))
+
+    routes: List[RouteManifest] = query.order_by(
+        RouteManifest.date.desc(), RouteManifest.id.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(routes) > limit:
+        routes = routes[:limit]
+        next_cursor = encode_cursor(routes[-1].date, routes[-1].id)
+
+    items = [_list_item(route, include_sales) for route in routes]
+    return {"total": len(items), "next_cursor": next_cursor, "routes": items}
+
+
+# --- SALIDA DE FLOTA ---
+
+def checkout_batch(db: Session, entries: Sequence, user_id: int) -> Tuple[List[dict], List[RouteManifest]]:
+    """
+    Salida de varias rutas en una sola transacción (sin commit).
+
+    Choferes activos, camionetas activas y camionetas ya en ruta se cargan
+    con un SELECT ... IN cada uno; las entradas inválidas se rechazan una por
+    una y las válidas se insertan juntas, con un solo upsert de acumulados.
+    Regresa (resultado por entrada, rutas creadas).
+    """
+    driver_ids = {entry.driver_id for entry in entries}
+    truck_ids = {entry.truck_id for entry in entries}
+    active_drivers = set(db.scalars(select(User.id).where(
+        User.id.in_(driver_ids), User.role == UserRole.CHOFER, User.is_active == True
+    )))
+    active_trucks = set(db.scalars(select(Truck.id).where(
+        Truck.id.in_(truck_ids), Truck.is_active == True
+    )))
+    busy_trucks = set(db.scalars(select(RouteManifest.truck_id).where(
+        RouteManifest.truck_id.in_(truck_ids),
+        RouteManifest.audit_status == AuditStatus.IN_PROGRESS
+    )))
+
+    now = datetime.now()
+    results: List[dict] = []
+    created: List[Tuple[int, RouteManifest]] = []
+    for index, entry in enumerate(entries):
+        error = None
+        if entry.driver_id not in active_drivers:
+            error = "Chofer inexistente o inactivo"
+        elif entry.truck_id not in active_trucks:
+            error = "Camioneta inexistente o inactiva"
+        elif entry.truck_id in busy_trucks:
+            error = "La camioneta ya está en ruta"
+        elif entry.initial_full_bottles < 0:
+            error = "La carga no puede ser negativa"
+        if error:
+            results.append({"index": index, "truck_id": entry.truck_id, "status": "rejected", "error": error})
+            continue
+
+        busy_trucks.add(entry.truck_id)  # Misma camioneta dos veces en el lote
+        route = RouteManifest(
+            driver_id=entry.driver_id,
+            truck_id=entry.truck_id,
+            initial_full_bottles=entry.initial_full_bottles,
+            initial_empty_bottles=0,
+            checkout_by_user_id=user_id,
+            audit_status=AuditStatus.IN_PROGRESS,
+            date=now.date(),
+            checkout_timestamp=now
+        )
+        created.append((index, route))
+        results.append({"index": index, "truck_id": entry.truck_id, "status": "created"})
+
+    routes = [route for _, route in created]
+    if routes:
+        db.add_all(routes)
+        db.flush()  # IDs en un INSERT por lotes
+        deltas = {}
+        for route in routes:
+            collect_route_change(deltas, None, route)
+        apply_deltas(db, deltas)
+
+    route_ids = {index: route.id for index, route in created}
+    for result in results:
+        if result["index"] in route_ids:
+            result["route_id"] = route_ids[result["index"]]
+    return results, routes
+
+
+# --- CHECK-IN ---
+
+def merge_sale_lines(sales: Iterable) -> Dict[int, int]:
+    """Sumar las líneas repetidas del mismo cliente (conserva el orden de captura)"""
+    merged: Dict[int, int] = {}
+    for item in sales:
+        merged[item.client_id] = merged.get(item.client_id, 0) + item.quantity
+    return merged
+
+
+def resolve_prices(db: Session, client_ids: Iterable[int]) -> Dict[int, float]:
+    """
+    Precio unitario por cliente en un solo SELECT ... IN.
+    Precio especial si lo tiene, si no el global. Clientes inexistentes no aparecen.
+    """
+    client_ids = list(client_ids)
+    if not client_ids:
+        return {}
+    rows = db.execute(
+        select(Client.id, Client.special_price).where(Client.id.in_(client_ids))
+    ).all()
+    return {
+        client_id: special_price if special_price is not None else settings.BOTTLE_PRICE
+        for client_id, special_price in rows
+    }
+
+
+def checkin_route(
+    db: Session,
+    route: RouteManifest,
+    data,
+    user_id: int,
+    timer: Optional[PhaseTimer] = None,
+    checkin_timestamp: Optional[datetime] = None,
+) -> dict:
+    """
+    Check-in de una ruta: ventas, conciliación, acumulados y deuda del chofer
+    en una transacción.
+
+    Las consultas no dependen del número de líneas: un SELECT de precios,
+    un DELETE de los detalles previos (por si reintentan el check-in) y un
+    INSERT ejecutado como executemany.
+    `checkin_timestamp` permite conservar la hora real de captura (ingesta diferida).
+    """
+    timer = timer or PhaseTimer()
+
+    # Aporte actual a los acumulados (se resta al conciliar)
+    previous_contribution = route_contribution(route)
+
+    # 1. Procesar Ventas y Calcular Dinero
+    with timer.phase("pricing"):
+        quantities = merge_sale_lines(data.sales)
+        prices = resolve_prices(db, quantities.keys())
+
+    rows = [
+        {
+            "route_id": route.id,
+            "client_id": client_id,
+            "quantity": quantity,
+            "unit_price": prices[client_id],
+            "subtotal": quantity * prices[client_id],
+        }
+        for client_id, quantity in quantities.items()
+        if client_id in prices  # Cliente inexistente: se ignora la línea
+    ]
+    total_sales_money = sum(row["subtotal"] for row in rows)
+    total_units_sold = sum(row["quantity"] for row in rows)
+
+    with timer.phase("sales"):
+        db.execute(delete(SalesDetail).where(SalesDetail.route_id == route.id))
+        if rows:
+            db.execute(insert(SalesDetail), rows)
+
+    # 2. Actualizar Ruta
+    route.returned_full_bottles = data.returned_full_bottles
+    route.returned_empty_bottles = data.returned_empty_bottles
+    route.reported_damaged = data.reported_damaged
+    route.evidence_verified = 1 if data.evidence_verified else 0
+    route.notes = data.notes
+    route.checkin_by_user_id = user_id
+    route.checkin_timestamp = checkin_timestamp or datetime.now()
+
+    # 3. Conciliar
+    with timer.phase("reconcile"):
+        result = reconcile_route(
+            route=route,
+            returned_full=data.returned_full_bottles,
+            returned_empty=data.returned_empty_bottles,
+            reported_damaged=data.reported_damaged,
+            calculated_sales_total=total_sales_money,
+            total_units_sold_reported=total_units_sold
+        )
+        route.audit_status = result["status"]
+        route.debt_amount = result["debt"]
+        record_route_change(db, previous_contribution, route)
+
+    # 4. Deuda del chofer (libro y saldos en la misma transacción)
+    with timer.phase("debt"):
+        record_route_debt(db, route)
+
+    return result
+
+
+# --- INGESTA DIFERIDA DE CHECK-INS ---
+
+def _local_naive(moment: datetime) -> datetime:
+    """Las columnas DateTime guardan hora local sin zona"""
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+
+def ingest_checkins(items: Sequence, user_id: int, request=None, chunk_size: int = 50):
+    """
+    Aplica check-ins capturados sin conexión, en orden de captura (client_timestamp).
+
+    Generador: confirma cada `chunk_size` check-ins y solo entonces entrega el
+    resultado de cada uno, así un "ok" recibido ya es durable. Si un bloque
+    falla en la BD se revierte completo, sus elementos salen con "error" y se
+    continúa con el siguiente. Abre su propia sesión porque se consume
+    mientras se envía la respuesta.
+    """
+    ordered = sorted(enumerate(items), key=lambda pair: _local_naive(pair[1].client_timestamp))
+    db = SessionLocal()
+    try:
+        for start in range(0, len(ordered), chunk_size):
+            chunk = ordered[start:start + chunk_size]
+            try:
+                with write_transaction(db):
+                    outcomes, touched = _apply_checkin_chunk(db, chunk, user_id, request)
+                    db.commit()
+            except Exception as exc:
+                db.rollback()
+                logger.error(f"Ingesta de check-ins: bloque revertido ({exc})")
+                outcomes = [
+                    {"index": index, "route_id": item.route_id, "status": "error",
+                     "error": "Error al guardar el bloque; reintentar"}
+                    for index, item in chunk
+                ]
+                touched = []
+
+            if touched:
+                committed = db.query(RouteManifest).filter(RouteManifest.id.in_(touched)).all()
+                columnar_store.routes_committed(committed)
+            db.expunge_all()  # Memoria acotada al tamaño del bloque
+            yield from outcomes
+    finally:
+        db.close()
+
+
+def _apply_checkin_chunk(db: Session, chunk, user_id: int, request) -> Tuple[List[dict], List[int]]:
+    """Aplicar un bloque de check-ins en la transacción actual (sin commit)"""
+    route_ids = {item.route_id for _, item in chunk}
+    routes = {
+        route.id: route
+        for route in db.query(RouteManifest).filter(RouteManifest.id.in_(route_ids))
+    }
+    outcomes, touched = [], []
+    for index, item in chunk:
+        route = routes.get(item.route_id)
+        if route is None:
+            outcomes.append({"index": index, "route_id": item.route_id,
+                             "status": "rejected", "error": "Ruta no encontrada"})
+            continue
+        result = checkin_route(
+            db, route, item, user_id,
+            checkin_timestamp=_local_naive(item.client_timestamp)
+        )
+        log_activity(db, user_id, "ROUTE_CHECKIN", "RouteManifest", route.id,
+                     result["message"], request=request)
+        touched.append(route.id)
+        outcomes.append({"index": index, "route_id": route.id, "status": "ok",
+                         "audit_status": result["status"], "debt": result["debt"],
+                         "message": result["message"]})
+    return outcomes, touched
@@ -0,0 +1,114 @@
+"""
+Unidad de trabajo por petición.
+
+Los endpoints que modifican datos reciben un UnitOfWork en lugar de la
+sesión: acumulan sus cambios (incluidas las filas de AuditLog) y llaman a
+`commit()` una sola vez al final. Si la petición falla o no confirma, todo
+se descarta junto; nunca queda una ruta sin su registro de auditoría.
+
+Los commits se cuentan por petición (header X-DB-Commits) para detectar
+endpoints que vuelvan a confirmar más de una vez.
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+
+import anyio
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.database import SessionLocal, IS_SQLITE, write_queue, begin_immediate
+
+# Contador de la petición en curso (lo fija el middleware de main.py)
+_request_stats: ContextVar[Optional[dict]] = ContextVar("request_db_stats", default=None)
+
+
+def start_request_stats() -> dict:
+    stats = {"commits": 0}
+    _request_stats.set(stats)
+    return stats
+
+
+@event.listens_for(Session, "after_commit")
+def _count_commit(session):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["commits"] += 1
+
+
+class UnitOfWork:
+    """Una transacción por petición: flush cuando se necesiten IDs, commit una vez"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.committed = False
+
+    def add(self, instance):
+        self.db.add(instance)
+
+    def flush(self):
+        """Enviar los cambios pendientes (p. ej. para obtener IDs) sin confirmar"""
+        self.db.flush()
+
+    def commit(self):
+        if self.committed:
+            raise RuntimeError("La unidad de trabajo ya se confirmó en esta petición")
+        self.db.commit()
+        self.committed = True
+
+    def rollback(self):
+        self.db.rollback()
+
+
+# Hilos que solo esperan turno de escritura: se limitan aparte para no
+# ocupar el pool de hilos de los endpoints mientras esperan
+_queue_waiters: Optional[anyio.CapacityLimiter] = None
+
+
+async def _wait_write_turn() -> bool:
+    global _queue_waiters
+    if _queue_waiters is None:
+        _queue_waiters = anyio.CapacityLimiter(settings.DB_THREADPOOL_SIZE)
+    return await anyio.to_thread.run_sync(
+        write_queue.acquire, settings.SQLITE_WRITE_QUEUE_TIMEOUT_SECONDS, limiter=_queue_waiters
+    )
+
+
+async def get_uow():
+    """
+    Dependency: UnitOfWork sobre una sesión nueva, con turno en la cola de
+    escritura (una transacción de escritura a la vez en SQLite).
+    Lo que no se confirme explícitamente se revierte al cerrar.
+
+    Es async para esperar el turno fuera del pool de hilos de los endpoints:
+    si todos sus hilos esperaran turno, quien lo tiene no podría terminar.
+    Lo que toca la BD (BEGIN IMMEDIATE, rollback, close) corre en ese pool,
+    nunca en el event loop: BEGIN IMMEDIATE puede esperar hasta busy_timeout
+    si otro proceso (p. ej. un comando de app.cli) tiene el candado.
+    """
+    if IS_SQLITE and not await _wait_write_turn():
+        raise HTTPException(status_code=503, detail="Base de datos ocupada, reintentar")
+    db = SessionLocal()
+    uow = UnitOfWork(db)
+    try:
+        if IS_SQLITE:
+            await anyio.to_thread.run_sync(begin_immediate, db)
+        yield uow
+        if not uow.committed and (db.new or db.dirty or db.deleted):
+            logger.warning("UnitOfWork cerrada con cambios sin confirmar; se revierten")
+    except Exception:
+        with anyio.CancelScope(shield=True):
+            await anyio.to_thread.run_sync(uow.rollback)
+        raise
+    finally:
+        try:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(db.close)
+        finally:
+            if IS_SQLITE:
+                write_queue.release()
@@ -0,0 +1,26 @@
+"""
+Funciones que corren dentro de los procesos del pool de contraseñas.
+Solo dependen de passlib para que cada proceso hijo arranque rápido: el
+paquete app y app.utils no importan nada al cargarse (ver
+test_password_pool, que revisa los módulos de un proceso nuevo).
+"""
+
+from passlib.context import CryptContext
+
+_contexts = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    context = _contexts.get(rounds)
+    if context is None:
+        context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        _contexts[rounds] = context
+    return context
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def verify_password(password: str, hashed_password: str, rounds: int) -> bool:
+    return _context(rounds).verify(password, hashed_password)
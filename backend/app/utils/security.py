@@ -1,26 +1,24 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from app.config import settings
-
-# Contexto para hash de passwords
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.password_pool import password_pool
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verificar si una contraseña coincide con su hash
+    Verificar si una contraseña coincide con su hash (en el pool de procesos).
+    Lanza PasswordPoolBusy si el pool está lleno.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_pool.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
-    Generar hash de una contraseña
+    Generar hash de una contraseña (en el pool de procesos, BCRYPT_ROUNDS rondas)
     """
-    return pwd_context.hash(password)
+    return password_pool.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
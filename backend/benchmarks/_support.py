@@ -0,0 +1,117 @@
+"""
+Utilidades compartidas por los benchmarks.
+Ejecutar desde backend/: python -m benchmarks.<nombre>
+"""
+
+import os
+import tempfile
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+# La configuración se lee al importar app.*: se fija antes de cualquier import de la app
+_TMP_DIR = tempfile.mkdtemp(prefix="waterlog_bench_")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP_DIR}/bench.db")
+
+from sqlalchemy import event  # noqa: E402
+
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.models.truck import Truck  # noqa: E402
+from app.models.route_manifest import RouteManifest, AuditStatus  # noqa: E402
+from app.models.client import Client  # noqa: E402
+from app.models.sales_detail import SalesDetail  # noqa: E402,F401
+from app.models.audit_log import AuditLog  # noqa: E402,F401
+from app.models.debt_record import DebtRecord  # noqa: E402,F401
+
+
+def reset_database():
+    """Recrear el esquema completo en la base temporal"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def seed_fleet(db, trucks: int = 20, drivers: int = 25, clients: int = 0):
+    """Crear camionetas, choferes (y opcionalmente clientes) sintéticos"""
+    truck_ids, driver_ids = [], []
+    for i in range(trucks):
+        truck = Truck(plate=f"BENCH-{i:03d}", nickname=f"Unidad {i}", is_active=True)
+        db.add(truck)
+        db.flush()
+        truck_ids.append(truck.id)
+    for i in range(drivers):
+        driver = User(
+            username=f"chofer_{i}",
+            full_name=f"Chofer {i}",
+            hashed_password="x",
+            role=UserRole.CHOFER,
+            is_active=True
+        )
+        db.add(driver)
+        db.flush()
+        driver_ids.append(driver.id)
+    client_ids = []
+    for i in range(clients):
+        client = Client(name=f"Cliente {i}", special_price=None if i % 3 else 45.0)
+        db.add(client)
+        db.flush()
+        client_ids.append(client.id)
+    db.commit()
+    return truck_ids, driver_ids, client_ids
+
+
+def seed_routes(db, truck_ids, driver_ids, days: int = 365, routes_per_day: int = 20, seed: int = 7):
+    """Insertar `days` días de manifiestos sintéticos terminando hoy"""
+    rng = random.Random(seed)
+    statuses = [AuditStatus.CLOSED] * 8 + [AuditStatus.LOCKED_DEBT, AuditStatus.DEBT]
+    today = date.today()
+    rows = []
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        for _ in range(routes_per_day):
+            status = AuditStatus.IN_PROGRESS if offset == 0 else rng.choice(statuses)
+            initial = rng.randint(80, 200)
+            rows.append({
+                "driver_id": rng.choice(driver_ids),
+                "truck_id": rng.choice(truck_ids),
+                "date": day,
+                "initial_full_bottles": initial,
+                "initial_empty_bottles": rng.randint(0, 20),
+                "returned_full_bottles": None if offset == 0 else rng.randint(0, 40),
+                "returned_empty_bottles": None if offset == 0 else rng.randint(40, 160),
+                "checkout_timestamp": datetime.combine(day, datetime.min.time()),
+                "audit_status": status,
+                "debt_amount": 0.0 if offset == 0 else round(rng.uniform(0, 9000), 2),
+            })
+    db.bulk_insert_mappings(RouteManifest, rows)
+    db.commit()
+    return len(rows)
+
+
+@contextmanager
+def count_queries():
+    """Cuenta las sentencias SQL emitidas por el engine dentro del bloque"""
+    counter = {"queries": 0}
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def timeit(fn, repeat: int = 20):
+    """Ejecuta `fn` varias veces y regresa (mediana, p95) en milisegundos"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
@@ -0,0 +1,72 @@
+"""
+Benchmark de rangos arbitrarios: acumulados SQL vs almacén columnar (NumPy).
+Ejecutar desde backend/: python -m benchmarks.bench_analytics
+"""
+
+import random
+from datetime import date, timedelta
+
+from benchmarks._support import SessionLocal, reset_database, seed_fleet, seed_routes, timeit
+
+from app.api.v1 import reports
+from app.services.columnar_store import columnar_store
+from app.services.rollup_service import rebuild_rollups
+
+
+def _random_ranges(n: int, days: int, seed: int = 11):
+    rng = random.Random(seed)
+    today = date.today()
+    ranges = []
+    for _ in range(n):
+        start = today - timedelta(days=rng.randint(1, days))
+        ranges.append((start, start + timedelta(days=rng.randint(0, (today - start).days))))
+    return ranges
+
+
+def _rounded(report):
+    """Montos a centavos: SQL suma flotantes, el almacén columnar suma centavos exactos"""
+    return [
+        {k: round(v, 2) if isinstance(v, float) else v for k, v in truck.items()}
+        for truck in report["trucks"]
+    ]
+
+
+def _run_all(db, ranges):
+    for start_date, end_date in ranges:
+        reports._kpis_report(db, start_date, end_date)
+        reports._truck_performance_report(db, start_date, end_date)
+        reports._driver_performance_report(db, start_date, end_date, 10)
+
+
+def main():
+    reset_database()
+    db = SessionLocal()
+    try:
+        truck_ids, driver_ids, _ = seed_fleet(db, trucks=60, drivers=80)
+        total = seed_routes(db, truck_ids, driver_ids, days=3 * 365, routes_per_day=60)
+        rebuild_rollups(db)
+        ranges = _random_ranges(50, 3 * 365)
+        print(f"Rutas sintéticas: {total} (3 años, 60 camionetas, 80 choferes)")
+        print(f"{len(ranges)} rangos aleatorios x (kpis + camionetas + choferes)")
+
+        # Deben coincidir exactamente
+        columnar_store.enabled = False
+        expected = [_rounded(reports._truck_performance_report(db, s, e)) for s, e in ranges[:5]]
+        columnar_store.enabled = True
+        assert expected == [_rounded(reports._truck_performance_report(db, s, e)) for s, e in ranges[:5]]
+
+        columnar_store.enabled = False
+        sql_ms = timeit(lambda: _run_all(db, ranges), repeat=5)
+        columnar_store.enabled = True
+        columnar_store.invalidate()
+        load_ms = timeit(lambda: (columnar_store.invalidate(), columnar_store.snapshot(db)), repeat=3)
+        columnar_ms = timeit(lambda: _run_all(db, ranges), repeat=5)
+
+        print(f"  acumulados SQL : mediana {sql_ms[0]:.1f} ms")
+        print(f"  columnar       : mediana {columnar_ms[0]:.1f} ms (carga inicial {load_ms[0]:.0f} ms)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
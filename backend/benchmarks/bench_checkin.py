@@ -0,0 +1,94 @@
+"""
+Benchmark del check-in: una consulta por línea de venta vs ruta por lotes.
+Ejecutar desde backend/: python -m benchmarks.bench_checkin
+"""
+
+import random
+from types import SimpleNamespace
+
+from benchmarks._support import (
+    SessionLocal, reset_database, seed_fleet, seed_routes, count_queries, timeit
+)
+
+from app.config import settings
+from app.models.route_manifest import RouteManifest, AuditStatus
+from app.models.client import Client
+from app.models.sales_detail import SalesDetail
+from app.services.reconciliation_service import reconcile_route
+from app.services.route_service import checkin_route
+from app.utils.timing import PhaseTimer
+
+
+def legacy_checkin(db, route, data, user_id):
+    """Implementación anterior: SELECT de cliente y add() por cada línea"""
+    db.query(SalesDetail).filter(SalesDetail.route_id == route.id).delete()
+    total_money, total_units = 0.0, 0
+    for item in data.sales:
+        client = db.query(Client).filter(Client.id == item.client_id).first()
+        if not client:
+            continue
+        price = client.special_price if client.special_price is not None else settings.BOTTLE_PRICE
+        db.add(SalesDetail(route_id=route.id, client_id=client.id, quantity=item.quantity,
+                           unit_price=price, subtotal=item.quantity * price))
+        total_money += item.quantity * price
+        total_units += item.quantity
+    result = reconcile_route(route, data.returned_full_bottles, data.returned_empty_bottles,
+                             data.reported_damaged, total_money, total_units)
+    route.audit_status = result["status"]
+    route.debt_amount = result["debt"]
+    db.flush()
+    return result
+
+
+def make_payload(client_ids, lines, seed=3):
+    rng = random.Random(seed)
+    # ~10% de líneas repetidas para el mismo cliente
+    sales = [SimpleNamespace(client_id=rng.choice(client_ids[: max(1, int(lines * 0.9))]), quantity=1)
+             for _ in range(lines)]
+    return SimpleNamespace(
+        returned_full_bottles=0, returned_empty_bottles=lines, reported_damaged=0,
+        evidence_verified=True, notes=None, sales=sales,
+    )
+
+
+def main():
+    reset_database()
+    db = SessionLocal()
+    try:
+        truck_ids, driver_ids, client_ids = seed_fleet(db, clients=1000)
+        seed_routes(db, truck_ids, driver_ids, days=1, routes_per_day=5)
+        route = db.query(RouteManifest).filter(RouteManifest.audit_status == AuditStatus.IN_PROGRESS).first()
+
+        for lines in (10, 100, 1000):
+            data = make_payload(client_ids, lines)
+            route.initial_full_bottles = lines
+
+            def run_legacy():
+                legacy_checkin(db, route, data, user_id=1)
+                db.rollback()
+
+            def run_batched():
+                timer = PhaseTimer()
+                checkin_route(db, route, data, user_id=1, timer=timer)
+                db.flush()
+                db.rollback()
+                return timer
+
+            with count_queries() as legacy_q:
+                run_legacy()
+            with count_queries() as batched_q:
+                timer = run_batched()
+
+            legacy_ms = timeit(run_legacy, repeat=10)
+            batched_ms = timeit(run_batched, repeat=10)
+
+            print(f"\nCheck-in con {lines} líneas de venta")
+            print(f"  anterior : {legacy_q['queries']} sentencias, mediana {legacy_ms[0]:.2f} ms, p95 {legacy_ms[1]:.2f} ms")
+            print(f"  por lotes: {batched_q['queries']} sentencias, mediana {batched_ms[0]:.2f} ms, p95 {batched_ms[1]:.2f} ms")
+            print(f"  fases    : {timer.server_timing()}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark de concurrencia: lecturas de reportes y escrituras de rutas mezcladas,
+con el engine por defecto vs el perfil de SQLite + cola de escritura.
+Ejecutar desde backend/: python -m benchmarks.bench_concurrency
+"""
+
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks._support import _TMP_DIR, seed_fleet, seed_routes
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, apply_sqlite_profile, write_transaction
+from app.models.route_manifest import RouteManifest, AuditStatus
+
+READERS = 8
+WRITERS = 4
+DURATION_SECONDS = 5.0
+
+
+def build_engine(name: str, tuned: bool):
+    path = os.path.join(_TMP_DIR, f"{name}.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if tuned:
+        apply_sqlite_profile(engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def read_report(Session):
+    db = Session()
+    try:
+        start = date.today() - timedelta(days=30)
+        db.query(
+            RouteManifest.audit_status,
+            func.count(RouteManifest.id),
+            func.sum(RouteManifest.debt_amount),
+        ).filter(RouteManifest.date >= start).group_by(RouteManifest.audit_status).all()
+    finally:
+        db.close()
+
+
+def write_route(Session, truck_ids, driver_ids, serialized: bool):
+    db = Session()
+    try:
+        def work():
+            # Lectura y escritura en la misma transacción, como un check-in
+            route = db.query(RouteManifest).filter(
+                RouteManifest.audit_status == AuditStatus.IN_PROGRESS
+            ).order_by(RouteManifest.id.desc()).first()
+            if route is not None:
+                route.notes = f"tocada {time.time()}"
+            db.add(RouteManifest(
+                driver_id=driver_ids[0], truck_id=truck_ids[0], date=date.today(),
+                initial_full_bottles=100, audit_status=AuditStatus.IN_PROGRESS,
+                checkout_timestamp=datetime.now(),
+            ))
+            db.commit()
+
+        if serialized:
+            with write_transaction(db):
+                work()
+        else:
+            work()
+    finally:
+        db.close()
+
+
+def run(engine, serialized: bool):
+    Session = sessionmaker(bind=engine, autoflush=False)
+    db = Session()
+    truck_ids, driver_ids, _ = seed_fleet(db)
+    seed_routes(db, truck_ids, driver_ids, days=60, routes_per_day=200)
+    db.close()
+
+    counters = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + DURATION_SECONDS
+
+    def loop(action, kind):
+        while time.monotonic() < deadline:
+            try:
+                action()
+                with lock:
+                    counters[kind] += 1
+            except OperationalError:
+                with lock:
+                    counters["errors"] += 1
+
+    threads = [threading.Thread(target=loop, args=(lambda: read_report(Session), "reads"))
+               for _ in range(READERS)]
+    threads += [threading.Thread(target=loop, args=(
+        lambda: write_route(Session, truck_ids, driver_ids, serialized), "writes"))
+        for _ in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return counters
+
+
+def main():
+    print(f"{READERS} lectores + {WRITERS} escritores durante {DURATION_SECONDS:.0f} s\n")
+    for label, name, tuned in (("por defecto", "baseline", False), ("perfil + cola", "tuned", True)):
+        counters = run(build_engine(name, tuned), serialized=tuned)
+        print(f"  {label:13}: {counters['reads'] / DURATION_SECONDS:7.1f} lecturas/s, "
+              f"{counters['writes'] / DURATION_SECONDS:6.1f} escrituras/s, "
+              f"{counters['errors']} errores 'database is locked'")
+
+
+if __name__ == "__main__":
+    main()
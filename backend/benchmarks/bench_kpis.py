@@ -0,0 +1,70 @@
+"""
+Benchmark de /reports/kpis: consultas separadas vs motor de una sola pasada.
+Ejecutar desde backend/: python -m benchmarks.bench_kpis
+"""
+
+from datetime import date, timedelta
+
+from benchmarks._support import (
+    SessionLocal, reset_database, seed_fleet, seed_routes, count_queries, timeit
+)
+from sqlalchemy import func
+
+from app.models.route_manifest import RouteManifest, AuditStatus
+from app.services.kpi_service import compute_kpis
+from app.services.rollup_service import rebuild_rollups
+
+
+def legacy_kpis(db, start_date, end_date):
+    """Implementación anterior: una consulta por cifra"""
+    in_range = (RouteManifest.date >= start_date, RouteManifest.date <= end_date)
+    total_routes = db.query(RouteManifest).filter(*in_range).count()
+    problematic = db.query(RouteManifest).filter(
+        *in_range, RouteManifest.audit_status == AuditStatus.DEBT
+    ).count()
+    bottles = db.query(
+        func.sum(RouteManifest.initial_full_bottles + RouteManifest.initial_empty_bottles)
+    ).filter(*in_range).scalar()
+    debt = db.query(func.sum(RouteManifest.debt_amount)).filter(
+        *in_range, RouteManifest.debt_amount > 0
+    ).scalar()
+    today = db.query(RouteManifest).filter(RouteManifest.date == date.today()).count()
+    active = db.query(RouteManifest).filter(
+        RouteManifest.audit_status == AuditStatus.IN_PROGRESS
+    ).count()
+    distribution = db.query(
+        RouteManifest.audit_status, func.count(RouteManifest.id)
+    ).filter(*in_range).group_by(RouteManifest.audit_status).all()
+    return total_routes, problematic, bottles, debt, today, active, distribution
+
+
+def main():
+    reset_database()
+    db = SessionLocal()
+    try:
+        truck_ids, driver_ids, _ = seed_fleet(db)
+        total = seed_routes(db, truck_ids, driver_ids, days=365, routes_per_day=40)
+        rebuild_rollups(db)
+        end_date = date.today()
+        print(f"Rutas sintéticas: {total} (365 días)")
+
+        for label, days in (("30 días", 30), ("365 días", 365)):
+            start_date = end_date - timedelta(days=days)
+
+            with count_queries() as legacy_q:
+                legacy_kpis(db, start_date, end_date)
+            with count_queries() as engine_q:
+                compute_kpis(db, start_date, end_date)
+
+            legacy_ms = timeit(lambda: legacy_kpis(db, start_date, end_date))
+            engine_ms = timeit(lambda: compute_kpis(db, start_date, end_date))
+
+            print(f"\nRango {label} (kpis + status/distribution)")
+            print(f"  anterior : {legacy_q['queries']} consultas, mediana {legacy_ms[0]:.2f} ms, p95 {legacy_ms[1]:.2f} ms")
+            print(f"  una pasada: {engine_q['queries']} consultas, mediana {engine_ms[0]:.2f} ms, p95 {engine_ms[1]:.2f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark de logins concurrentes junto a peticiones ajenas (/health).
+bcrypt en los hilos del servidor vs en el pool de procesos.
+Ejecutar desde backend/: python -m benchmarks.bench_logins
+"""
+
+import statistics
+import threading
+import time
+
+from benchmarks._support import SessionLocal, reset_database
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.models.user import User, UserRole
+from app.services.password_pool import PasswordPool
+from app.utils import security
+from app.utils.password_worker import hash_password
+
+LOGINS = 24
+LOGIN_THREADS = 8
+PROBE_SECONDS_MIN = 1.0
+
+
+def seed_user():
+    reset_database()
+    db = SessionLocal()
+    db.add(User(username="supervisor", full_name="Supervisor", role=UserRole.SUPERVISOR, is_active=True,
+                hashed_password=hash_password("turno-matutino", settings.BCRYPT_ROUNDS)))
+    db.commit()
+    db.close()
+
+
+def run(client, pool: PasswordPool):
+    security.password_pool = pool
+    pending = list(range(LOGINS))
+    lock = threading.Lock()
+    statuses = []
+    probe_latencies = []
+    done = threading.Event()
+
+    def login_worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                pending.pop()
+            response = client.post("/api/v1/auth/login",
+                                   data={"username": "supervisor", "password": "turno-matutino"})
+            with lock:
+                statuses.append(response.status_code)
+
+    def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get("/health")
+            probe_latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=login_worker) for _ in range(LOGIN_THREADS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    time.sleep(max(0.0, PROBE_SECONDS_MIN - elapsed))
+    done.set()
+    prober.join()
+    pool.shutdown()
+
+    probe_latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "ok": statuses.count(200),
+        "busy": statuses.count(503),
+        "health_p50": statistics.median(probe_latencies),
+        "health_p95": probe_latencies[int(len(probe_latencies) * 0.95) - 1],
+        "health_max": probe_latencies[-1],
+    }
+
+
+def main():
+    seed_user()
+    print(f"{LOGINS} logins desde {LOGIN_THREADS} hilos, bcrypt {settings.BCRYPT_ROUNDS} rondas; "
+          f"sondeo continuo de /health\n")
+    with TestClient(app) as client:
+        for label, pool in (
+            ("en hilos", PasswordPool(workers=0, max_pending=0, rounds=settings.BCRYPT_ROUNDS, timeout=30)),
+            ("pool procesos", PasswordPool(workers=settings.PASSWORD_POOL_WORKERS,
+                                           max_pending=settings.PASSWORD_POOL_MAX_PENDING,
+                                           rounds=settings.BCRYPT_ROUNDS, timeout=30)),
+        ):
+            r = run(client, pool)
+            print(f"  {label:13}: {r['elapsed']:.2f} s, {r['ok']} ok, {r['busy']} rechazados (503); "
+                  f"/health p50 {r['health_p50']:.1f} ms, p95 {r['health_p95']:.1f} ms, máx {r['health_max']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: p99 de check-in con y sin reportes pesados en paralelo,
+con los reportes en el pool de escritura (compartido) vs en el engine de
+solo lectura con pool propio. Los percentiles salen de GET /metrics/latency.
+Ejecutar desde backend/: python -m benchmarks.bench_report_isolation
+"""
+
+import threading
+import time
+
+from benchmarks._support import SessionLocal, reset_database, seed_fleet, seed_routes
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+
+from app.api.v1 import reports
+from app.config import settings
+from app.database import get_read_db, begin_read_snapshot
+from app.main import app
+from app.models.route_manifest import RouteManifest
+from app.models.user import User, UserRole
+from app.services.latency_metrics import latency_recorder
+from app.services.rollup_service import rebuild_rollups
+from app.utils.security import create_access_token
+
+CHECKINS = 40
+REPORT_THREADS = 32
+CHECKIN_KEY = "POST /api/v1/routes/{route_id}/checkin"
+
+
+def shared_read_db():
+    """Como antes: reportes en el engine (y pool) de escritura"""
+    db = SessionLocal()
+    try:
+        begin_read_snapshot(db)
+        yield db
+    finally:
+        db.close()
+
+
+def heavy_monthly(db, start_date):
+    """Reporte pesado: escaneo completo de manifiestos (sin acumulados ni cache)"""
+    month = func.strftime("%Y-%m", RouteManifest.date)
+    db.query(
+        month, RouteManifest.driver_id, func.count(RouteManifest.id), func.sum(RouteManifest.debt_amount)
+    ).group_by(month, RouteManifest.driver_id).all()
+    return {"monthly": []}
+
+
+def seed():
+    reset_database()
+    db = SessionLocal()
+    truck_ids, driver_ids, _ = seed_fleet(db, trucks=CHECKINS, drivers=CHECKINS)
+    seed_routes(db, truck_ids, driver_ids, days=365, routes_per_day=60)
+    rebuild_rollups(db)
+    db.add(User(username="admin", full_name="Admin", hashed_password="x", role=UserRole.ADMIN, is_active=True))
+    db.commit()
+    db.close()
+    return truck_ids, driver_ids
+
+
+def run(client, headers, truck_ids, driver_ids, with_reports: bool):
+    done = threading.Event()
+    served = {"ok": 0, "errors": 0}
+
+    def report_loop():
+        while not done.is_set():
+            response = client.get("/api/v1/reports/monthly/summary", headers=headers)
+            served["ok" if response.status_code == 200 else "errors"] += 1
+
+    threads = [threading.Thread(target=report_loop) for _ in range(REPORT_THREADS if with_reports else 0)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5 if with_reports else 0)
+
+    latency_recorder.reset()
+    for truck_id, driver_id in zip(truck_ids, driver_ids):
+        response = client.post("/api/v1/routes/checkout", headers=headers, json={
+            "driver_id": driver_id, "truck_id": truck_id, "initial_full_bottles": 50
+        })
+        route_id = response.json()["route_id"]
+        client.post(f"/api/v1/routes/{route_id}/checkin", headers=headers, json={
+            "returned_full_bottles": 10, "returned_empty_bottles": 40
+        })
+    checkin = client.get("/metrics/latency", headers=headers).json()["latency"][CHECKIN_KEY]
+
+    done.set()
+    for thread in threads:
+        thread.join()
+    return checkin, served
+
+
+def main():
+    settings.ANALYTICS_COLUMNAR_ENABLED = False
+    reports._monthly_summary_report = heavy_monthly
+    reports._cached = lambda db, name, params, compute: compute()  # Sin cache: cada petición escanea
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+    print(f"{CHECKINS} check-ins secuenciales; {REPORT_THREADS} hilos pidiendo un reporte con escaneo completo")
+    print(f"pool escritura {settings.DB_WRITE_POOL_SIZE}+{settings.DB_WRITE_POOL_MAX_OVERFLOW}, "
+          f"pool lectura {settings.DB_READ_POOL_SIZE}+{settings.DB_READ_POOL_MAX_OVERFLOW}\n")
+    for label, override in (("compartido", shared_read_db), ("solo lectura", None)):
+        if override is not None:
+            app.dependency_overrides[get_read_db] = override
+        else:
+            app.dependency_overrides.pop(get_read_db, None)
+        for with_reports in (False, True):
+            truck_ids, driver_ids = seed()
+            with TestClient(app, raise_server_exceptions=False) as client:
+                checkin, served = run(client, headers, truck_ids, driver_ids, with_reports)
+            load = f"con reportes ({served['ok']} ok, {served['errors']} errores)" if with_reports else "sin reportes"
+            print(f"  {label:12} {load:32}: check-in p50 {checkin['p50_ms']:8.1f} ms, "
+                  f"p99 {checkin['p99_ms']:8.1f} ms, máx {checkin['max_ms']:8.1f} ms", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+# La configuración se lee al importar app.*: se fija antes de cualquier import de la app
+_TMP_DIR = tempfile.mkdtemp(prefix="waterlog_test_")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ["ENVIRONMENT"] = "test"
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ["MAINTENANCE_ENABLED"] = "false"  # Las pruebas llaman al mantenimiento directamente
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.models.truck import Truck  # noqa: E402
+from app.models.client import Client  # noqa: E402
+from app.utils.security import create_access_token  # noqa: E402
+from app.services.auth_cache import principal_cache  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Esquema limpio por prueba"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    principal_cache.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def fleet(db):
+    """Admin, dos choferes, dos camionetas y dos clientes"""
+    admin = User(username="admin", full_name="Administrador", hashed_password="x",
+                 role=UserRole.ADMIN, is_active=True)
+    drivers = [
+        User(username=f"chofer{i}", full_name=f"Chofer {i}", hashed_password="x",
+             role=UserRole.CHOFER, is_active=True)
+        for i in range(2)
+    ]
+    trucks = [Truck(plate=f"TST-{i}", nickname=f"Unidad {i}", is_active=True) for i in range(2)]
+    clients = [Client(name="Tienda", special_price=None), Client(name="Ingenio", special_price=45.0)]
+    db.add_all([admin, *drivers, *trucks, *clients])
+    db.commit()
+    return {"admin": admin, "drivers": drivers, "trucks": trucks, "clients": clients}
+
+
+@pytest.fixture
+def client(fleet):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(fleet):
+    token = create_access_token({"sub": fleet["admin"].username})
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,111 @@
+"""Bitácora por meses: sellado de meses cerrados y consultas sobre caliente + archivos."""
+
+import gzip
+import os
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app.config import settings
+from app.models.audit_archive import AuditArchive
+from app.models.audit_log import AuditLog
+from app.services import audit_archive
+
+TODAY = date(2024, 4, 10)
+
+
+@pytest.fixture
+def history(db, fleet, tmp_path, monkeypatch):
+    """Bitácora de febrero, marzo y abril (mes actual)"""
+    monkeypatch.setattr(settings, "AUDIT_ARCHIVE_DIR", str(tmp_path))
+    audit_archive.archive_cache.clear()
+    rows = []
+    for month in (2, 3, 4):
+        for day in (1, 15):
+            rows.append({"timestamp": datetime(2024, month, day, 12), "user_id": fleet["admin"].id,
+                         "action": "ROUTE_CHECKIN", "entity_type": "RouteManifest",
+                         "entity_id": month * 100 + day, "new_value": {"month": month}})
+    db.execute(insert(AuditLog), rows)
+    db.commit()
+    yield rows
+    audit_archive.archive_cache.clear()
+
+
+def test_closed_months_are_sealed_and_removed_from_hot_table(db, history):
+    assert audit_archive.closed_months(db, TODAY) == ["2024-02", "2024-03"]
+
+    result = audit_archive.archive_closed_months(TODAY)
+    assert [s["month"] for s in result["sealed"]] == ["2024-02", "2024-03"]
+    assert result["rows"] == 4
+
+    db.expire_all()
+    assert db.query(AuditLog).count() == 2  # Solo abril
+    archive = db.query(AuditArchive).filter(AuditArchive.month == "2024-03").one()
+    assert archive.row_count == 2
+    assert os.stat(archive.path).st_mode & 0o222 == 0  # Solo lectura
+    with gzip.open(archive.path, "rb") as handle:
+        assert handle.read(16) == b"SQLite format 3\x00"
+
+    # Nada que sellar en la segunda pasada
+    assert audit_archive.archive_closed_months(TODAY)["sealed"] == []
+    with pytest.raises(ValueError):
+        audit_archive.seal_month("2024-04", TODAY)
+
+
+def test_queries_span_hot_table_and_archives(client, auth_headers, db, history):
+    audit_archive.archive_closed_months(TODAY)
+    audit_archive.archive_cache.clear()  # Obliga a descomprimir y verificar
+
+    logs = client.get("/api/v1/audit/", headers=auth_headers, params={"limit": 10}).json()["logs"]
+    assert [log["entity_id"] for log in logs] == [415, 401, 315, 301, 215, 201]
+    assert logs[2]["new_value"] == {"month": 3}
+
+    march = client.get("/api/v1/audit/", headers=auth_headers, params={
+        "start_date": "2024-03-01", "end_date": "2024-03-31"
+    }).json()["logs"]
+    assert [log["entity_id"] for log in march] == [315, 301]
+
+    entity = client.get("/api/v1/audit/", headers=auth_headers, params={
+        "entity_type": "RouteManifest", "entity_id": 201
+    }).json()["logs"]
+    assert len(entity) == 1 and entity[0]["timestamp"].startswith("2024-02-01")
+
+    summary = client.get("/api/v1/audit/archives", headers=auth_headers).json()
+    assert summary["hot_rows"] == 2 and len(summary["archives"]) == 2
+
+
+def test_late_rows_form_a_new_segment_and_corruption_is_detected(db, fleet, history):
+    audit_archive.archive_closed_months(TODAY)
+    db.execute(insert(AuditLog), [{"timestamp": datetime(2024, 3, 20), "user_id": fleet["admin"].id,
+                                   "action": "LATE", "entity_type": "RouteManifest", "entity_id": 320}])
+    db.commit()
+
+    sealed = audit_archive.archive_closed_months(TODAY)["sealed"]
+    assert [s["month"] for s in sealed] == ["2024-03"]
+    assert db.query(AuditArchive).filter(AuditArchive.month == "2024-03").count() == 2
+    assert [log["entity_id"] for log in audit_archive.query_logs(db, action="LATE")] == [320]
+
+    archive = db.query(AuditArchive).filter(AuditArchive.month == "2024-02").one()
+    archive.sha256 = "0" * 64
+    db.commit()
+    audit_archive.archive_cache.clear()
+    with pytest.raises(audit_archive.AuditArchiveError):
+        audit_archive.query_logs(db, start=datetime(2024, 2, 1), end=datetime(2024, 3, 1))
+
+
+def test_segment_in_use_survives_eviction(db, history, monkeypatch):
+    audit_archive.archive_closed_months(TODAY)
+    audit_archive.archive_cache.clear()
+    monkeypatch.setattr(audit_archive.archive_cache, "max_files", 1)
+    february, march = db.query(AuditArchive).order_by(AuditArchive.month).all()
+
+    with audit_archive.archive_cache.connect(february) as conn:
+        local_path = audit_archive.archive_cache._entries[february.path].local_path
+        # Cargar marzo desaloja a febrero, pero la lectura en curso lo tiene fijado
+        with audit_archive.archive_cache.connect(march) as other:
+            assert other.execute(audit_archive.AUDIT_TABLE.select()).all()
+        assert february.path not in audit_archive.archive_cache._entries
+        assert os.path.exists(local_path)
+        assert len(conn.execute(audit_archive.AUDIT_TABLE.select()).all()) == 2
+    assert not os.path.exists(local_path)  # Se borra al soltarlo
@@ -0,0 +1,127 @@
+"""Escritor asíncrono de auditoría: lotes tras el commit, drenado y spool."""
+
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from app.models.audit_log import AuditLog
+from app.services.audit_writer import AuditWriter, audit_writer
+
+
+@pytest.fixture
+def async_audit(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_writer, "spool_path", str(tmp_path / "spool.ndjson"))
+    audit_writer.start()
+    yield audit_writer
+    audit_writer.stop()
+
+
+def test_checkout_audit_is_written_in_batches_and_drained(client, auth_headers, fleet, db, async_audit):
+    driver, truck = fleet["drivers"][0], fleet["trucks"][0]
+    for _ in range(3):
+        response = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+            "driver_id": driver.id, "truck_id": truck.id, "initial_full_bottles": 10
+        })
+        assert response.status_code == 200
+
+    async_audit.stop()
+
+    assert db.query(AuditLog).filter(AuditLog.action == "ROUTE_CHECKOUT").count() == 3
+    assert async_audit.written >= 3
+    assert async_audit.stats()["pending"] == 0
+    with open(async_audit.spool_path) as spool:
+        assert spool.read() == ""
+
+
+def test_rolled_back_request_leaves_no_audit(client, auth_headers, db, async_audit):
+    response = client.post("/api/v1/routes/999/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 0, "returned_empty_bottles": 0
+    })
+    assert response.status_code == 404
+
+    async_audit.stop()
+    assert db.query(AuditLog).count() == 0
+
+
+def test_spool_is_recovered_on_start(tmp_path, db, fleet):
+    spool = tmp_path / "spool.ndjson"
+    record = {
+        "timestamp": datetime.utcnow().isoformat(), "user_id": fleet["admin"].id,
+        "action": "ROUTE_CHECKOUT", "entity_type": "RouteManifest", "entity_id": 1,
+        "notes": None, "old_value": None, "new_value": None, "ip_address": None, "user_agent": None,
+    }
+    spool.write_text(json.dumps(record) + "\n")
+
+    writer = AuditWriter(max_queue=10, batch_size=10, flush_interval=0.01, spool_path=str(spool))
+    assert writer.recover() == 1
+    assert db.query(AuditLog).count() == 1
+    assert spool.read_text() == ""
+
+
+def test_full_queue_writes_inline_without_waiting_for_the_write_turn(
+        client, auth_headers, fleet, db, async_audit, monkeypatch):
+    monkeypatch.setattr(async_audit, "max_queue", 1)
+    drivers, trucks = fleet["drivers"], fleet["trucks"]
+
+    started = time.perf_counter()
+    response = client.post("/api/v1/routes/checkout/batch", headers=auth_headers, json={"entries": [
+        {"driver_id": drivers[i].id, "truck_id": trucks[i].id, "initial_full_bottles": 10} for i in range(2)
+    ]})
+    assert response.status_code == 200
+    assert time.perf_counter() - started < 1.0
+    assert async_audit.fallbacks == 2
+
+    # Quedaron en la misma transacción que las rutas, sin pasar por la cola
+    assert db.query(AuditLog).filter(AuditLog.action == "ROUTE_CHECKOUT").count() == 2
+    assert async_audit.stats()["reserved"] == 0
+
+
+def _record(user_id, action="ROUTE_CHECKOUT", entity_id=1):
+    return {
+        "timestamp": datetime.utcnow().isoformat(), "user_id": user_id,
+        "action": action, "entity_type": "RouteManifest", "entity_id": entity_id,
+        "notes": None, "old_value": None, "new_value": None, "ip_address": None, "user_agent": None,
+    }
+
+
+def test_record_that_cannot_be_inserted_goes_to_dead_letter(tmp_path, db, fleet):
+    dead_letter = tmp_path / "dead.ndjson"
+    writer = AuditWriter(max_queue=10, batch_size=10, flush_interval=0.01,
+                         spool_path=str(tmp_path / "spool.ndjson"), dead_letter_path=str(dead_letter))
+    records = [_record(fleet["admin"].id, entity_id=1), _record(fleet["admin"].id, action=None, entity_id=2),
+               _record(fleet["admin"].id, entity_id=3)]
+    writer.start()
+    assert writer.reserve(len(records))
+    writer.submit(records)
+    started = time.monotonic()
+    writer.stop(timeout=10)
+
+    assert time.monotonic() - started < 5  # El registro malo no detiene al escritor
+    assert sorted(entity_id for (entity_id,) in db.query(AuditLog.entity_id)) == [1, 3]
+    lines = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [line["record"]["entity_id"] for line in lines] == [2]
+    assert "NOT NULL" in lines[0]["error"]
+    assert writer.stats()["dead_letters"] == 1 and writer.stats()["pending"] == 0
+
+
+def test_transient_errors_are_retried(tmp_path, db, fleet, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+
+    from app.services import audit_writer as module
+
+    failures = [OperationalError("INSERT", {}, Exception("database is locked"))] * 2
+    original = module.insert_records
+
+    def flaky(records):
+        if failures:
+            raise failures.pop()
+        original(records)
+
+    monkeypatch.setattr(module, "insert_records", flaky)
+    writer = AuditWriter(max_queue=10, batch_size=10, flush_interval=0.01, spool_path=None,
+                         dead_letter_path=str(tmp_path / "dead.ndjson"), max_retries=3)
+    writer._write_batch([_record(fleet["admin"].id)])
+    assert db.query(AuditLog).count() == 1
+    assert writer.dead_letters == 0
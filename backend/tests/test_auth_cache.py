@@ -0,0 +1,62 @@
+"""Cache de autenticación: sin JWT ni SELECT en el camino rápido, invalidado al cambiar el usuario."""
+
+from sqlalchemy import event
+
+from app.database import engine
+from app.models.user import UserRole
+from app.services.auth_cache import principal_cache
+
+
+def _count_user_selects():
+    counter = {"n": 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    return counter, lambda: event.remove(engine, "before_cursor_execute", _count)
+
+
+def test_repeated_requests_hit_the_cache(client, auth_headers):
+    assert client.get("/api/v1/auth/me", headers=auth_headers).status_code == 200
+
+    counter, stop = _count_user_selects()
+    try:
+        for _ in range(5):
+            assert client.get("/api/v1/auth/me", headers=auth_headers).status_code == 200
+    finally:
+        stop()
+
+    assert counter["n"] == 0
+    assert principal_cache.stats()["hits"] >= 5
+
+
+def test_deactivation_and_role_change_invalidate(client, auth_headers, fleet, db):
+    admin = fleet["admin"]
+    assert client.get("/api/v1/auth/me", headers=auth_headers).json()["role"] == "ADMIN"
+
+    admin.role = UserRole.SUPERVISOR
+    db.commit()
+    assert client.get("/api/v1/auth/me", headers=auth_headers).json()["role"] == "SUPERVISOR"
+
+    admin.is_active = False
+    db.commit()
+    assert client.get("/api/v1/auth/me", headers=auth_headers).status_code == 403
+
+
+def test_user_loaded_before_an_invalidation_is_not_cached(fleet):
+    admin, token = fleet["admin"], "token-de-prueba"
+
+    generation = principal_cache.generation()  # La petición empieza a cargar al usuario
+    principal_cache.invalidate_user(admin.id)  # Un commit cambia al usuario mientras tanto
+    principal_cache.put(token, admin, None, generation)
+    assert principal_cache.get(token) is None
+
+    generation = principal_cache.generation()
+    principal_cache.clear()
+    principal_cache.put(token, admin, None, generation)
+    assert principal_cache.get(token) is None
+
+    principal_cache.put(token, admin, None, principal_cache.generation())
+    assert principal_cache.get(token) is admin
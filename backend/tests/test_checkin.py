@@ -0,0 +1,110 @@
+"""Check-in por lotes: precios, líneas repetidas y tiempos por fase."""
+
+from app.models.sales_detail import SalesDetail
+from app.config import settings
+
+
+def test_checkin_merges_lines_and_prices_in_bulk(client, auth_headers, fleet, db):
+    driver, truck = fleet["drivers"][0], fleet["trucks"][0]
+    tienda, ingenio = fleet["clients"]
+    route_id = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": driver.id, "truck_id": truck.id, "initial_full_bottles": 30
+    }).json()["route_id"]
+
+    response = client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 0,
+        "returned_empty_bottles": 30,
+        "sales": [
+            {"client_id": tienda.id, "quantity": 10},
+            {"client_id": ingenio.id, "quantity": 15},
+            {"client_id": tienda.id, "quantity": 5},
+            {"client_id": 9999, "quantity": 3},  # Cliente inexistente: se ignora
+        ],
+    })
+    assert response.status_code == 200, response.text
+    assert "sales;dur=" in response.headers["server-timing"]
+
+    details = {d.client_id: d for d in db.query(SalesDetail).filter(SalesDetail.route_id == route_id)}
+    assert set(details) == {tienda.id, ingenio.id}
+    assert details[tienda.id].quantity == 15
+    assert details[tienda.id].unit_price == settings.BOTTLE_PRICE
+    assert details[ingenio.id].subtotal == 15 * 45.0
+    assert response.json()["debt"] == 15 * settings.BOTTLE_PRICE + 15 * 45.0
+
+
+def test_checkout_and_checkin_commit_once_with_audit(client, auth_headers, fleet, db):
+    from app.models.audit_log import AuditLog
+
+    driver, truck = fleet["drivers"][0], fleet["trucks"][0]
+    response = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": driver.id, "truck_id": truck.id, "initial_full_bottles": 10
+    })
+    assert response.headers["x-db-commits"] == "1"
+    route_id = response.json()["route_id"]
+
+    response = client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 10, "returned_empty_bottles": 0, "sales": []
+    })
+    assert response.headers["x-db-commits"] == "1"
+
+    actions = [a for (a,) in db.query(AuditLog.action).filter(AuditLog.entity_id == route_id)]
+    assert sorted(actions) == ["ROUTE_CHECKIN", "ROUTE_CHECKOUT"]
+
+
+def test_batch_checkout_validates_entries_and_commits_once(client, auth_headers, fleet, db):
+    from app.models.route_manifest import RouteManifest
+
+    drivers, trucks = fleet["drivers"], fleet["trucks"]
+    response = client.post("/api/v1/routes/checkout/batch", headers=auth_headers, json={"entries": [
+        {"driver_id": drivers[0].id, "truck_id": trucks[0].id, "initial_full_bottles": 100},
+        {"driver_id": drivers[1].id, "truck_id": trucks[0].id, "initial_full_bottles": 80},  # Camioneta repetida
+        {"driver_id": fleet["admin"].id, "truck_id": trucks[1].id, "initial_full_bottles": 80},  # No es chofer
+        {"driver_id": drivers[1].id, "truck_id": trucks[1].id, "initial_full_bottles": 90},
+    ]})
+    assert response.status_code == 200, response.text
+    assert response.headers["x-db-commits"] == "1"
+
+    body = response.json()
+    assert [r["status"] for r in body["results"]] == ["created", "rejected", "rejected", "created"]
+    assert db.query(RouteManifest).count() == 2
+
+    # Las camionetas ya están en ruta
+    response = client.post("/api/v1/routes/checkout/batch", headers=auth_headers, json={"entries": [
+        {"driver_id": drivers[0].id, "truck_id": trucks[1].id, "initial_full_bottles": 100},
+    ]})
+    assert response.json()["results"][0]["error"] == "La camioneta ya está en ruta"
+
+
+def test_batch_checkin_ingest_streams_outcomes_in_capture_order(client, auth_headers, fleet, db, monkeypatch):
+    import json
+    from app.config import settings
+    from app.models.route_manifest import RouteManifest
+
+    monkeypatch.setattr(settings, "CHECKIN_BATCH_CHUNK_SIZE", 2)
+    drivers, trucks = fleet["drivers"], fleet["trucks"]
+    route_ids = [
+        client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+            "driver_id": d.id, "truck_id": t.id, "initial_full_bottles": 10
+        }).json()["route_id"]
+        for d, t in zip(drivers, trucks)
+    ]
+
+    items = [
+        {"route_id": route_ids[1], "client_timestamp": "2026-01-05T18:30:00",
+         "returned_full_bottles": 10, "returned_empty_bottles": 0},
+        {"route_id": 9999, "client_timestamp": "2026-01-05T18:00:00",
+         "returned_full_bottles": 0, "returned_empty_bottles": 0},
+        {"route_id": route_ids[0], "client_timestamp": "2026-01-05T17:00:00",
+         "returned_full_bottles": 0, "returned_empty_bottles": 10,
+         "sales": [{"client_id": fleet["clients"][0].id, "quantity": 10}]},
+    ]
+    response = client.post("/api/v1/routes/checkin/batch", headers=auth_headers, json={"items": items})
+    assert response.status_code == 200
+    outcomes = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [o["index"] for o in outcomes] == [2, 1, 0]
+    assert [o["status"] for o in outcomes] == ["ok", "rejected", "ok"]
+
+    route = db.get(RouteManifest, route_ids[0])
+    assert route.checkin_timestamp.isoformat() == "2026-01-05T17:00:00"
+    assert route.debt_amount == 10 * settings.BOTTLE_PRICE
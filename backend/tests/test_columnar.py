@@ -0,0 +1,116 @@
+"""Almacén columnar: mismas cifras que los acumulados SQL, incremental y tras recargar."""
+
+from datetime import date, timedelta
+
+from app.api.v1 import reports
+from app.services import data_version
+from app.services.columnar_store import columnar_store
+from app.services.kpi_service import compute_kpis
+
+START, END = date.today() - timedelta(days=30), date.today()
+
+
+def _route(client, auth_headers, driver, truck, full, sold):
+    route_id = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": driver.id, "truck_id": truck.id, "initial_full_bottles": full
+    }).json()["route_id"]
+    if sold is not None:
+        response = client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+            "returned_full_bottles": full - sold, "returned_empty_bottles": 0, "sales": []
+        })
+        assert response.status_code == 200, response.text
+    return route_id
+
+
+def _both_paths(db, monkeypatch):
+    """(columnar, SQL) de los KPIs y los totales por camioneta y chofer"""
+    db.rollback()  # Lectura nueva: ve lo que confirmaron las peticiones
+    results = []
+    for enabled in (True, False):
+        monkeypatch.setattr(columnar_store, "enabled", enabled)
+        results.append((
+            compute_kpis(db, START, END),
+            reports._truck_performance_report(db, START, END),
+            reports._driver_performance_report(db, START, END, limit=10),
+        ))
+    monkeypatch.setattr(columnar_store, "enabled", True)
+    return results
+
+
+def test_columnar_matches_rollups_incrementally_and_after_reload(client, auth_headers, fleet, db, monkeypatch):
+    drivers, trucks = fleet["drivers"], fleet["trucks"]
+    _route(client, auth_headers, drivers[0], trucks[0], full=30, sold=20)  # Con deuda
+    columnar, sql = _both_paths(db, monkeypatch)
+    assert columnar == sql
+    loads = []
+    original_load = columnar_store._load
+    monkeypatch.setattr(columnar_store, "_load", lambda session: loads.append(1) or original_load(session))
+
+    # Checkout y check-in posteriores se aplican sin recargar
+    _route(client, auth_headers, drivers[1], trucks[1], full=12, sold=None)
+    _route(client, auth_headers, drivers[1], trucks[1], full=10, sold=0)
+    columnar, sql = _both_paths(db, monkeypatch)
+    assert loads == []
+    assert columnar == sql
+    assert columnar[0]["total_routes"] == 3 and columnar[0]["active_routes"] == 1
+
+    columnar_store.invalidate()
+    columnar, sql = _both_paths(db, monkeypatch)
+    assert loads == [1]
+    assert columnar == sql
+
+
+def test_pinned_read_ignores_a_store_at_other_versions(client, auth_headers, fleet, db):
+    _route(client, auth_headers, fleet["drivers"][0], fleet["trucks"][0], full=30, sold=30)
+    db.info["data_versions"] = data_version.all_versions()
+    assert columnar_store.snapshot(db) is not None
+
+    # Otra petición confirma después de fijar: la lectura fijada no usa el almacén nuevo
+    _route(client, auth_headers, fleet["drivers"][1], fleet["trucks"][1], full=10, sold=None)
+    assert columnar_store.snapshot(db) is None
+    db.info.pop("data_versions")
+    assert columnar_store.snapshot(db) is not None
+
+
+def test_readers_never_see_a_check_in_half_applied(client, auth_headers, fleet, db):
+    import threading
+
+    from app.models.route_manifest import RouteManifest, AuditStatus
+
+    _route(client, auth_headers, fleet["drivers"][0], fleet["trucks"][0], full=30, sold=20)
+    first = columnar_store.snapshot(db)
+    before = first.kpis(START, END, END)
+    done, errors = threading.Event(), []
+
+    def reader():
+        try:
+            while not done.is_set():
+                snapshot = columnar_store._snapshot  # Lo que snapshot() entrega, sin candado
+                kpis = snapshot.kpis(START, END, END)
+                trucks = snapshot.truck_totals(START, END)
+                assert kpis == snapshot.kpis(START, END, END)
+                assert sum(kpis["distribution"].values()) == kpis["total_routes"]
+                assert sum(t["total_routes"] for t in trucks) == kpis["total_routes"]
+        except Exception as exc:  # noqa: BLE001 - se reporta en el hilo principal
+            errors.append(exc)
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in readers:
+        thread.start()
+    for i in range(200):
+        # Camionetas y días nuevos de vez en cuando: obligan a reconstruir los prefijos
+        route = RouteManifest(
+            id=10_000 + i, date=END - timedelta(days=i % 40), truck_id=100 + i // 20,
+            driver_id=fleet["drivers"][i % 2].id, initial_full_bottles=10, initial_empty_bottles=i % 3,
+            audit_status=AuditStatus.DEBT if i % 4 else AuditStatus.CLOSED, debt_amount=float(i % 7),
+        )
+        data_version.bump("route_manifests")  # El commit de la ruta
+        columnar_store.routes_committed([route])
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert first.kpis(START, END, END) == before  # La instantánea publicada no cambió
+    assert columnar_store._snapshot.kpis(START, END, END)["total_routes"] > before["total_routes"]
+    columnar_store.invalidate()
@@ -0,0 +1,121 @@
+"""Un reporte lento no debe frenar /health ni los check-ins (la BD corre fuera del event loop)."""
+
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.api.v1 import reports
+from app.database import get_read_db
+
+SLOW_SECONDS = 1.0
+
+
+def test_slow_report_does_not_block_other_requests(client, auth_headers, fleet, monkeypatch):
+    original = reports._kpis_report
+
+    def slow_kpis(*args, **kwargs):
+        time.sleep(SLOW_SECONDS)  # Consulta analítica lenta (bloqueante, como la del driver)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(reports, "_kpis_report", slow_kpis)
+
+    route_id = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": fleet["drivers"][0].id, "truck_id": fleet["trucks"][0].id, "initial_full_bottles": 10
+    }).json()["route_id"]
+
+    slow = threading.Thread(target=lambda: client.get(
+        "/api/v1/reports/kpis?start_date=2020-01-01", headers=auth_headers))
+    slow.start()
+    time.sleep(0.1)  # El reporte ya está en curso
+
+    started = time.perf_counter()
+    assert client.get("/health").status_code == 200
+    health_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 10, "returned_empty_bottles": 0
+    })
+    checkin_elapsed = time.perf_counter() - started
+    assert response.status_code == 200
+
+    slow.join()
+    assert health_elapsed < SLOW_SECONDS / 2
+    assert checkin_elapsed < SLOW_SECONDS / 2
+
+
+def test_reports_read_a_query_only_snapshot(db, fleet):
+    dependency = get_read_db()
+    read_db = next(dependency)
+    try:
+        before = read_db.execute(text("SELECT COUNT(*) FROM trucks")).scalar()
+        # Un check-in confirmado a mitad del reporte no cambia lo que el reporte ve
+        db.execute(text("INSERT INTO trucks (plate, nickname, is_active) VALUES ('SNP-1', 'Snap', 1)"))
+        db.commit()
+        assert read_db.execute(text("SELECT COUNT(*) FROM trucks")).scalar() == before
+        with pytest.raises(OperationalError):
+            read_db.execute(text("DELETE FROM trucks"))
+    finally:
+        dependency.close()
+
+
+def test_latency_metrics_cover_checkins(client, auth_headers, fleet):
+    route_id = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": fleet["drivers"][0].id, "truck_id": fleet["trucks"][0].id, "initial_full_bottles": 10
+    }).json()["route_id"]
+    client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 10, "returned_empty_bottles": 0
+    })
+
+    assert client.get("/metrics/latency").status_code == 401
+    metrics = client.get("/metrics/latency", headers=auth_headers).json()
+    assert metrics["latency"]["POST /api/v1/routes/{route_id}/checkin"]["p99_ms"] > 0
+    assert set(metrics["pools"]) == {"write", "read"}
+
+
+
+def test_report_etag_uses_the_snapshot_versions(client, auth_headers, fleet, monkeypatch):
+    from app.services import data_version
+
+    original = data_version.all_versions
+
+    def pin_then_commit():
+        versions = original()
+        data_version.bump("route_manifests")  # Un commit justo después de abrir la instantánea
+        return versions
+
+    monkeypatch.setattr(data_version, "all_versions", pin_then_commit)
+    response = client.get("/api/v1/reports/kpis", headers=auth_headers)
+    monkeypatch.setattr(data_version, "all_versions", original)
+
+    # La etiqueta es la de los datos servidos (versión fijada): con la nueva ya no hay 304
+    again = client.get("/api/v1/reports/kpis", headers={**auth_headers, "If-None-Match": response.headers["etag"]})
+    assert again.status_code == 200
+    assert again.headers["etag"] != response.headers["etag"]
+
+
+def test_write_lock_held_by_another_process_does_not_block_the_event_loop(client, auth_headers, fleet):
+    import sqlite3
+
+    from app.database import engine
+
+    other = sqlite3.connect(engine.url.database, timeout=0)  # Como un comando de app.cli
+    other.execute("BEGIN IMMEDIATE")
+    checkout = threading.Thread(target=lambda: client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": fleet["drivers"][0].id, "truck_id": fleet["trucks"][0].id, "initial_full_bottles": 10
+    }))
+    try:
+        checkout.start()
+        time.sleep(0.2)  # El checkout ya espera el candado dentro de BEGIN IMMEDIATE
+
+        started = time.perf_counter()
+        assert client.get("/health").status_code == 200
+        assert time.perf_counter() - started < SLOW_SECONDS / 2
+    finally:
+        time.sleep(SLOW_SECONDS)
+        other.rollback()
+        other.close()
+        checkout.join()
@@ -0,0 +1,75 @@
+"""GET condicional: 304 con la misma versión, ETag nuevo tras escribir y nunca sin autenticar."""
+
+import pytest
+
+ENDPOINTS = ["/api/v1/clients/", "/api/v1/reports/kpis", "/api/v1/routes/"]
+
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_matching_etag_returns_304_without_body(client, auth_headers, url):
+    first = client.get(url, headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    other = client.get(url, headers={**auth_headers, "If-None-Match": '"otra"'})
+    assert other.status_code == 200 and other.headers["etag"] == etag
+
+
+def test_write_to_a_dependent_table_changes_the_etag(client, auth_headers, fleet):
+    clients = client.get("/api/v1/clients/", headers=auth_headers).headers["etag"]
+    kpis = client.get("/api/v1/reports/kpis", headers=auth_headers).headers["etag"]
+
+    response = client.post("/api/v1/clients/", headers=auth_headers, json={"name": "Nuevo"})
+    assert response.status_code == 200
+
+    after = client.get("/api/v1/clients/", headers={**auth_headers, "If-None-Match": clients})
+    assert after.status_code == 200 and after.headers["etag"] != clients
+    assert any(c["name"] == "Nuevo" for c in after.json())
+    # Los reportes no dependen de clients: siguen vigentes
+    assert client.get("/api/v1/reports/kpis", headers={**auth_headers, "If-None-Match": kpis}).status_code == 304
+
+    checkout = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": fleet["drivers"][0].id, "truck_id": fleet["trucks"][0].id, "initial_full_bottles": 10
+    })
+    assert checkout.status_code == 200
+    assert client.get("/api/v1/reports/kpis", headers={**auth_headers, "If-None-Match": kpis}).status_code == 200
+
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_unauthenticated_request_never_gets_304(client, auth_headers, url):
+    etag = client.get(url, headers=auth_headers).headers["etag"]
+
+    anonymous = client.get(url, headers={"If-None-Match": etag})
+    assert anonymous.status_code == 401
+    forged = client.get(url, headers={"Authorization": "Bearer no-es-un-token", "If-None-Match": "*"})
+    assert forged.status_code == 401
+
+
+def test_commit_from_another_process_changes_the_etag(client, auth_headers, db):
+    import sqlite3
+
+    from app.database import engine
+    from app.models.table_version import TableVersion
+
+    clients = client.get("/api/v1/clients/", headers=auth_headers).headers["etag"]
+    kpis = client.get("/api/v1/reports/kpis", headers=auth_headers).headers["etag"]
+    assert db.get(TableVersion, "clients").version >= 1  # Los commits de esta prueba ya quedaron
+
+    # Lo que deja un comando de app.cli (otro proceso: sus contadores en memoria no son estos)
+    other = sqlite3.connect(engine.url.database)
+    with other:
+        other.execute("INSERT INTO clients (name, is_active) VALUES ('Desde CLI', 1)")
+        other.execute("UPDATE table_versions SET version = version + 1 WHERE table_name = 'clients'")
+        other.execute("INSERT INTO table_versions (table_name, version) VALUES ('route_manifests', 1) "
+                      "ON CONFLICT (table_name) DO UPDATE SET version = version + 1")
+    other.close()
+
+    after = client.get("/api/v1/clients/", headers={**auth_headers, "If-None-Match": clients})
+    assert after.status_code == 200 and after.headers["etag"] != clients
+    assert any(c["name"] == "Desde CLI" for c in after.json())
+    assert client.get("/api/v1/reports/kpis", headers={**auth_headers, "If-None-Match": kpis}).status_code == 200
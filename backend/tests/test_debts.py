@@ -0,0 +1,80 @@
+"""Libro de deudas: registro en el check-in, saldos por chofer y cambios de estado."""
+
+from datetime import date, timedelta
+
+from app.config import settings
+from app.models.audit_log import AuditLog
+from app.models.debt_record import DebtRecord, DebtStatus
+from app.models.debt_balance import DriverDebtBalance
+from app.models.route_manifest import RouteManifest
+from app.services.debt_service import driver_aging, record_route_debt
+
+
+def _route_with_sales(client, auth_headers, fleet, quantity=10):
+    driver, truck = fleet["drivers"][0], fleet["trucks"][0]
+    route_id = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": driver.id, "truck_id": truck.id, "initial_full_bottles": quantity
+    }).json()["route_id"]
+    response = client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 0, "returned_empty_bottles": quantity,
+        "sales": [{"client_id": fleet["clients"][0].id, "quantity": quantity}],
+    })
+    assert response.status_code == 200, response.text
+    return route_id
+
+
+def test_checkin_records_debt_and_driver_balance(client, auth_headers, fleet, db):
+    route_id = _route_with_sales(client, auth_headers, fleet)
+    driver = fleet["drivers"][0]
+    owed = 10 * settings.BOTTLE_PRICE
+
+    record = db.query(DebtRecord).filter(DebtRecord.route_manifest_id == route_id).one()
+    assert record.status == DebtStatus.PENDING
+    assert record.driver_id == driver.id
+    assert record.amount == owed
+
+    balance = client.get(f"/api/v1/debts/balances/{driver.id}", headers=auth_headers).json()
+    assert balance["balance"] == owed and balance["open_records"] == 1
+    aging = client.get("/api/v1/debts/aging", headers=auth_headers).json()["aging"]
+    assert aging[0]["0_30"] == owed
+
+    # Reintento del check-in con otro monto: se ajusta, no se duplica
+    route = db.get(RouteManifest, route_id)
+    route.debt_amount = owed / 2
+    record_route_debt(db, route)
+    db.commit()
+    assert db.query(DebtRecord).filter(DebtRecord.route_manifest_id == route_id).count() == 1
+    assert db.get(DriverDebtBalance, driver.id).pending_amount == owed / 2
+
+
+def test_status_change_updates_balance_and_audit(client, auth_headers, fleet, db):
+    route_id = _route_with_sales(client, auth_headers, fleet)
+    driver = fleet["drivers"][0]
+    debt_id = db.query(DebtRecord.id).filter(DebtRecord.route_manifest_id == route_id).scalar()
+
+    response = client.post(f"/api/v1/debts/{debt_id}/status", headers=auth_headers,
+                           json={"status": "DISPUTED", "notes": "No reconoce la venta"})
+    assert response.status_code == 200, response.text
+    balance = client.get(f"/api/v1/debts/balances/{driver.id}", headers=auth_headers).json()
+    assert balance["pending_amount"] == 0 and balance["disputed_amount"] > 0
+
+    response = client.post(f"/api/v1/debts/{debt_id}/status", headers=auth_headers, json={"status": "PAID"})
+    assert response.json()["resolved_by_user_id"] == fleet["admin"].id
+    assert client.get(f"/api/v1/debts/balances/{driver.id}", headers=auth_headers).json()["balance"] == 0
+    assert client.get("/api/v1/debts/balances", headers=auth_headers).json()["balances"] == []
+
+    # Una deuda cerrada no se reabre
+    response = client.post(f"/api/v1/debts/{debt_id}/status", headers=auth_headers, json={"status": "PENDING"})
+    assert response.status_code == 409
+
+    actions = [a for (a,) in db.query(AuditLog.action).filter(AuditLog.entity_type == "DebtRecord")]
+    assert sorted(actions) == ["DEBT_DISPUTED", "DEBT_PAID"]
+
+
+def test_aging_buckets_by_route_date(client, auth_headers, fleet, db):
+    route_id = _route_with_sales(client, auth_headers, fleet)
+    route = db.get(RouteManifest, route_id)
+    today = route.date + timedelta(days=45)
+    row = driver_aging(db, today)[0]
+    assert row["0_30"] == 0 and row["31_60"] == route.debt_amount
+    assert driver_aging(db, route.date + timedelta(days=120))[0]["90_plus"] == route.debt_amount
@@ -0,0 +1,101 @@
+"""Exportaciones CSV/NDJSON: filas del rango, encabezados y envío por lotes."""
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from app.api.v1 import exports
+from app.config import settings
+from app.models.route_manifest import RouteManifest, AuditStatus
+from app.models.sales_detail import SalesDetail
+
+START, END = date(2024, 3, 1), date(2024, 3, 31)
+
+
+@pytest.fixture
+def routes(db, fleet, monkeypatch):
+    """25 rutas en marzo (una venta cada una) y 3 fuera del rango"""
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 10)
+    drivers, trucks, tienda = fleet["drivers"], fleet["trucks"], fleet["clients"][0]
+    in_range = []
+    for i in range(28):
+        route = RouteManifest(
+            driver_id=drivers[i % 2].id, truck_id=trucks[i % 2].id,
+            date=START + timedelta(days=i) if i < 25 else END + timedelta(days=i),
+            initial_full_bottles=10 + i, audit_status=AuditStatus.CLOSED, debt_amount=0.0,
+        )
+        db.add(route)
+        db.flush()
+        db.add(SalesDetail(route_id=route.id, client_id=tienda.id, quantity=i + 1,
+                           unit_price=40.0, subtotal=40.0 * (i + 1)))
+        if i < 25:
+            in_range.append(route.id)
+    db.commit()
+    return in_range
+
+
+def _params(fmt):
+    return {"start_date": START.isoformat(), "end_date": END.isoformat(), "format": fmt}
+
+
+def test_csv_export_has_header_and_only_rows_in_range(client, auth_headers, routes):
+    response = client.get("/api/v1/exports/routes", headers=auth_headers, params=_params("csv"))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="rutas_2024-03-01_2024-03-31.csv"'
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0][:4] == ["route_id", "date", "driver_id", "driver_name"]
+    assert [int(row[0]) for row in rows[1:]] == routes
+    assert {row[rows[0].index("audit_status")] for row in rows[1:]} == {"CLOSED"}
+
+
+def test_ndjson_sales_export(client, auth_headers, fleet, routes):
+    response = client.get("/api/v1/exports/sales", headers=auth_headers, params=_params("ndjson"))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"].endswith('ventas_2024-03-01_2024-03-31.ndjson"')
+
+    sales = [json.loads(line) for line in response.text.splitlines()]
+    assert [sale["route_id"] for sale in sales] == routes
+    assert sales[0]["client_name"] == fleet["clients"][0].name
+    assert sales[0]["date"] == "2024-03-01" and sales[-1]["subtotal"] == 40.0 * 25
+
+
+@pytest.mark.parametrize("fmt", list(exports.ExportFormat))
+def test_rows_are_streamed_in_batches(routes, fmt):
+    chunks = list(exports._stream_rows(exports._routes_statement(START, END), fmt))
+    if fmt == exports.ExportFormat.csv:
+        header, *chunks = chunks
+        assert header.startswith("route_id,")
+    # Un chunk por lote de EXPORT_BATCH_SIZE filas: 10 + 10 + 5
+    assert [chunk.count("\n") for chunk in chunks] == [10, 10, 5]
+
+
+def test_export_requires_authentication(client, routes):
+    assert client.get("/api/v1/exports/routes", params=_params("csv")).status_code == 401
+
+
+def test_exports_and_local_federation_read_from_the_read_engine(routes):
+    from sqlalchemy import event
+
+    from app.database import read_engine
+    from app.services.federation import federation
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(read_engine, "before_cursor_execute", capture)
+    try:
+        list(exports._stream_rows(exports._routes_statement(START, END), exports.ExportFormat.csv))
+    finally:
+        event.remove(read_engine, "before_cursor_execute", capture)
+    assert any("FROM route_manifests" in statement for statement in statements)
+
+    local = federation.plants()[0]
+    assert local.session_factory.kw["bind"] is read_engine
@@ -0,0 +1,95 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.user import User, UserRole
+from app.models.truck import Truck
+from app.models.route_manifest import AuditStatus
+from app.models.daily_rollup import DailyStatusRollup, DailyTruckRollup, DailyDriverRollup
+from app.services.federation import federation, parse_plants, FederationConfigError
+
+DAY = date(2024, 3, 4)
+
+
+def _seed(session, driver, truck, ok_routes, debt_routes, debt):
+    """Acumulados de un día: `ok_routes` completas y `debt_routes` con deuda"""
+    session.add_all([
+        DailyStatusRollup(date=DAY, audit_status=AuditStatus.CLOSED, route_count=ok_routes,
+                          full_bottles=10 * ok_routes, total_bottles=10 * ok_routes,
+                          debt_amount=0, positive_debt_amount=0),
+        DailyStatusRollup(date=DAY, audit_status=AuditStatus.DEBT, route_count=debt_routes,
+                          full_bottles=10 * debt_routes, total_bottles=10 * debt_routes,
+                          debt_amount=debt, positive_debt_amount=debt),
+        DailyTruckRollup(date=DAY, truck_id=truck.id, route_count=ok_routes + debt_routes,
+                         problematic_routes=debt_routes, debt_amount=debt,
+                         full_bottles=10 * (ok_routes + debt_routes)),
+        DailyDriverRollup(date=DAY, driver_id=driver.id, route_count=ok_routes + debt_routes,
+                          problematic_routes=debt_routes, debt_amount=debt,
+                          full_bottles=10 * (ok_routes + debt_routes)),
+    ])
+    session.commit()
+
+
+@pytest.fixture
+def north_plant(tmp_path):
+    """Segunda planta en su propio archivo"""
+    url = f"sqlite:///{tmp_path}/norte.db"
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    driver = User(username="norte", full_name="Chofer Norte", hashed_password="x",
+                  role=UserRole.CHOFER, is_active=True)
+    truck = Truck(plate="NTE-1", nickname="Norteña", is_active=True)
+    session.add_all([driver, truck])
+    session.commit()
+    _seed(session, driver, truck, ok_routes=1, debt_routes=3, debt=120.0)
+    session.close()
+    engine.dispose()
+
+    federation.reset()
+    federation.register(2, "Planta Norte", url)
+    yield
+    federation.reset()
+
+
+def test_federated_reports_merge_counts_across_plants(client, db, fleet, auth_headers, north_plant):
+    _seed(db, fleet["drivers"][0], fleet["trucks"][0], ok_routes=6, debt_routes=0, debt=0.0)
+    params = {"start_date": DAY.isoformat(), "end_date": DAY.isoformat()}
+
+    kpis = client.get("/api/v1/reports/federated/kpis", params=params, headers=auth_headers).json()
+    assert kpis["total_routes"] == 10
+    assert kpis["problematic_routes"] == 3
+    assert kpis["total_debt"] == 120.0
+    # 7 de 10 rutas sin deuda; el promedio de porcentajes (100 y 25) daría 62.5
+    assert kpis["success_rate"] == 70.0
+    assert [p["ok"] for p in kpis["plants"]] == [True, True]
+
+    trucks = client.get("/api/v1/reports/federated/trucks/performance", params=params, headers=auth_headers).json()
+    assert [(t["plant_id"], t["total_routes"]) for t in trucks["trucks"]] == [(1, 6), (2, 4)]
+
+    drivers = client.get(
+        "/api/v1/reports/federated/drivers/performance", params={**params, "limit": 1}, headers=auth_headers
+    ).json()
+    assert [d["full_name"] for d in drivers["drivers"]] == ["Chofer 0"]
+
+
+def test_missing_plant_is_reported_not_fatal(client, auth_headers, tmp_path):
+    federation.reset()
+    federation.register(3, "Planta Sur", f"sqlite:///{tmp_path}/no_existe.db")
+    try:
+        kpis = client.get("/api/v1/reports/federated/kpis", headers=auth_headers).json()
+    finally:
+        federation.reset()
+    assert [(p["plant_id"], p["ok"]) for p in kpis["plants"]] == [(1, True), (3, False)]
+
+
+def test_parse_plants():
+    assert parse_plants(["2:Planta Norte:sqlite:///./data/norte.db"]) == [
+        (2, "Planta Norte", "sqlite:///./data/norte.db")
+    ]
+    with pytest.raises(FederationConfigError):
+        parse_plants(["Planta Norte"])
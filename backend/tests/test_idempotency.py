@@ -0,0 +1,72 @@
+"""Idempotency-Key: reintentos de checkout y check-in no repiten escrituras."""
+
+import threading
+
+from app.models.route_manifest import RouteManifest
+from app.models.sales_detail import SalesDetail
+
+
+def _checkout(client, headers, fleet, key, load=100):
+    return client.post("/api/v1/routes/checkout", headers={**headers, "Idempotency-Key": key}, json={
+        "driver_id": fleet["drivers"][0].id, "truck_id": fleet["trucks"][0].id, "initial_full_bottles": load
+    })
+
+
+def test_retried_checkout_replays_stored_response(client, auth_headers, fleet, db):
+    first = _checkout(client, auth_headers, fleet, "k-1")
+    retry = _checkout(client, auth_headers, fleet, "k-1")
+
+    assert retry.status_code == first.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["x-db-commits"] == "0"
+    assert db.query(RouteManifest).count() == 1
+
+
+def test_key_reused_with_other_body_is_rejected(client, auth_headers, fleet):
+    _checkout(client, auth_headers, fleet, "k-2")
+    assert _checkout(client, auth_headers, fleet, "k-2", load=50).status_code == 422
+
+
+def test_concurrent_checkin_duplicates_run_once(client, auth_headers, fleet, db):
+    route_id = _checkout(client, auth_headers, fleet, "k-3").json()["route_id"]
+    payload = {"returned_full_bottles": 90, "returned_empty_bottles": 0,
+               "sales": [{"client_id": fleet["clients"][0].id, "quantity": 10}]}
+    headers = {**auth_headers, "Idempotency-Key": "k-4"}
+
+    responses = []
+    threads = [
+        threading.Thread(target=lambda: responses.append(
+            client.post(f"/api/v1/routes/{route_id}/checkin", headers=headers, json=payload)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 3
+    assert db.query(SalesDetail).count() == 1
+
+
+def test_replays_and_rejections_carry_cors_and_original_headers(client, auth_headers, fleet):
+    headers = {**auth_headers, "Origin": "http://localhost:3000"}
+    first = _checkout(client, headers, fleet, "k-cors")
+    retry = _checkout(client, headers, fleet, "k-cors")
+
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["access-control-allow-origin"]
+    assert retry.headers["content-type"] == first.headers["content-type"]
+    assert retry.json() == first.json()
+
+    rejected = _checkout(client, headers, fleet, "k-cors", load=50)
+    assert rejected.status_code == 422
+    assert rejected.headers["access-control-allow-origin"]
+
+    # Headers propios del endpoint (Server-Timing del check-in) también se reproducen
+    checkin = {"returned_full_bottles": 100, "returned_empty_bottles": 0, "sales": []}
+    url = f"/api/v1/routes/{first.json()['route_id']}/checkin"
+    original = client.post(url, headers={**headers, "Idempotency-Key": "k-cors-in"}, json=checkin)
+    replayed = client.post(url, headers={**headers, "Idempotency-Key": "k-cors-in"}, json=checkin)
+    assert replayed.headers["server-timing"] == original.headers["server-timing"]
@@ -0,0 +1,74 @@
+"""Motor de KPIs: las mismas cifras que las consultas por separado que reemplazó."""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app.models.route_manifest import RouteManifest, AuditStatus
+from app.services.columnar_store import columnar_store
+from app.services.kpi_service import compute_kpis
+from app.services.rollup_service import rebuild_rollups
+
+TODAY = date.today()
+
+
+def _legacy_kpis(db, start_date, end_date):
+    """Una consulta por cifra sobre route_manifests, como antes del motor"""
+    in_range = (RouteManifest.date >= start_date, RouteManifest.date <= end_date)
+    total_routes = db.query(RouteManifest).filter(*in_range).count()
+    problematic_routes = db.query(RouteManifest).filter(
+        *in_range, RouteManifest.audit_status == AuditStatus.DEBT
+    ).count()
+    total_bottles = db.query(
+        func.sum(RouteManifest.initial_full_bottles + RouteManifest.initial_empty_bottles)
+    ).filter(*in_range).scalar() or 0
+    total_debt = db.query(func.sum(RouteManifest.debt_amount)).filter(
+        *in_range, RouteManifest.debt_amount > 0
+    ).scalar() or 0
+    success_rate = ((total_routes - problematic_routes) / total_routes * 100) if total_routes > 0 else 100
+    return {
+        "total_routes": total_routes,
+        "problematic_routes": problematic_routes,
+        "total_bottles": int(total_bottles),
+        "total_debt": round(float(total_debt), 2),
+        "success_rate": round(success_rate, 2),
+        "today_routes": db.query(RouteManifest).filter(RouteManifest.date == TODAY).count(),
+        "active_routes": db.query(RouteManifest).filter(
+            RouteManifest.audit_status == AuditStatus.IN_PROGRESS
+        ).count(),
+        "distribution": {
+            status.value: db.query(RouteManifest).filter(*in_range, RouteManifest.audit_status == status).count()
+            for status in AuditStatus
+        },
+    }
+
+
+@pytest.fixture
+def history(db, fleet):
+    """Rutas de 60 días en todos los estados, con deudas positivas, negativas y nulas"""
+    drivers, trucks = fleet["drivers"], fleet["trucks"]
+    statuses = list(AuditStatus)
+    for i in range(90):
+        db.add(RouteManifest(
+            driver_id=drivers[i % 2].id,
+            truck_id=trucks[i % 2].id,
+            date=TODAY - timedelta(days=i % 60),
+            initial_full_bottles=20 + i % 7,
+            initial_empty_bottles=i % 5,
+            audit_status=statuses[i % len(statuses)],
+            debt_amount=[12.5, -3.0, 0.0, None, 40.25][i % 5],
+        ))
+    db.commit()
+    rebuild_rollups(db)
+
+
+@pytest.mark.parametrize("columnar", [True, False], ids=["columnar", "rollups"])
+@pytest.mark.parametrize("days_back", [0, 7, 30, 90])
+def test_compute_kpis_matches_per_query_results(db, history, monkeypatch, columnar, days_back):
+    monkeypatch.setattr(columnar_store, "enabled", columnar)
+    start_date = TODAY - timedelta(days=days_back)
+
+    kpis = compute_kpis(db, start_date, TODAY)
+    kpis["total_debt"] = round(kpis["total_debt"], 2)
+    assert kpis == _legacy_kpis(db, start_date, TODAY)
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+from app.models.daily_rollup import DailyTruckRollup
+from app.services.maintenance import MaintenanceScheduler, in_window, parse_clock
+from app.services.rollup_service import check_rollups, rebuild_rollups
+
+
+def _scheduler(**overrides):
+    options = dict(window_start="03:00", window_end="05:00", budget_seconds=30, poll_seconds=60,
+                   wal_max_mb=64, vacuum_pages=100, analysis_limit=100, repair_rollups=False)
+    options.update(overrides)
+    return MaintenanceScheduler(**options)
+
+
+def _checked_in_route(client, auth_headers, fleet):
+    route_id = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": fleet["drivers"][0].id, "truck_id": fleet["trucks"][0].id, "initial_full_bottles": 10
+    }).json()["route_id"]
+    client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 4, "returned_empty_bottles": 6
+    })
+
+
+def test_nightly_runs_every_job_once_inside_the_window(client, auth_headers, fleet):
+    _checked_in_route(client, auth_headers, fleet)
+    scheduler = _scheduler()
+
+    scheduler.tick(datetime(2024, 3, 4, 12, 0))
+    assert scheduler.jobs == {}
+
+    scheduler.tick(datetime(2024, 3, 4, 3, 30))
+    jobs = scheduler.jobs
+    assert set(jobs) == {"audit_archive", "analyze", "optimize", "incremental_vacuum",
+                         "wal_checkpoint", "rollup_consistency"}
+    assert jobs["analyze"]["status"] == "ok"
+    assert jobs["rollup_consistency"]["status"] == "ok"
+    assert all("duration_ms" in job for job in jobs.values())
+
+    first_run = jobs["analyze"]["started_at"]
+    scheduler.tick(datetime(2024, 3, 4, 4, 0))  # Ya corrió hoy
+    assert scheduler.jobs["analyze"]["started_at"] == first_run
+    assert client.get("/maintenance/status").status_code == 401
+    assert client.get("/maintenance/status", headers=auth_headers).status_code == 200
+
+
+def test_rollup_drift_is_reported_and_optionally_repaired(client, auth_headers, fleet, db):
+    _checked_in_route(client, auth_headers, fleet)
+    db.query(DailyTruckRollup).update({DailyTruckRollup.route_count: 99})
+    db.commit()
+
+    assert _scheduler().run_nightly()["jobs"]["rollup_consistency"]["status"] == "mismatch"
+
+    repaired = _scheduler(repair_rollups=True).run_nightly()["jobs"]["rollup_consistency"]
+    assert repaired["status"] == "repaired"
+    db.expire_all()
+    assert db.query(DailyTruckRollup.route_count).scalar() == 1
+
+
+def test_rollup_repair_is_skipped_when_the_check_spent_the_budget(client, auth_headers, fleet, db, monkeypatch):
+    import time
+
+    from app.services import maintenance
+
+    _checked_in_route(client, auth_headers, fleet)
+    db.query(DailyTruckRollup).update({DailyTruckRollup.route_count: 99})
+    db.commit()
+    deadline = time.monotonic() + 0.2
+
+    def slow_check(session):
+        time.sleep(0.3)  # La revisión se come el presupuesto
+        return check_rollups(session)
+
+    monkeypatch.setattr(maintenance, "check_rollups", slow_check)
+    scheduler = _scheduler(repair_rollups=True)
+    result = scheduler.run_job("rollup_consistency", scheduler._rollup_consistency, deadline)
+    assert result["status"] == "mismatch" and "presupuesto" in result["reason"]
+    db.expire_all()
+    assert db.query(DailyTruckRollup.route_count).scalar() == 99
+
+
+def test_exhausted_budget_skips_remaining_jobs(db):
+    rebuild_rollups(db)
+    jobs = _scheduler(budget_seconds=0).run_nightly()["jobs"]
+    assert {job["status"] for job in jobs.values()} == {"skipped"}
+
+
+def test_window_can_cross_midnight():
+    start, end = parse_clock("23:00"), parse_clock("02:00")
+    assert in_window(parse_clock("23:30"), start, end)
+    assert in_window(parse_clock("01:00"), start, end)
+    assert not in_window(parse_clock("12:00"), start, end)
+
+
+def test_budget_exhausted_mid_job_is_reported_as_timeout(db, fleet):
+    import time
+
+    from sqlalchemy import insert
+
+    from app.models.audit_log import AuditLog
+
+    db.execute(insert(AuditLog), [
+        {"timestamp": datetime(2024, 3, 4), "user_id": fleet["admin"].id, "action": "X",
+         "entity_type": "RouteManifest", "entity_id": i}
+        for i in range(5000)
+    ])
+    db.commit()
+
+    # El plazo ya venció al empezar: la sentencia se interrumpe en el primer chequeo del progress handler
+    scheduler = _scheduler(analysis_limit=0)
+    result = scheduler.run_job("analyze", scheduler._analyze, time.monotonic())
+    assert result["status"] == "timeout"
@@ -0,0 +1,42 @@
+"""Migraciones sobre una base creada antes de los acumulados (solo las tablas originales)."""
+
+import os
+from datetime import date
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from app.config import settings
+from app.database import Base
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_TABLES = ["users", "trucks", "clients", "route_manifests", "sales_details", "audit_logs", "debt_records"]
+
+
+def test_upgrade_from_baseline_creates_and_backfills_rollups(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in BASELINE_TABLES])
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, full_name, hashed_password, role, is_active) "
+                          "VALUES (1, 'chofer', 'Chofer', 'x', 'CHOFER', 1)"))
+        conn.execute(text("INSERT INTO trucks (id, plate, nickname, is_active) VALUES (1, 'P-1', 'Unidad', 1)"))
+        conn.execute(text(
+            "INSERT INTO route_manifests (driver_id, truck_id, date, initial_full_bottles, initial_empty_bottles, "
+            "audit_status, debt_amount) VALUES (1, 1, :day, 5, 0, 'CLOSED', 0)"
+        ), {"day": date(2024, 1, 2)})
+
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    config = Config(os.path.join(BACKEND, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND, "alembic"))
+    command.upgrade(config, "head")
+
+    tables = set(inspect(engine).get_table_names())
+    assert {"daily_status_rollups", "daily_truck_rollups", "daily_driver_rollups"} <= tables
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT route_count FROM daily_truck_rollups")).scalar() == 1
+
+    command.downgrade(config, "base")
+    assert "daily_truck_rollups" not in inspect(engine).get_table_names()
+    engine.dispose()
@@ -0,0 +1,81 @@
+"""Pool de contraseñas: bcrypt fuera del servidor, acotado y con rechazo cuando se llena."""
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from app.services.password_pool import PasswordPool, PasswordPoolBusy
+
+
+def test_login_verifies_through_pool(client, fleet, db):
+    from app.utils.security import get_password_hash
+
+    admin = fleet["admin"]
+    admin.hashed_password = get_password_hash("secreto")
+    db.commit()
+
+    ok = client.post("/api/v1/auth/login", data={"username": "admin", "password": "secreto"})
+    bad = client.post("/api/v1/auth/login", data={"username": "admin", "password": "otro"})
+    assert ok.status_code == 200 and ok.json()["access_token"]
+    assert bad.status_code == 401
+
+
+def test_full_pool_rejects_new_work():
+    pool = PasswordPool(workers=1, max_pending=0, rounds=12, timeout=30)
+    try:
+        hashed = pool.hash("secreto")
+        started, outcomes = threading.Barrier(3), []
+
+        def attempt():
+            started.wait()
+            try:
+                outcomes.append(pool.verify("secreto", hashed))
+            except PasswordPoolBusy:
+                outcomes.append("busy")
+
+        threads = [threading.Thread(target=attempt) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert True in outcomes
+        assert "busy" in outcomes
+        assert pool.rejected == outcomes.count("busy")
+    finally:
+        pool.shutdown()
+
+
+def test_rounds_are_configurable():
+    pool = PasswordPool(workers=0, max_pending=0, rounds=5, timeout=5)
+    hashed = pool.hash("x")
+    assert hashed.startswith("$2b$05$")
+    assert pool.verify("x", hashed)
+
+
+def test_timeout_is_busy_and_keeps_the_slot_until_the_job_ends():
+    pool = PasswordPool(workers=1, max_pending=0, rounds=12, timeout=0.01)
+    try:
+        with pytest.raises(PasswordPoolBusy):
+            pool.hash("secreto")
+        # El trabajo abandonado sigue en el proceso: no hay lugar para otro
+        with pytest.raises(PasswordPoolBusy):
+            pool.hash("otro")
+        assert pool.rejected == 2
+
+        assert pool._slots.acquire(timeout=30)  # Se libera al terminar el trabajo
+        pool._slots.release()
+    finally:
+        pool.shutdown()
+
+
+def test_worker_module_loads_without_the_app_stack():
+    # Lo mismo que importa un proceso hijo del pool (spawn) para ejecutar un trabajo
+    code = ("import sys, app.utils.password_worker; "
+            "print(','.join(sorted(m for m in sys.modules if m.startswith(('app', 'sqlalchemy', 'fastapi')))))")
+    loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.split()
+    assert loaded == ["app,app.utils,app.utils.password_worker"]  # Ni engines, ni modelos, ni FastAPI
@@ -0,0 +1,133 @@
+"""Corrida de nómina: deducción por bloques, bitácora, reanudación y estado de cuenta."""
+
+import csv
+from datetime import date
+
+import pytest
+
+from app.config import settings
+from app.models.audit_log import AuditLog
+from app.models.debt_balance import DriverDebtBalance
+from app.models.debt_record import DebtRecord, DebtStatus
+from app.models.payroll_run import PayrollRun, PayrollRunStatus
+from app.models.route_manifest import RouteManifest
+from app.services import payroll_service
+
+
+@pytest.fixture
+def debts(client, auth_headers, fleet, db, tmp_path, monkeypatch):
+    """Una deuda por chofer y ruta (3 rutas por chofer)"""
+    monkeypatch.setattr(settings, "PAYROLL_STATEMENT_DIR", str(tmp_path))
+    for driver, truck in zip(fleet["drivers"], fleet["trucks"]):
+        for _ in range(3):
+            route_id = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+                "driver_id": driver.id, "truck_id": truck.id, "initial_full_bottles": 5
+            }).json()["route_id"]
+            client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+                "returned_full_bottles": 0, "returned_empty_bottles": 5,
+                "sales": [{"client_id": fleet["clients"][0].id, "quantity": 5}],
+            })
+    return db.query(DebtRecord).all()
+
+
+def _period(db):
+    day = db.query(RouteManifest.date).first()[0]
+    return day, day
+
+
+def test_run_deducts_every_pending_debt_with_audit_and_statement(client, auth_headers, fleet, db, debts):
+    start, end = _period(db)
+    response = client.post("/api/v1/payroll/runs", headers=auth_headers, json={
+        "period_start": start.isoformat(), "period_end": end.isoformat()
+    })
+    assert response.status_code == 202, response.text
+    assert response.json()["status"] == "RUNNING"
+    # TestClient espera las tareas en segundo plano antes de regresar
+    result = client.get(f"/api/v1/payroll/runs/{response.json()['id']}", headers=auth_headers).json()
+    assert result["status"] == "COMPLETED"
+    assert result["deducted_records"] == len(debts)
+
+    db.expire_all()
+    assert {d.status for d in db.query(DebtRecord)} == {DebtStatus.DEDUCTED}
+    assert db.query(AuditLog).filter(AuditLog.action == "DEBT_DEDUCTED").count() == len(debts)
+    assert all(b.open_records == 0 and b.pending_amount == 0 for b in db.query(DriverDebtBalance))
+
+    statement = client.get(f"/api/v1/payroll/runs/{result['id']}/statement", headers=auth_headers)
+    rows = list(csv.DictReader(statement.text.splitlines()))
+    totals = [row for row in rows if row["line"] == "TOTAL"]
+    assert len(totals) == len(fleet["drivers"])
+    assert sum(float(row["amount"]) for row in totals) == result["deducted_amount"]
+
+    # Repetir el periodo no vuelve a deducir
+    again = client.post("/api/v1/payroll/runs", headers=auth_headers, json={
+        "period_start": start.isoformat(), "period_end": end.isoformat()
+    })
+    assert again.status_code == 200 and again.json() == result
+    assert db.query(AuditLog).filter(AuditLog.action == "DEBT_DEDUCTED").count() == len(debts)
+
+
+def test_late_debt_reopens_the_completed_run(client, auth_headers, fleet, db, debts):
+    start, end = _period(db)
+    period = {"period_start": start.isoformat(), "period_end": end.isoformat()}
+    run_id = client.post("/api/v1/payroll/runs", headers=auth_headers, json=period).json()["id"]
+    first = client.get(f"/api/v1/payroll/runs/{run_id}", headers=auth_headers).json()
+
+    # Check-in tardío de una ruta del mismo periodo
+    driver, truck = fleet["drivers"][0], fleet["trucks"][0]
+    route_id = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+        "driver_id": driver.id, "truck_id": truck.id, "initial_full_bottles": 2
+    }).json()["route_id"]
+    client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 0, "returned_empty_bottles": 2,
+        "sales": [{"client_id": fleet["clients"][0].id, "quantity": 2}],
+    })
+    late = db.query(DebtRecord).filter(DebtRecord.route_manifest_id == route_id).one()
+
+    response = client.post("/api/v1/payroll/runs", headers=auth_headers, json=period)
+    assert response.status_code == 202 and response.json()["id"] == run_id
+    result = client.get(f"/api/v1/payroll/runs/{run_id}", headers=auth_headers).json()
+    assert result["status"] == "COMPLETED"
+    assert result["deducted_records"] == first["deducted_records"] + 1
+    assert result["deducted_amount"] == round(first["deducted_amount"] + late.amount, 2)
+
+    db.expire_all()
+    assert db.get(DebtRecord, late.id).status == DebtStatus.DEDUCTED
+    assert db.query(AuditLog).filter(AuditLog.action == "PAYROLL_RUN_REOPENED").count() == 1
+    statement = client.get(f"/api/v1/payroll/runs/{run_id}/statement", headers=auth_headers)
+    assert str(late.id) in {row["debt_id"] for row in csv.DictReader(statement.text.splitlines())}
+
+
+def test_interrupted_run_resumes_from_cursor(fleet, db, debts, monkeypatch):
+    start, end = _period(db)
+    original = payroll_service._deduct_chunk
+    calls = []
+
+    def crash_on_second_chunk(session, run, chunk_size):
+        calls.append(run.id)
+        if len(calls) == 2:
+            raise RuntimeError("Se cayó el proceso")
+        return original(session, run, chunk_size)
+
+    monkeypatch.setattr(payroll_service, "_deduct_chunk", crash_on_second_chunk)
+    with pytest.raises(RuntimeError):
+        payroll_service.run_payroll(start, end, fleet["admin"].id, chunk_size=2)
+
+    db.expire_all()
+    run = db.query(PayrollRun).one()
+    assert run.status == PayrollRunStatus.RUNNING and run.deducted_records == 2
+
+    monkeypatch.setattr(payroll_service, "_deduct_chunk", original)
+    result = payroll_service.run_payroll(start, end, fleet["admin"].id, chunk_size=2)
+    assert result["id"] == run.id
+    assert result["deducted_records"] == len(debts)
+    assert db.query(AuditLog).filter(AuditLog.action == "DEBT_DEDUCTED").count() == len(debts)
+
+
+def test_payroll_run_requires_admin(client, fleet, db):
+    from app.utils.security import create_access_token
+
+    token = create_access_token({"sub": fleet["drivers"][0].username})
+    response = client.post("/api/v1/payroll/runs", headers={"Authorization": f"Bearer {token}"}, json={
+        "period_start": date.today().isoformat(), "period_end": date.today().isoformat()
+    })
+    assert response.status_code == 403
@@ -0,0 +1,123 @@
+"""
+Regresión de planes de consulta.
+
+Ejecuta los endpoints de reportes y rutas, captura cada sentencia SQL que
+emiten y corre EXPLAIN QUERY PLAN sobre ella. Falla si alguna recorre
+completa una tabla de hechos (SCAN) en lugar de usar un índice (SEARCH).
+"""
+
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine, read_engine
+from app.services.columnar_store import columnar_store
+
+# Tablas que crecen con la operación; las de catálogo (users, trucks, clients) pueden escanearse
+FACT_TABLES = {
+    "route_manifests",
+    "sales_details",
+    "audit_logs",
+    "debt_records",
+    "daily_status_rollups",
+    "daily_truck_rollups",
+    "daily_driver_rollups",
+}
+
+REPORT_ENDPOINTS = [
+    "/api/v1/reports/kpis",
+    "/api/v1/reports/trends/daily",
+    "/api/v1/reports/trucks/performance",
+    "/api/v1/reports/drivers/performance",
+    "/api/v1/reports/status/distribution",
+    "/api/v1/reports/monthly/summary",
+    "/api/v1/reports/dashboard?fields=kpis,trends,distribution,today_routes,trucks,drivers,monthly",
+]
+
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+# Consultas que recorren la tabla completa a propósito (p. ej. la carga del almacén columnar)
+_INTENTIONAL_SCAN = "/* full-scan:"
+
+
+@pytest.fixture
+def captured_sql():
+    """Sentencias SELECT/UPDATE/DELETE emitidas durante la prueba (ambos engines)"""
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(" ", 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            params = parameters[0] if executemany else parameters
+            statements.append((statement, params))
+
+    for bound in {engine, read_engine}:
+        event.listen(bound, "before_cursor_execute", _capture)
+    yield statements
+    for bound in {engine, read_engine}:
+        event.remove(bound, "before_cursor_execute", _capture)
+
+
+def full_scans(statements):
+    """[(tabla, sql)] de cada SCAN sobre una tabla de hechos"""
+    offenders = []
+    with engine.connect() as conn:
+        raw = conn.connection.dbapi_connection
+        for statement, params in statements:
+            if _INTENTIONAL_SCAN in statement:
+                continue
+            for row in raw.execute(f"EXPLAIN QUERY PLAN {statement}", params or ()).fetchall():
+                match = _SCAN.match(row[-1])
+                if match and match.group(1) in FACT_TABLES:
+                    offenders.append((match.group(1), statement))
+    return offenders
+
+
+def _run_route_flow(client, auth_headers, fleet):
+    drivers, trucks, clients = fleet["drivers"], fleet["trucks"], fleet["clients"]
+    route_ids = []
+    for driver, truck in zip(drivers, trucks):
+        response = client.post("/api/v1/routes/checkout", headers=auth_headers, json={
+            "driver_id": driver.id, "truck_id": truck.id, "initial_full_bottles": 100
+        })
+        assert response.status_code == 200
+        route_ids.append(response.json()["route_id"])
+
+    response = client.post(f"/api/v1/routes/{route_ids[0]}/checkin", headers=auth_headers, json={
+        "returned_full_bottles": 40,
+        "returned_empty_bottles": 60,
+        "sales": [
+            {"client_id": clients[0].id, "quantity": 30},
+            {"client_id": clients[1].id, "quantity": 30},
+        ],
+    })
+    assert response.status_code == 200
+
+    for url in (
+        "/api/v1/routes/",
+        f"/api/v1/routes/?truck_id={trucks[0].id}&include_sales=true&limit=1",
+        f"/api/v1/routes/?driver_id={drivers[1].id}&status=IN_PROGRESS",
+    ):
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200, url
+
+
+def test_route_queries_use_indexes(client, auth_headers, fleet, captured_sql):
+    _run_route_flow(client, auth_headers, fleet)
+
+    assert captured_sql, "no se capturó ninguna consulta"
+    assert full_scans(captured_sql) == []
+
+
+@pytest.mark.parametrize("columnar", [True, False], ids=["columnar", "rollups"])
+def test_report_queries_use_indexes(client, auth_headers, fleet, captured_sql, monkeypatch, columnar):
+    monkeypatch.setattr(columnar_store, "enabled", columnar)
+    _run_route_flow(client, auth_headers, fleet)
+    captured_sql.clear()
+
+    for url in REPORT_ENDPOINTS:
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200, url
+
+    assert captured_sql, "no se capturó ninguna consulta"
+    assert full_scans(captured_sql) == []
@@ -0,0 +1,68 @@
+"""Cache de reportes: aciertos, invalidación por versión y un solo cálculo por llave."""
+
+import threading
+import time
+
+import pytest
+
+from app.services import data_version
+from app.services.report_cache import ReportCache
+
+TABLES = ("route_manifests",)
+
+
+def test_hit_until_a_dependent_table_changes():
+    cache, calls = ReportCache(max_entries=8, ttl_seconds=60), []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute("kpis", TABLES, compute) == 1
+    assert cache.get_or_compute("kpis", TABLES, compute) == 1
+    assert cache.stats()["hits"] == 1
+
+    data_version.bump("clients")  # Tabla ajena: sigue vigente
+    assert cache.get_or_compute("kpis", TABLES, compute) == 1
+    data_version.bump("route_manifests")
+    assert cache.get_or_compute("kpis", TABLES, compute) == 2
+
+    # Versiones fijadas por una instantánea: la llave es la de esas versiones
+    pinned = {"route_manifests": -1}
+    assert cache.get_or_compute("kpis", TABLES, compute, versions=pinned) == 3
+    assert cache.get_or_compute("kpis", TABLES, compute, versions=pinned) == 3
+
+
+def test_concurrent_misses_compute_once():
+    cache, calls = ReportCache(max_entries=8, ttl_seconds=60), []
+    started, results = threading.Barrier(4), []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "reporte"
+
+    def request():
+        started.wait()
+        results.append(cache.get_or_compute("slow", TABLES, compute))
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["reporte"] * 4
+    assert len(calls) == 1
+
+
+def test_failed_compute_is_not_cached_and_releases_the_key():
+    cache = ReportCache(max_entries=8, ttl_seconds=60)
+
+    def fail():
+        raise RuntimeError("consulta rota")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("roto", TABLES, fail)
+    assert cache._inflight == {}
+    assert cache.get_or_compute("roto", TABLES, lambda: "ok") == "ok"
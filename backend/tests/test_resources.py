@@ -0,0 +1,23 @@
+"""Alta de choferes y camionetas: mismo commit que su entrada en la bitácora."""
+
+from app.models.audit_log import AuditLog
+
+
+def test_created_drivers_and_trucks_are_audited(client, auth_headers, fleet, db):
+    driver = client.post("/api/v1/resources/drivers", headers=auth_headers, json={"full_name": "Nuevo Chofer"})
+    truck = client.post("/api/v1/resources/trucks", headers=auth_headers, json={
+        "plate": "NEW-1", "nickname": "Nueva", "brand": "Nissan", "model": "NP300", "year": 2022
+    })
+    assert driver.status_code == truck.status_code == 200
+    assert driver.headers["x-db-commits"] == truck.headers["x-db-commits"] == "1"
+
+    entries = {log.action: log for log in db.query(AuditLog)}
+    assert entries["DRIVER_CREATED"].entity_id == driver.json()["id"]
+    assert entries["DRIVER_CREATED"].new_value["full_name"] == "Nuevo Chofer"
+    assert entries["TRUCK_CREATED"].entity_id == truck.json()["id"]
+    assert entries["TRUCK_CREATED"].new_value["plate"] == "NEW-1"
+    assert {log.user_id for log in entries.values()} == {fleet["admin"].id}
+
+
+def test_creating_resources_requires_authentication(client):
+    assert client.post("/api/v1/resources/drivers", json={"full_name": "X"}).status_code == 401
@@ -0,0 +1,50 @@
+"""Acumulados diarios: los deltas de checkout/check-in dejan lo mismo que reconstruirlos."""
+
+from app.services.rollup_service import ROLLUP_KEYS, check_rollups, rebuild_rollups
+
+
+def _rollup_rows(db):
+    """Contenido de las tablas de acumulados, sin filas vacías y con montos a centavos"""
+    db.expire_all()
+    content = {}
+    for model in ROLLUP_KEYS:
+        columns = [column.name for column in model.__table__.columns]
+        rows = db.query(*[getattr(model, name) for name in columns]).filter(model.route_count != 0).all()
+        content[model.__tablename__] = sorted(
+            tuple(round(value, 2) if isinstance(value, float) else value for value in row)
+            for row in rows
+        )
+    return content
+
+
+def test_checkout_and_checkin_deltas_match_a_rebuild(client, auth_headers, fleet, db):
+    drivers, trucks, tienda = fleet["drivers"], fleet["trucks"], fleet["clients"][0]
+    batch = client.post("/api/v1/routes/checkout/batch", headers=auth_headers, json={"entries": [
+        {"driver_id": drivers[0].id, "truck_id": trucks[0].id, "initial_full_bottles": 30},
+        {"driver_id": drivers[1].id, "truck_id": trucks[1].id, "initial_full_bottles": 20,
+         "initial_empty_bottles": 5},
+    ]}).json()["results"]
+    first, second = (result["route_id"] for result in batch)
+    assert _rollup_rows(db)["daily_status_rollups"]  # Las rutas en curso ya cuentan
+
+    def checkin(route_id, returned_full, sold):
+        response = client.post(f"/api/v1/routes/{route_id}/checkin", headers=auth_headers, json={
+            "returned_full_bottles": returned_full, "returned_empty_bottles": sold,
+            "sales": [{"client_id": tienda.id, "quantity": sold}] if sold else [],
+        })
+        assert response.status_code == 200, response.text
+
+    checkin(first, returned_full=10, sold=5)   # Faltan garrafones: deuda
+    checkin(second, returned_full=20, sold=0)  # Cuadra
+    after_checkin = _rollup_rows(db)
+    rebuild_rollups(db)
+    assert _rollup_rows(db) == after_checkin
+
+    # Reintento del check-in con otras cifras: se resta el aporte anterior
+    checkin(first, returned_full=10, sold=20)
+    checkin(second, returned_full=0, sold=10)
+    after_recheckin = _rollup_rows(db)
+    assert after_recheckin != after_checkin
+    assert set(check_rollups(db).values()) == {0}
+    rebuild_rollups(db)
+    assert _rollup_rows(db) == after_recheckin
@@ -0,0 +1,104 @@
+"""Listado de rutas: filtros, paginación por cursor y número de consultas acotado."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine
+from app.models.route_manifest import RouteManifest, AuditStatus
+from app.models.sales_detail import SalesDetail
+
+
+@pytest.fixture
+def routes(db, fleet):
+    """Diez días de rutas para las dos camionetas, cada una con dos ventas"""
+    drivers, trucks, clients = fleet["drivers"], fleet["trucks"], fleet["clients"]
+    today = date.today()
+    created = []
+    for day in range(10):
+        for driver, truck in zip(drivers, trucks):
+            route = RouteManifest(
+                driver_id=driver.id, truck_id=truck.id, date=today - timedelta(days=day),
+                initial_full_bottles=100, initial_empty_bottles=0,
+                audit_status=AuditStatus.CLOSED if day else AuditStatus.IN_PROGRESS,
+                checkout_timestamp=datetime.now(),
+            )
+            route.sales_details = [
+                SalesDetail(client_id=c.id, quantity=5, unit_price=40.0, subtotal=200.0) for c in clients
+            ]
+            created.append(route)
+    db.add_all(created)
+    db.commit()
+    return created
+
+
+@pytest.fixture
+def count_selects():
+    counter = {"n": 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    yield counter
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+def test_keyset_pagination_walks_range_without_gaps(client, auth_headers, routes):
+    start = (date.today() - timedelta(days=9)).isoformat()
+    seen, cursor = [], None
+    while True:
+        url = f"/api/v1/routes/?start_date={start}&limit=3"
+        if cursor:
+            url += f"&cursor={cursor}"
+        page = client.get(url, headers=auth_headers).json()
+        seen.extend((r["date"], r["id"]) for r in page["routes"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == len(routes)
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_filters_and_names(client, auth_headers, fleet, routes):
+    truck = fleet["trucks"][0]
+    page = client.get(
+        f"/api/v1/routes/?start_date={date.today() - timedelta(days=9)}&truck_id={truck.id}&status=CLOSED",
+        headers=auth_headers
+    ).json()
+
+    assert page["total"] == 9
+    assert {r["truck_name"] for r in page["routes"]} == {truck.nickname}
+    assert all(r["audit_status"] == "CLOSED" and r["driver_name"] for r in page["routes"])
+    assert all(r["sales"] is None for r in page["routes"])
+
+
+def test_query_count_does_not_grow_with_page_size(client, auth_headers, routes, count_selects):
+    start = (date.today() - timedelta(days=9)).isoformat()
+    client.get("/api/v1/auth/me", headers=auth_headers)  # Token ya en cache para ambas mediciones
+    counts = []
+    for limit in (2, 20):
+        count_selects["n"] = 0
+        page = client.get(
+            f"/api/v1/routes/?start_date={start}&limit={limit}&include_sales=true", headers=auth_headers
+        ).json()
+        assert all(len(r["sales"]) == 2 for r in page["routes"])
+        counts.append(count_selects["n"])
+
+    assert counts[0] == counts[1]
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers, routes):
+    response = client.get("/api/v1/routes/?cursor=no-es-un-cursor", headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_dashboard_today_routes_use_the_listing_format(client, auth_headers, routes):
+    listing = client.get("/api/v1/routes/", headers=auth_headers).json()
+    dashboard = client.get("/api/v1/reports/dashboard", headers=auth_headers,
+                           params={"fields": "today_routes"}).json()["today_routes"]
+    assert dashboard == listing
+    assert dashboard["total"] == 2 and dashboard["routes"][0]["driver_name"] == "Chofer 1"
@@ -18,12 +18,12 @@ export default function Checkin() {
 
   // Cargar Rutas Activas
   const { data: routesData } = useQuery({
-    queryKey: ['routes'],
-    queryFn: () => routesApi.listRoutes(),
+    queryKey: ['routes', 'IN_PROGRESS'],
+    queryFn: () => routesApi.listRoutes(undefined, { status: 'IN_PROGRESS' }),
   });
 
   const activeRoutes = useMemo(() => {
-    return routesData?.routes?.filter(r => r.status === 'IN_PROGRESS') || [];
+    return routesData?.routes?.filter(r => r.audit_status === 'IN_PROGRESS') || [];
   }, [routesData]);
 
   // Buscar detalles de la ruta seleccionada para mostrar info rápida (Opcional)
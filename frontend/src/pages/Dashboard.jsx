@@ -18,7 +18,7 @@ import TrendChart from '../components/charts/TrendChart';
 import StatusDistribution from '../components/charts/StatusDistribution';
 import LoadingSkeleton from '../components/common/LoadingSkeleton';
 import EmptyState from '../components/common/EmptyState';
-import { reportsApi, routesApi } from '../services/apiService';
+import { reportsApi } from '../services/apiService';
 
 export default function Dashboard() {
   const [dateRange] = useState({
@@ -26,32 +26,26 @@ export default function Dashboard() {
     end: format(new Date(), 'yyyy-MM-dd')
   });
 
-  // Query para KPIs
-  const { data: kpis, isLoading: kpisLoading } = useQuery({
-    queryKey: ['kpis', dateRange],
-    queryFn: () => reportsApi.getKPIs(dateRange.start, dateRange.end),
-    refetchInterval: 60000
-  });
-
-  // Query para tendencias
-  const { data: trendsData, isLoading: trendsLoading } = useQuery({
-    queryKey: ['trends', 30],
-    queryFn: () => reportsApi.getDailyTrends(30)
-  });
-
-  // Query para distribución de estados
-  const { data: statusData, isLoading: statusLoading } = useQuery({
-    queryKey: ['status', dateRange],
-    queryFn: () => reportsApi.getStatusDistribution(dateRange.start, dateRange.end)
-  });
-
-  // Query para rutas de hoy
-  const { data: todayRoutes } = useQuery({
-    queryKey: ['routes', 'today'],
-    queryFn: () => routesApi.listRoutes(format(new Date(), 'yyyy-MM-dd')),
+  // Una sola petición: KPIs, tendencias, distribución y rutas de hoy
+  const { data: dashboard, isLoading } = useQuery({
+    queryKey: ['dashboard', dateRange],
+    queryFn: () => reportsApi.getDashboard({
+      startDate: dateRange.start,
+      endDate: dateRange.end,
+      days: 30,
+      fields: ['kpis', 'trends', 'distribution', 'today_routes']
+    }),
     refetchInterval: 30000
   });
 
+  const kpis = dashboard?.kpis;
+  const trendsData = dashboard?.trends;
+  const statusData = dashboard?.distribution;
+  const todayRoutes = dashboard?.today_routes;
+  const kpisLoading = isLoading;
+  const trendsLoading = isLoading;
+  const statusLoading = isLoading;
+
   // Formatear datos
   const trendChartData = trendsData?.trends.map(item => ({
     date: format(new Date(item.date), 'dd/MM', { locale: es }),
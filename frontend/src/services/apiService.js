@@ -47,6 +47,17 @@ export const reportsApi = {
     return response.data;
   },
 
+  // Dashboard compuesto: varias secciones en una sola petición
+  getDashboard: async ({ startDate, endDate, days = 30, fields } = {}) => {
+    const params = new URLSearchParams();
+    if (startDate) params.append('start_date', startDate);
+    if (endDate) params.append('end_date', endDate);
+    params.append('days', days);
+    if (fields) params.append('fields', fields.join(','));
+    const response = await api.get(`${PREFIX}/reports/dashboard?${params}`);
+    return response.data;
+  },
+
   // Resumen mensual
   getMonthlySummary: async (months = 12) => {
     const response = await api.get(`${PREFIX}/reports/monthly/summary?months=${months}`);
@@ -55,12 +66,21 @@ export const reportsApi = {
 };
 
 export const routesApi = {
-  // Listar rutas
-  listRoutes: async (dateFilter) => {
+  // Listar rutas: el backend pagina por cursor, aquí se recorren todas las páginas
+  listRoutes: async (dateFilter, { status } = {}) => {
     const params = new URLSearchParams();
     if (dateFilter) params.append('date_filter', dateFilter);
-    const response = await api.get(`${PREFIX}/routes?${params}`);
-    return response.data;
+    if (status) params.append('status', status);
+    params.append('limit', 500);
+    const routes = [];
+    let cursor = null;
+    do {
+      if (cursor) params.set('cursor', cursor);
+      const response = await api.get(`${PREFIX}/routes?${params}`);
+      routes.push(...response.data.routes);
+      cursor = response.data.next_cursor;
+    } while (cursor);
+    return { total: routes.length, next_cursor: null, routes };
   },
 
   // Checkout